@@ -0,0 +1,6 @@
+from passwork_action_v7 import PassworkActionBase
+
+
+# Выполнение pw_pass_get_v7 на контроллере
+class ActionModule(PassworkActionBase):
+    pass
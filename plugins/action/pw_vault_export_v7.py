@@ -0,0 +1,6 @@
+from passwork_action_v7 import PassworkActionBase
+
+
+# Выполнение pw_vault_export_v7 на контроллере
+class ActionModule(PassworkActionBase):
+    pass
@@ -0,0 +1,301 @@
+DOCUMENTATION = r'''
+---
+name: pw_profile_v7
+
+type: aggregate
+
+short_description: Профиль обращений к Passwork за плей
+
+description:
+    - Включает сбор метрик (PASSWORK_METRICS=1) в модулях и лукапе коллекции и собирает блоки pw_metrics результатов задач.
+    - Метрики лукапов передаются через временный каталог PASSWORK_METRICS_SPOOL, так как у лукапа нет результата задачи.
+    - В конце каждого плея выводит число вызовов по методам API, задержки p50/p95/p99, самые медленные задачи,
+      нагрузку по ролям и хостам, попадания в кэши и долю времени ожидания Passwork от времени задач.
+    - Отчет можно записать в JSON или в текстовый файл Prometheus (для node_exporter textfile collector).
+
+requirements:
+    - Включение в callbacks_enabled
+
+options:
+    output_format:
+        description: Формат файла отчета, none - только вывод на экран
+        type: str
+        choices: [none, json, prometheus]
+        default: none
+        ini:
+            - key: output_format
+              section: callback_pw_profile_v7
+        env:
+            - name: PASSWORK_PROFILE_FORMAT
+    output_path:
+        description: Путь до файла отчета. Для нескольких плеев JSON содержит список отчетов, Prometheus - метрики последнего плея
+        type: path
+        ini:
+            - key: output_path
+              section: callback_pw_profile_v7
+        env:
+            - name: PASSWORK_PROFILE_PATH
+    top:
+        description: Число самых медленных задач, ролей и хостов в отчете
+        type: int
+        default: 10
+        ini:
+            - key: top
+              section: callback_pw_profile_v7
+        env:
+            - name: PASSWORK_PROFILE_TOP
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from ansible.plugins.callback import CallbackBase
+
+
+# Перцентиль по ближайшему рангу
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+# Экранирование значения метки Prometheus
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'pw_profile_v7'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, display=None):
+        super().__init__(display)
+        # Воркеры Ansible запускаются после загрузки callback-плагинов и наследуют окружение
+        self._spool = tempfile.mkdtemp(prefix='passwork_metrics_')
+        os.environ['PASSWORK_METRICS'] = '1'
+        os.environ['PASSWORK_METRICS_SPOOL'] = self._spool
+        self._play = None
+        self._reports: list[dict] = []
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super().set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+        self._format = self.get_option('output_format')
+        self._path = self.get_option('output_path')
+        self._top = self.get_option('top')
+
+    # Начать сбор по плею
+    def _start_play(self, name: str):
+        self._play = {
+            'name': name,
+            'started': time.monotonic(),
+            'endpoints': {},
+            'cache': {},
+            'tasks': [],
+            'task_started': {},
+            'task_time': 0.0,
+            'api_time': 0.0,
+            'decrypt_time': 0.0,
+        }
+
+    # Добавить блок pw_metrics задачи или лукапа
+    def _add_metrics(self, metrics: dict, task: str, host: str | None, role: str | None, duration: float | None):
+        play = self._play
+        for endpoint, call in metrics.get('calls', {}).items():
+            entry = play['endpoints'].setdefault(endpoint, {'count': 0, 'errors': 0, 'bytes': 0, 'time': 0.0, 'latencies': []})
+            entry['count'] += call['count']
+            entry['errors'] += call['errors']
+            entry['bytes'] += call['bytes']
+            entry['time'] += call['time']
+            entry['latencies'] += call.get('latencies', [])
+        for name, cache in metrics.get('cache', {}).items():
+            entry = play['cache'].setdefault(name, {'hit': 0, 'miss': 0})
+            entry['hit'] += cache['hit']
+            entry['miss'] += cache['miss']
+        play['api_time'] += metrics.get('api_time', 0.0)
+        play['decrypt_time'] += metrics.get('decrypt_time', 0.0)
+        play['tasks'].append({
+            'task': task,
+            'host': host,
+            'role': role,
+            'calls': metrics.get('total_calls', 0),
+            'api_time': metrics.get('api_time', 0.0),
+            'wall_time': duration if duration is not None else metrics.get('wall_time', 0.0),
+        })
+
+    def _task_result(self, result):
+        if self._play is None:
+            return
+        started = self._play['task_started'].pop((result._host.get_name(), result._task._uuid), None)
+        duration = time.monotonic() - started if started is not None else None
+        if duration is not None:
+            self._play['task_time'] += duration
+        role = result._task._role.get_name() if result._task._role else None
+        blocks = [result._result] + [item for item in result._result.get('results', []) if isinstance(item, dict)]
+        for block in blocks:
+            if isinstance(block.get('pw_metrics'), dict):
+                self._add_metrics(block['pw_metrics'], result._task.get_name(), result._host.get_name(), role, duration)
+
+    # Забрать метрики лукапов из каталога
+    def _read_spool(self):
+        for name in os.listdir(self._spool):
+            path = os.path.join(self._spool, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    lines = f.readlines()
+                os.remove(path)
+            except OSError:
+                continue
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._add_metrics(entry['pw_metrics'], entry['source'], None, None, None)
+
+    # Сводка по плею
+    def _build_report(self) -> dict:
+        play = self._play
+        endpoints = {}
+        for endpoint, entry in sorted(play['endpoints'].items(), key=lambda item: -item[1]['time']):
+            endpoints[endpoint] = {
+                'count': entry['count'],
+                'errors': entry['errors'],
+                'bytes': entry['bytes'],
+                'time': round(entry['time'], 4),
+                'p50': _percentile(entry['latencies'], 50),
+                'p95': _percentile(entry['latencies'], 95),
+                'p99': _percentile(entry['latencies'], 99),
+            }
+
+        def top_by(field: str) -> list[dict]:
+            totals: dict[str, dict] = {}
+            for task in play['tasks']:
+                if task[field] is None:
+                    continue
+                entry = totals.setdefault(task[field], {field: task[field], 'calls': 0, 'api_time': 0.0})
+                entry['calls'] += task['calls']
+                entry['api_time'] += task['api_time']
+            return sorted(totals.values(), key=lambda entry: -entry['api_time'])[:self._top]
+
+        cache = {
+            name: dict(entry, ratio=round(entry['hit'] / (entry['hit'] + entry['miss']), 4) if entry['hit'] + entry['miss'] else 0.0)
+            for name, entry in play['cache'].items()
+        }
+        return {
+            'play': play['name'],
+            'duration': round(time.monotonic() - play['started'], 4),
+            'calls': sum(entry['count'] for entry in endpoints.values()),
+            'endpoints': endpoints,
+            'slowest_tasks': sorted(play['tasks'], key=lambda task: -task['api_time'])[:self._top],
+            'roles': top_by('role'),
+            'hosts': top_by('host'),
+            'cache': cache,
+            'api_time': round(play['api_time'], 4),
+            'decrypt_time': round(play['decrypt_time'], 4),
+            'task_time': round(play['task_time'], 4),
+            'other_time': round(max(play['task_time'] - play['api_time'], 0.0), 4),
+        }
+
+    def _print_report(self, report: dict):
+        self._display.banner(f'PASSWORK PROFILE [{report["play"]}]')
+        self._display.display(
+            f'Вызовов API: {report["calls"]}, ожидание Passwork: {report["api_time"]:.3f}s, '
+            f'прочее время задач: {report["other_time"]:.3f}s, расшифровка: {report["decrypt_time"]:.3f}s'
+        )
+        for endpoint, entry in report['endpoints'].items():
+            self._display.display(
+                f'  {endpoint}: {entry["count"]} вызовов, ошибок {entry["errors"]}, {entry["bytes"]} байт, '
+                f'p50 {entry["p50"] * 1000:.1f}ms p95 {entry["p95"] * 1000:.1f}ms p99 {entry["p99"] * 1000:.1f}ms'
+            )
+        if report['slowest_tasks']:
+            self._display.display('Самые медленные задачи:')
+            for task in report['slowest_tasks']:
+                self._display.display(f'  {task["task"]} ({task["host"] or "-"}): {task["calls"]} вызовов, {task["api_time"]:.3f}s')
+        for field, title in (('role', 'Роли'), ('host', 'Хосты')):
+            entries = report[f'{field}s']
+            if entries:
+                self._display.display(f'{title}: ' + ', '.join(f'{entry[field]} {entry["api_time"]:.3f}s' for entry in entries))
+        for name, entry in report['cache'].items():
+            self._display.display(f'  кэш {name}: попаданий {entry["hit"]}, промахов {entry["miss"]} ({entry["ratio"]:.0%})')
+
+    def _prometheus(self, report: dict) -> str:
+        lines = [
+            '# TYPE passwork_api_calls_total counter',
+            '# TYPE passwork_api_errors_total counter',
+            '# TYPE passwork_api_bytes_total counter',
+            '# TYPE passwork_api_latency_seconds summary',
+        ]
+        for endpoint, entry in report['endpoints'].items():
+            label = f'endpoint="{_label(endpoint)}"'
+            lines.append(f'passwork_api_calls_total{{{label}}} {entry["count"]}')
+            lines.append(f'passwork_api_errors_total{{{label}}} {entry["errors"]}')
+            lines.append(f'passwork_api_bytes_total{{{label}}} {entry["bytes"]}')
+            for quantile, field in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                lines.append(f'passwork_api_latency_seconds{{{label},quantile="{quantile}"}} {entry[field]}')
+            lines.append(f'passwork_api_latency_seconds_sum{{{label}}} {entry["time"]}')
+            lines.append(f'passwork_api_latency_seconds_count{{{label}}} {entry["count"]}')
+        lines.append('# TYPE passwork_cache_requests_total counter')
+        for name, entry in report['cache'].items():
+            lines.append(f'passwork_cache_requests_total{{cache="{_label(name)}",result="hit"}} {entry["hit"]}')
+            lines.append(f'passwork_cache_requests_total{{cache="{_label(name)}",result="miss"}} {entry["miss"]}')
+        lines.append('# TYPE passwork_wait_seconds gauge')
+        lines.append(f'passwork_wait_seconds {report["api_time"]}')
+        lines.append('# TYPE passwork_decrypt_seconds gauge')
+        lines.append(f'passwork_decrypt_seconds {report["decrypt_time"]}')
+        lines.append('# TYPE passwork_task_seconds gauge')
+        lines.append(f'passwork_task_seconds {report["task_time"]}')
+        lines.append('# TYPE passwork_play_duration_seconds gauge')
+        lines.append(f'passwork_play_duration_seconds {report["duration"]}')
+        return '\n'.join(lines) + '\n'
+
+    # Записать отчет атомарно: textfile collector не должен увидеть недописанный файл
+    def _write_report(self):
+        if self._format == 'none' or not self._path:
+            return
+        if self._format == 'json':
+            content = json.dumps(self._reports, ensure_ascii=False, indent=2)
+        else:
+            content = self._prometheus(self._reports[-1])
+        directory = os.path.dirname(os.path.abspath(self._path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, self._path)
+
+    def _finish_play(self):
+        if self._play is None:
+            return
+        self._read_spool()
+        report = self._build_report()
+        self._play = None
+        self._reports.append(report)
+        self._print_report(report)
+        self._write_report()
+
+    def v2_playbook_on_play_start(self, play):
+        self._finish_play()
+        self._start_play(play.get_name())
+
+    def v2_runner_on_start(self, host, task):
+        if self._play is not None:
+            self._play['task_started'][(host.get_name(), task._uuid)] = time.monotonic()
+
+    def v2_runner_on_ok(self, result):
+        self._task_result(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._task_result(result)
+
+    def v2_playbook_on_stats(self, stats):
+        self._finish_play()
+        shutil.rmtree(self._spool, ignore_errors=True)
@@ -0,0 +1,286 @@
+DOCUMENTATION = r'''
+---
+name: pw_inventory_v7
+
+short_description: Инвентарь из папок и паролей Passwork
+
+description:
+    - Обходит дерево папок заданных сейфов. Каждая папка становится группой, вложенные папки - дочерними группами.
+    - Каждый пароль папки становится хостом. Хост берется из url пароля, логин - из поля пароля.
+    - Пароли получаются и расшифровываются одним пакетом на сейф.
+    - Секреты (ansible_password, пользовательские поля типа password и totp) не записываются в инвентарь, вместо значений
+      сохраняются шаблоны лукапа pw_get_pswd_v7, которые выполняются только при обращении к переменной. Лукап берет токены
+      и master_key из переменных окружения PASSWORK_ACCESS_TOKEN, PASSWORK_REFRESH_TOKEN, PASSWORK_MASTER_KEY.
+    - Результат сохраняется в кэш инвентаря Ansible (опции cache*), поэтому повторные запуски не обращаются к API до истечения cache_timeout.
+      Секреты в кэш не попадают.
+    - Название хоста - название пароля. Пароли с одинаковым названием в разных папках пропускаются с предупреждением,
+      хостом становится первый найденный.
+    - Файл инвентаря должен называться *.pw_inventory.yml или *.pw_inventory.yaml.
+
+options:
+    plugin:
+        description: Название плагина
+        required: true
+        choices: [pw_inventory_v7, es_support_mg22.passwork_api.pw_inventory_v7]
+    api_server:
+        description: HTTP путь до API сервера https://example.ru/api/v4
+        required: true
+        type: str
+        env:
+            - name: PASSWORK_API_SERVER
+    access_token:
+        description: Access API токен
+        required: true
+        type: str
+        env:
+            - name: PASSWORK_ACCESS_TOKEN
+    refresh_token:
+        description: Refresh API токен
+        required: false
+        type: str
+        env:
+            - name: PASSWORK_REFRESH_TOKEN
+    master_key:
+        description: Ключ шифрования для шифрования на стороне клиента
+        required: false
+        type: str
+        env:
+            - name: PASSWORK_MASTER_KEY
+    vaults:
+        description: Названия сейфов
+        required: true
+        type: list
+        elements: str
+    folders:
+        description: Пути папок (сейф/папка/подпапка), которыми ограничивается обход. По умолчанию сейфы целиком
+        required: false
+        type: list
+        elements: str
+        default: []
+    credentials:
+        description: Записывать логин в ansible_user, а в ansible_password - шаблон лукапа пароля
+        required: false
+        type: bool
+        default: true
+    group_prefix:
+        description: Префикс названий групп
+        required: false
+        type: str
+        default: ''
+    max_workers:
+        description: Максимальное число параллельных запросов к API
+        required: false
+        type: int
+        default: 8
+
+extends_documentation_fragment:
+    - constructed
+    - inventory_cache
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+EXAMPLES = r'''
+# passwork.pw_inventory.yml
+plugin: pw_inventory_v7
+# токены берутся из PASSWORK_ACCESS_TOKEN и PASSWORK_REFRESH_TOKEN
+api_server: https://passwork.example.ru
+vaults:
+  - INFRA
+folders:
+  - INFRA/servers
+cache: true
+cache_plugin: jsonfile
+cache_connection: ~/.ansible/passwork_inventory
+cache_timeout: 3600
+keyed_groups:
+  - key: passwork_tags
+    prefix: tag
+'''
+
+import json
+from urllib.parse import urlsplit
+from ansible.errors import AnsibleError
+from ansible.inventory.group import to_safe_group_name
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+from passwork_common_v7 import (
+  pw_login,
+  get_vault,
+  get_folder_trie,
+  walk_folders,
+  get_folder_passwords,
+  get_items,
+)
+
+try:
+    from ansible.template import trust_as_template
+except ImportError:
+    # До ansible-core 2.19 все строковые переменные шаблонизируются
+    def trust_as_template(value):
+        return value
+
+# Типы пользовательских полей, значения которых не записываются в инвентарь
+SECRET_CUSTOM_TYPES = ('password', 'totp')
+
+
+# Адрес и порт хоста из url пароля
+def _host_address(url: str | None) -> tuple[str | None, int | None]:
+    if not url:
+        return None, None
+    parts = urlsplit(url if '//' in url else f'//{url}')
+    try:
+        return parts.hostname, parts.port
+    except ValueError:
+        return parts.hostname, None
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'pw_inventory_v7'
+
+    def verify_file(self, path):
+        return super().verify_file(path) and path.endswith(('.pw_inventory.yml', '.pw_inventory.yaml'))
+
+    # Получить группы и хосты из Passwork: {'groups': {группа: родитель}, 'hosts': {хост: {'groups', 'vars'}}}
+    def _fetch(self) -> dict:
+        folders: list[str] = [path.strip('/') for path in self.get_option('folders')]
+        credentials: bool = self.get_option('credentials')
+        max_workers: int = self.get_option('max_workers')
+
+        groups: dict[str, str | None] = {}
+        hosts: dict[str, dict] = {}
+
+        with pw_login(
+            self.get_option('api_server'),
+            self.get_option('access_token'),
+            self.get_option('refresh_token'),
+            self.get_option('master_key'),
+        ) as pwClient:
+
+            for vault in self.get_option('vaults'):
+                vault_data = get_vault(pwClient, vault)
+                if vault_data is None:
+                    raise AnsibleError(f'Не найден сейф {vault}')
+                vault_id = vault_data['id']
+
+                trie = get_folder_trie(pwClient, vault_id)
+                walk = [(vault, None)] + list(walk_folders(trie, vault))
+                if folders:
+                    walk = [
+                        (path, folder_id) for path, folder_id in walk
+                        if any(path == root or path.startswith(f'{root}/') for root in folders)
+                    ]
+
+                found: list[tuple[str, dict]] = []
+                for path, folder_id in walk:
+                    parent = path.rpartition('/')[0]
+                    groups[self._group_name(path)] = self._group_name(parent) if parent else None
+                    found += [
+                        (path, password)
+                        for password in get_folder_passwords(pwClient, vault_id, folder_id)
+                        if password.get('folderId', folder_id) == folder_id
+                    ]
+
+                items = get_items(pwClient, [password['id'] for _, password in found], max_workers)
+                for path, password in found:
+                    item = items[password['id']]
+                    host = hosts.get(item['name'])
+                    if host is None:
+                        host = hosts[item['name']] = {'groups': [], 'vars': self._host_vars(item, path, credentials)}
+                    elif host['vars']['passwork_id'] != item['id']:
+                        self.display.warning(
+                            f'Пароль {path}/{item["name"]} пропущен: хост {item["name"]} '
+                            f'уже создан из {host["vars"]["passwork_path"]}'
+                        )
+                        continue
+                    host['groups'].append(self._group_name(path))
+
+        return {'groups': groups, 'hosts': hosts}
+
+    # Название группы по пути папки: сейф/папка/подпапка -> сейф_папка_подпапка
+    def _group_name(self, path: str) -> str:
+        return to_safe_group_name(self.get_option('group_prefix') + path, force=True, silent=True)
+
+    # Шаблон лукапа значения пароля: выполняется при обращении к переменной, значение не попадает в инвентарь и кэш
+    def _secret_template(self, password_path: str, expression: str) -> str:
+        query = f'query("pw_get_pswd_v7", {json.dumps(password_path)}, api_server={json.dumps(self.get_option("api_server"))})'
+        return trust_as_template(f'{{{{ {query}[0]{expression} }}}}')
+
+    # Переменные хоста из пароля
+    def _host_vars(self, item: dict, path: str, credentials: bool) -> dict:
+        address, port = _host_address(item.get('url'))
+        password_path = f'{path}/{item["name"]}'
+        custom_fields = {}
+        for custom in item.get('customs') or []:
+            if custom.get('type') in SECRET_CUSTOM_TYPES:
+                custom_fields[custom['name']] = self._secret_template(
+                    password_path,
+                    f'["customs"] | selectattr("name", "equalto", {json.dumps(custom["name"])}) | map(attribute="value") | first',
+                )
+            else:
+                custom_fields[custom['name']] = custom['value']
+        host_vars = {
+            'passwork_id': item['id'],
+            'passwork_path': password_path,
+            'passwork_tags': item.get('tags') or [],
+            'passwork_custom': custom_fields,
+        }
+        if address:
+            host_vars['ansible_host'] = address
+        if port:
+            host_vars['ansible_port'] = port
+        if credentials:
+            if item.get('login'):
+                host_vars['ansible_user'] = item['login']
+            if item.get('password'):
+                host_vars['ansible_password'] = self._secret_template(password_path, '["password"]')
+        return host_vars
+
+    # Заполнить инвентарь
+    def _populate(self, results: dict):
+        strict = self.get_option('strict')
+
+        for group, parent in results['groups'].items():
+            self.inventory.add_group(group)
+        for group, parent in results['groups'].items():
+            if parent is not None and parent in results['groups']:
+                self.inventory.add_child(parent, group)
+
+        for host, data in results['hosts'].items():
+            for group in data['groups']:
+                self.inventory.add_host(host, group=group)
+            for name, value in data['vars'].items():
+                self.inventory.set_variable(host, name, value)
+            self._set_composite_vars(self.get_option('compose'), data['vars'], host, strict=strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), data['vars'], host, strict=strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), data['vars'], host, strict=strict)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super().parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        user_cache_setting = self.get_option('cache')
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        results = None
+        if attempt_to_read_cache:
+            try:
+                results = self._cache[cache_key]
+            except KeyError:
+                cache_needs_update = True
+
+        if results is None:
+            try:
+                results = self._fetch()
+            except AnsibleError:
+                raise
+            except Exception as e:
+                raise AnsibleError(f'Ошибка получения инвентаря из Passwork: {e}')
+
+        if cache_needs_update:
+            self._cache[cache_key] = results
+
+        self._populate(results)
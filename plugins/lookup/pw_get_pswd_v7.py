@@ -2,45 +2,110 @@ DOCUMENTATION = r'''
 ---
 module: pw_get_pswd_v7
 
-short_description: Лукап для получения пароля по пути
+short_description: Лукап для получения паролей по путям
+
+description:
+    - Принимает один или несколько путей (в терминах лукапа или в опции path).
+    - Поиск выполняется один раз на каждое уникальное название пароля, пароли получаются и расшифровываются параллельно.
+    - Полученные пароли хранятся только в памяти процесса контроллера (TTL и LRU), одновременные запросы одного пути объединяются.
+    - Кэш и объединение запросов действуют в одном процессе. Задача каждого хоста выполняется в отдельном процессе,
+      поэтому запросы разных хостов не объединяются.
+    - Пути из resolve_paths находятся вместе с запрошенными одним набором запросов, но пароли по ним не получаются
+      и не расшифровываются. Найденные пароли (айди, без секретов) запоминаются в процессе и в кэше метаданных,
+      поэтому следующие вызовы для этих путей, в том числе задачи других хостов, не выполняют поиск.
+      Если пароль по запомненному айди удален, переименован или перемещен, поиск повторяется.
+    - Соединение переиспользуется всеми вызовами лукапа в процессе.
 
 options:
     api_server:
         description: HTTP путь до API сервера https://example.ru/api/v4
         required: true
         type: str
+        env:
+            - name: PASSWORK_API_SERVER
     access_token:
         description: Access API токен
         required: true
         type: str
+        env:
+            - name: PASSWORK_ACCESS_TOKEN
     refresh_token:
         description: Refresh API токен
         required: false
         type: str
+        env:
+            - name: PASSWORK_REFRESH_TOKEN
     master_key:
         description: Ключ шифрования для шифрования на стороне клиента
         required: false
         type: str
-    password_path:
-        description: Путь до пароля
-        required: true
+        env:
+            - name: PASSWORK_MASTER_KEY
+    path:
+        description: Путь или список путей до паролей, используется если не заданы термины лукапа
+        required: false
+        type: raw
+    resolve_paths:
+        description: Дополнительные пути, которые находятся вместе с запрошенными без получения паролей
+        required: false
+        type: list
+        elements: str
+        default: []
+    max_workers:
+        description: Максимальное число параллельных запросов к API
+        required: false
+        type: int
+        default: 8
+    resolve_mode:
+        description:
+            - Способ поиска паролей.
+            - search - поиск по названию пароля во всем Passwork и фильтрация по пути.
+            - index - сейф и папка находятся через кэшируемый индекс папок, запрашиваются только пароли нужных папок.
+        required: false
         type: str
+        choices: [search, index]
+        default: search
+    cache_ttl:
+        description: Время жизни пароля в кэше в памяти, секунд. 0 - не кэшировать
+        required: false
+        type: int
+        default: 300
+    cache_size:
+        description: Максимальное число паролей в кэше в памяти
+        required: false
+        type: int
+        default: 1024
 author:
     - Ширяев Дмитрий (dshi@efsystem.ru)
 '''
 
 RETURN = r'''
-response:
-    description: Ответ от сервера
-    type: dict
-    returned: always
+_list:
+    description: Пароли в порядке переданных путей
+    type: list
+    elements: dict
 '''
+from ansible.errors import AnsibleError
 from ansible.plugins.lookup import LookupBase
 from ansible.utils.display import Display
-from passwork_common_v7 import get_password_by_path,pw_login
+from contextlib import nullcontext
+import passwork_common_v7
+from passwork_common_v7 import (
+  SecretCache,
+  get_items,
+  resolve_password_paths,
+  pw_login,
+  server_fingerprint,
+  collect_metrics,
+  metrics_enabled,
+  spool_metrics,
+)
 
 display = Display()
 
+# Кэш паролей процесса контроллера, общий для всех вызовов лукапа
+_secret_cache = SecretCache()
+
 class LookupModule(LookupBase):
 
     def run(self, terms, variables=None, **kwargs):
@@ -51,10 +116,56 @@ class LookupModule(LookupBase):
         access_token: str = self.get_option('access_token')
         refresh_token: str = self.get_option('refresh_token')
         master_key: str = self.get_option('master_key')
-        password_path: str = self.get_option('path')
+        max_workers: int = self.get_option('max_workers')
+        resolve_mode: str = self.get_option('resolve_mode')
+        resolve_paths: list[str] = self.get_option('resolve_paths')
+
+        password_paths = list(terms) or self.get_option('path')
+        if isinstance(password_paths, str):
+            password_paths = [password_paths]
+        if not password_paths:
+            raise AnsibleError('Нужно указать путь до пароля.')
+
+
+        _secret_cache.ttl = self.get_option('cache_ttl')
+        _secret_cache.max_size = self.get_option('cache_size')
+        server = server_fingerprint(api_server, access_token)
+
+        # Пароли по запомненным айди проверяются: удаленный, переименованный или перемещенный пароль
+        # находится заново
+        def fetch_items(pwClient, paths: list[str], refresh: bool) -> dict | None:
+            passwords = resolve_password_paths(pwClient, paths, resolve_paths, max_workers, resolve_mode, refresh)
+
+            not_found = [path for path, password in passwords.items() if password is None]
+            if not_found:
+                raise AnsibleError(f'Не найдены пароли по путям: {", ".join(not_found)}')
+
+            try:
+                items = get_items(pwClient, [password['id'] for password in passwords.values()], max_workers)
+            except AnsibleError:
+                if refresh:
+                    raise
+                return None
+            for path, password in passwords.items():
+                item = items[password['id']]
+                moved = any(key in password and item.get(key) != password[key] for key in ('folderId', 'vaultId'))
+                if not refresh and (moved or item.get('name') != path.rsplit('/', 1)[-1]):
+                    return None
+            return {(server, path): items[passwords[path]['id']] for path in paths}
 
+        def fetch(keys: list[tuple[str, str]]) -> dict:
+            paths = [path for _, path in keys]
+            with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+                return fetch_items(pwClient, paths, False) or fetch_items(pwClient, paths, True)
 
-        with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
-            password = get_password_by_path(pwClient,password_path)
-            response= pwClient.get_item(password['id'])
-            return [response]
\ No newline at end of file
+        passwork_common_v7.REUSE_CLIENTS = True
+        keys = [(server, path) for path in password_paths]
+        enabled = metrics_enabled()
+        with collect_metrics() if enabled else nullcontext() as metrics:
+            secrets = _secret_cache.get_many(keys, fetch)
+        if enabled:
+            # У лукапа нет результата задачи: метрики выводятся в -vvv и передаются callback-плагину через каталог
+            pw_metrics = metrics.to_dict()
+            display.vvv(f'pw_metrics: {pw_metrics}')
+            spool_metrics('lookup pw_get_pswd_v7', pw_metrics)
+        return [secrets[key] for key in keys]
@@ -0,0 +1,65 @@
+import importlib.util
+import os
+from contextlib import nullcontext
+from typing import Any
+from ansible.module_utils.common.arg_spec import ArgumentSpecValidator
+from ansible.module_utils.common.parameters import remove_values
+from ansible.plugins.action import ActionBase
+import passwork_common_v7
+
+# Каталог с модулями коллекции
+MODULES_DIR=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modules')
+
+_modules: dict[str, Any] = {}
+
+# Загрузить модуль коллекции для выполнения на контроллере
+def _load_module(name: str):
+    if name not in _modules:
+        spec = importlib.util.spec_from_file_location(
+            f'_pw_controller_{name}',
+            os.path.join(MODULES_DIR, f'{name}.py'),
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[name] = module
+    return _modules[name]
+
+
+# Базовый action-плагин: выполняет модуль Passwork в процессе контроллера,
+# без передачи AnsiballZ на управляемый хост.
+# В режиме проверки модуль выполняется, только если он объявляет SUPPORTS_CHECK_MODE = True:
+# такой модуль принимает run_module(params, check_mode=True), вычисляет изменения и не выполняет запись
+class PassworkActionBase(ActionBase):
+
+    TRANSFERS_FILES = False
+    _requires_connection = False
+
+    def run(self, tmp=None, task_vars=None):
+        result = super().run(tmp, task_vars)
+        del tmp
+
+        module = _load_module(self._task.action.rsplit('.', 1)[-1])
+
+        validation = ArgumentSpecValidator(module.ARGUMENT_SPEC).validate(self._task.args)
+        if validation.error_messages:
+            result.update(failed=True, msg='; '.join(validation.error_messages))
+            return result
+
+        result.update(changed=False, message='')
+        kwargs = {}
+        if self._task.check_mode:
+            if not getattr(module, 'SUPPORTS_CHECK_MODE', False):
+                return result
+            kwargs['check_mode'] = True
+
+        passwork_common_v7.REUSE_CLIENTS = True
+        enabled = passwork_common_v7.metrics_enabled()
+        with passwork_common_v7.collect_metrics() if enabled else nullcontext() as metrics:
+            try:
+                result.update(module.run_module(validation.validated_parameters, **kwargs))
+            except Exception as e:
+                result.update(failed=True, msg=str(e))
+        if enabled:
+            result['pw_metrics'] = metrics.to_dict()
+
+        return remove_values(result, validation._no_log_values)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable
+from ansible.errors import AnsibleError
+from passwork_common_v7 import (
+  pw_login,
+  get_vault,
+  search_folder,
+  get_password_by_path,
+  _get_passwords,
+  _get_passwords_by_paths_index,
+  _split_password_path,
+  _match_password_path,
+  MAX_WORKERS
+)
+
+# passwork_client загружается только клиентом с шифрованием (см. pw_login)
+if TYPE_CHECKING:
+    from passwork_client import PassworkClient
+
+
+# Клиент Passwork для asyncio. Клиенты pw_login синхронные, поэтому вызовы выполняются в пуле потоков
+# сессии поверх одного клиента (одного пула соединений), а число одновременных запросов ограничено семафором
+class AsyncPassworkClient:
+
+    def __init__(self, client: PassworkClient, max_concurrency: int = MAX_WORKERS):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='passwork')
+
+    # Выполнить синхронную функцию в пуле потоков сессии
+    async def run(self, func: Callable, *args) -> Any:
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def call(self, method: str, endpoint: str, payload: dict | None = None) -> Any:
+        return await self.run(self.client.call, method, endpoint, payload)
+
+    async def get_item(self, item_id: str) -> dict:
+        return await self.run(self.client.get_item, item_id)
+
+    async def create_item(self, item_data: dict) -> str:
+        return await self.run(self.client.create_item, item_data)
+
+    async def update_item(self, item_id: str, item_data: dict):
+        return await self.run(self.client.update_item, item_id, item_data)
+
+    # Дождаться завершения потоков сессии, не блокируя цикл событий
+    async def aclose(self):
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+
+# Установка соединения с Пассворком для asyncio: вход и выход pw_login выполняются вне цикла событий
+@asynccontextmanager
+async def pw_login_async(
+    api_server: str,
+    access_token: str,
+    refresh_token: str | None,
+    master_key: str | None,
+    crypto: bool = True,
+    max_concurrency: int = MAX_WORKERS,
+) -> AsyncGenerator[AsyncPassworkClient, None]:
+    loop = asyncio.get_running_loop()
+    login = pw_login(api_server, access_token, refresh_token, master_key, crypto=crypto)
+    passwork = await loop.run_in_executor(None, login.__enter__)
+    pwClient = AsyncPassworkClient(passwork, max_concurrency)
+    try:
+        yield pwClient
+    finally:
+        await pwClient.aclose()
+        await loop.run_in_executor(None, login.__exit__, None, None, None)
+
+# Получить сейф
+async def get_vault_async(pwClient: AsyncPassworkClient, vault_name: str):
+    return await pwClient.run(get_vault, pwClient.client, vault_name)
+
+# Поиск папки
+async def search_folder_async(pwClient: AsyncPassworkClient, folder_name: str, vault_id: str | None):
+    return await pwClient.run(search_folder, pwClient.client, folder_name, vault_id)
+
+# Получить пароль по пути
+async def get_password_by_path_async(pwClient: AsyncPassworkClient, path: str, mode: str = 'search') -> dict | None:
+    return await pwClient.run(get_password_by_path, pwClient.client, path, mode)
+
+# Получить пароли по нескольким путям: поиски по уникальным названиям выполняются одновременно.
+# В режиме index папки обходятся синхронным помощником с тем же ограничением параллельности
+async def get_passwords_by_paths_async(pwClient: AsyncPassworkClient, paths: list[str], mode: str = 'search') -> dict[str, dict | None]:
+
+    if mode == 'index':
+        return await asyncio.get_running_loop().run_in_executor(
+            None, _get_passwords_by_paths_index, pwClient.client, paths, pwClient.max_concurrency,
+        )
+
+    paths_by_name: dict[str, list[str]] = {}
+    for path in paths:
+        _, pass_name = _split_password_path(path)
+        paths_by_name.setdefault(pass_name, []).append(path)
+
+    searches = await asyncio.gather(*(
+        pwClient.run(_get_passwords, pwClient.client, pass_name)
+        for pass_name in paths_by_name
+    ))
+
+    matched = {}
+    for name_paths, passwords in zip(paths_by_name.values(), searches):
+        for path in name_paths:
+            matched[path] = _match_password_path(passwords, path)
+    return matched
+
+# Получить пароли по айди одновременно и расшифровать их одним этапом (см. get_items)
+async def get_items_async(pwClient: AsyncPassworkClient, item_ids: list[str]) -> dict[str, dict]:
+
+    unique_ids = list(dict.fromkeys(item_ids))
+    try:
+        items = await asyncio.gather(*(pwClient.call("GET", f"/api/v1/items/{item_id}") for item_id in unique_ids))
+        items = await asyncio.get_running_loop().run_in_executor(None, pwClient.client.decrypt_items, list(items))
+    except Exception as e:
+        raise AnsibleError(f'Ошибка получения пароля: {e}')
+    return dict(zip(unique_ids, items))
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from passwork_client import PassworkClient
+from passwork_client.crypto import decrypt_aes, rsa_decrypt
+from passwork_client.exceptions import PassworkError, PassworkResponseError
+from passwork_client.utils import decrypt_item, decrypt_item_customs
+import passwork_common_v7 as common
+from passwork_common_v7 import TokenStoreMixin, record_cache
+
+
+# Расшифровать пароль ответа сервера ключом его сейфа (None - без шифрования на стороне клиента).
+# Функция уровня модуля, чтобы ее можно было выполнять в пуле процессов
+def _decrypt_item_payload(item_data: dict, vault_key: str | None) -> dict:
+    encrypted_key = decrypt_aes(item_data['keyEncrypted'], vault_key) if vault_key is not None else ''
+    if item_data.get('passwordEncrypted'):
+        item_data['password'] = decrypt_item(item_data['passwordEncrypted'], encrypted_key)
+    for custom in item_data.get('customs') or []:
+        decrypt_item_customs(custom, encrypted_key)
+    return item_data
+
+
+# Число процессов пула расшифровки: доступные процессу ядра
+def decrypt_workers() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+
+# Клиент Passwork с шифрованием на стороне клиента (passwork_client), обновляющий токены
+# при истечении access токена (см. TokenStoreMixin). Создается pw_login по умолчанию
+class TokenRefreshingClient(TokenStoreMixin, PassworkClient):
+
+    crypto = True
+    api_errors = (PassworkError, PassworkResponseError)
+
+    def __init__(self, host: str, verify_ssl: bool | str = True, token_store_path: str | None = None):
+        super().__init__(host, verify_ssl)
+        self._init_token_store(token_store_path)
+        self._vaults: dict[str, dict] = {}
+        self._vaults_lock = threading.Lock()
+
+    def _api_call(self, method: str, endpoint: str, payload: dict | None, headers: dict | None):
+        return PassworkClient.call(self, method, endpoint, payload, headers)
+
+    def _process_response(self, response):
+        self._record_response_size(len(response.content))
+        return super()._process_response(response)
+
+    # Область кэша ключей: сервер + отпечаток master_key
+    def _key_scope(self, master_key: str) -> str:
+        return hashlib.sha256(f'{self.host}\n{master_key}'.encode()).hexdigest()
+
+    # Установить master_key. Расшифрованные ключи пользователя берутся из кэша ключей,
+    # запрос /api/v1/users/keys и расшифровка закрытого ключа выполняются один раз за время жизни кэша
+    def set_master_key(self, master_key: str | None):
+        if not master_key:
+            return super().set_master_key(master_key)
+        scope = self._key_scope(master_key)
+        cached = common._key_cache.get(scope, 'user', master_key)
+        record_cache('keys', cached is not None)
+        if cached is None:
+            super().set_master_key(master_key)
+            keys = {'private': self.user_private_key, 'public': self.user_public_key}
+            common._key_cache.set(scope, 'user', json.dumps(keys), master_key)
+            return
+        keys = json.loads(cached)
+        self.master_key = master_key
+        self.master_key_hash = hashlib.sha256(master_key.encode()).hexdigest()
+        self.user_private_key = keys['private']
+        self.user_public_key = keys['public']
+        self.is_encrypt = True
+
+    # Расшифровать мастер-ключ сейфа закрытым ключом пользователя (RSA), результат кэшируется
+    def vault_key(self, vault_master_key_encrypted: str) -> str:
+        scope = self._key_scope(self.master_key)
+        name = 'vault/' + hashlib.sha256(vault_master_key_encrypted.encode()).hexdigest()
+        value = common._key_cache.get(scope, name, self.master_key)
+        record_cache('keys', value is not None)
+        if value is None:
+            value = rsa_decrypt(vault_master_key_encrypted, self.user_private_key).decode()
+            common._key_cache.set(scope, name, value, self.master_key)
+        return value
+
+    # Ключ шифрования пароля или редакции
+    def item_key(self, vault_master_key_encrypted: str, key_encrypted: str) -> str:
+        return decrypt_aes(key_encrypted, self.vault_key(vault_master_key_encrypted))
+
+    # Сейф по айди. create_item и update_item запрашивают сейф на каждый пароль, поэтому ответ
+    # запоминается на время жизни клиента: массовые операции делают один запрос на сейф
+    def get_vault(self, vault_id: str) -> dict:
+        with self._vaults_lock:
+            vault = self._vaults.get(vault_id)
+            if vault is None:
+                vault = self._vaults[vault_id] = super().get_vault(vault_id)
+        return vault
+
+    def get_vault_password(self, vault: dict) -> str:
+        if not self.is_encrypt:
+            return ''
+        return self.vault_key(vault['masterKeyEncrypted'])
+
+    def get_item(self, item_id: str) -> dict:
+        return self.decrypt_items([self.call("GET", f"/api/v1/items/{item_id}")])[0]
+
+    def get_items(self, item_ids: list[str]) -> list[dict]:
+        if not item_ids:
+            return []
+        requests = [{'method': 'GET', 'relativeUrl': f'/api/v1/items/{item_id}'} for item_id in item_ids]
+        return self.decrypt_items(self.send_batch(requests))
+
+    # Расшифровать пароли в порядке передачи. Ключи сейфов расшифровываются здесь (кэш ключей),
+    # расшифровка самих паролей при DECRYPT_PROCESS_THRESHOLD и более паролей идет в пуле процессов
+    def decrypt_items(self, items: list[dict]) -> list[dict]:
+        started = time.perf_counter()
+        try:
+            return self._decrypt_items(items)
+        finally:
+            if common._metrics is not None:
+                common._metrics.record_decrypt(time.perf_counter() - started)
+
+    def _decrypt_items(self, items: list[dict]) -> list[dict]:
+        vault_keys = [
+            self.vault_key(item['vaultMasterKeyEncrypted']) if self.is_encrypt else None
+            for item in items
+        ]
+        workers = decrypt_workers()
+        if (
+            not self.is_encrypt
+            or len(items) < common.DECRYPT_PROCESS_THRESHOLD
+            or workers < 2
+            or 'fork' not in multiprocessing.get_all_start_methods()
+        ):
+            return list(map(_decrypt_item_payload, items, vault_keys))
+        # fork: дочерним процессам не нужно заново импортировать модуль по пути module_utils
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            return list(executor.map(
+                _decrypt_item_payload,
+                items,
+                vault_keys,
+                chunksize=max(1, len(items) // (workers * 4)),
+            ))
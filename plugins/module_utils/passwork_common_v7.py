@@ -1,85 +1,815 @@
+from __future__ import annotations
+
+import abc
+import atexit
+import copy
+import fcntl
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Generator
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, Generator, Iterator
 from ansible.errors import AnsibleError
-from passwork_client import PassworkClient
+
+# passwork_client (requests, urllib3, криптография) импортируется только при создании клиента
+# с шифрованием (см. pw_login и passwork_client_v7): вызовы без шифрования обходятся без него
+if TYPE_CHECKING:
+    from passwork_client import PassworkClient
+
+# keyring импортируется при первом обращении к хранилищу ключей ОС
+HAS_KEYRING = importlib.util.find_spec('keyring') is not None
 
 # Проверка SSL при установке соединения
 VERIFY_SSL=True
 
-# Установка соединения с Пассворком
+# Максимальное число параллельных запросов к API
+MAX_WORKERS=8
+
+# Размер страницы при постраничном запросе результатов поиска
+PAGE_SIZE=100
+
+# Каталог локального кэша метаданных (сейфы, папки). Используется, только если принадлежит
+# текущему пользователю и недоступен на запись другим
+CACHE_DIR=os.environ.get('PASSWORK_CACHE_DIR', os.path.expanduser('~/.ansible/passwork_cache'))
+# Время жизни записей кэша метаданных в секундах, 0 - кэш отключен
+CACHE_TTL=int(os.environ.get('PASSWORK_CACHE_TTL', 300))
+
+# Каталог хранилища токенов на контроллере: обновленная пара токенов доступна всем процессам
+TOKEN_DIR=os.environ.get('PASSWORK_TOKEN_DIR', os.path.expanduser('~/.ansible/passwork_tokens'))
+
+# Каталог постоянного кэша редакций паролей: редакции не меняются, поэтому записи не устаревают
+SNAPSHOT_CACHE_DIR=os.environ.get('PASSWORK_SNAPSHOT_CACHE_DIR', os.path.expanduser('~/.ansible/passwork_snapshots'))
+# Ключ шифрования кэша редакций, если не передан master_key. Без ключа кэш редакций отключен
+SNAPSHOT_CACHE_KEY=os.environ.get('PASSWORK_SNAPSHOT_CACHE_KEY')
+
+# Кэш расшифрованных ключей шифрования на стороне клиента: memory - в памяти процесса (одна задача),
+# keyring - дополнительно в хранилище ключей ОС (нужен python пакет keyring), file - в каталоге
+# KEY_CACHE_DIR (только по явному выбору), none - отключен. В file и keyring записи зашифрованы master_key.
+# Каталог file используется, только если принадлежит текущему пользователю и недоступен другим
+KEY_CACHE=os.environ.get('PASSWORK_KEY_CACHE', 'memory')
+KEY_CACHE_DIR=os.environ.get('PASSWORK_KEY_CACHE_DIR', os.path.expanduser('~/.ansible/passwork_keys'))
+# Время жизни записей кэша ключей в секундах
+KEY_CACHE_TTL=int(os.environ.get('PASSWORK_KEY_CACHE_TTL', 900))
+
+# Число паролей, начиная с которого расшифровка выполняется в пуле процессов.
+# Для небольших выборок запуск пула дороже самой расшифровки. По замеру tools/pw_bench_v7.py --decrypt
+# (0.46 мс на пароль в процессе, запуск пула 14 мс) пул окупается с ~70 паролей на 2 ядрах, порог взят с запасом
+DECRYPT_PROCESS_THRESHOLD=int(os.environ.get('PASSWORK_DECRYPT_PROCESS_THRESHOLD', 100))
+
+# Каталог для метрик лукапов: процессы дописывают в него JSONL, callback-плагин собирает их в отчет
+METRICS_SPOOL_ENV='PASSWORK_METRICS_SPOOL'
+
+# Переиспользование соединений в рамках процесса (включается action-плагинами на контроллере)
+REUSE_CLIENTS=False
+_clients: dict[tuple, PassworkClient] = {}
+
+# Построенные деревья папок сейфов в памяти процесса: (ключ кэша соединения, айди сейфа) -> trie.
+# Сбрасываются при изменении папок (update_folder_index, invalidate_cache)
+_folder_tries: dict[tuple[str, str], dict] = {}
+_folder_tries_lock = threading.Lock()
+
+# Найденные по путям пароли (краткие записи поиска, без секретов) в памяти процесса:
+# (ключ кэша соединения, режим поиска, путь) -> пароль. См. resolve_password_paths
+_password_paths: dict[tuple[str, str, str], dict] = {}
+_password_paths_lock = threading.Lock()
+
+# Включен ли сбор метрик (PASSWORK_METRICS=1, выставляется в т.ч. callback-плагином pw_profile_v7).
+# Проверяется при каждом вызове: переменная может быть выставлена после импорта модуля
+def metrics_enabled() -> bool:
+    return os.environ.get('PASSWORK_METRICS', '').lower() in ('1', 'true', 'yes')
+
+
+# Айди в пути запроса заменяются на {id}, чтобы метрики группировались по методам API
+_ENDPOINT_ID_RE = re.compile(r'/(?:[0-9a-fA-F]{24}|[0-9a-fA-F-]{36}|\d+)(?=/|$)')
+
+
+# Метрики задачи: вызовы API по методам (число, ошибки, время, байты, задержки),
+# время вспомогательных функций, расшифровки, попадания в кэши
+class Metrics:
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.calls: dict[str, dict[str, Any]] = {}
+        self.helpers: dict[str, dict[str, float]] = {}
+        self.cache: dict[str, dict[str, int]] = {}
+        self.decrypt_time = 0.0
+        self._lock = threading.Lock()
+
+    def record_call(self, method: str, endpoint: str, duration: float, size: int, error: bool):
+        key = f'{method.upper()} {_ENDPOINT_ID_RE.sub("/{id}", endpoint.split("?")[0])}'
+        with self._lock:
+            entry = self.calls.setdefault(key, {'count': 0, 'errors': 0, 'time': 0.0, 'bytes': 0, 'latencies': []})
+            entry['count'] += 1
+            entry['errors'] += int(error)
+            entry['time'] += duration
+            entry['bytes'] += size
+            entry['latencies'].append(round(duration, 4))
+
+    def record_helper(self, name: str, duration: float):
+        with self._lock:
+            entry = self.helpers.setdefault(name, {'count': 0, 'time': 0.0})
+            entry['count'] += 1
+            entry['time'] += duration
+
+    def record_cache(self, name: str, hit: bool, count: int = 1):
+        with self._lock:
+            entry = self.cache.setdefault(name, {'hit': 0, 'miss': 0})
+            entry['hit' if hit else 'miss'] += count
+
+    def record_decrypt(self, duration: float):
+        with self._lock:
+            self.decrypt_time += duration
+
+    # Блок pw_metrics результата задачи
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            calls = {
+                key: dict(entry, time=round(entry['time'], 4), latencies=list(entry['latencies']))
+                for key, entry in self.calls.items()
+            }
+            return {
+                'calls': calls,
+                'total_calls': sum(entry['count'] for entry in calls.values()),
+                'api_time': round(sum(entry['time'] for entry in calls.values()), 4),
+                'bytes': sum(entry['bytes'] for entry in calls.values()),
+                'decrypt_time': round(self.decrypt_time, 4),
+                'helpers': {name: dict(entry, time=round(entry['time'], 4)) for name, entry in self.helpers.items()},
+                'cache': copy.deepcopy(self.cache),
+                'wall_time': round(time.monotonic() - self.started, 4),
+            }
+
+
+# Метрики, собираемые сейчас в процессе (задачи выполняются по одной в процессе воркера)
+_metrics: Metrics | None = None
+
+
+# Собрать метрики вызовов внутри блока. Вложенный блок пишет во внешние метрики
 @contextmanager
-def pw_login(api_server: str, access_token: str, refresh_token: str | None, master_key: str | None)-> Generator[PassworkClient, None, None]:
+def collect_metrics() -> Generator[Metrics, None, None]:
+    global _metrics
+    if _metrics is not None:
+        yield _metrics
+        return
+    _metrics = Metrics()
+    try:
+        yield _metrics
+    finally:
+        _metrics = None
+
+
+# Учесть count обращений к кэшу name
+def record_cache(name: str, hit: bool, count: int = 1):
+    if _metrics is not None and count:
+        _metrics.record_cache(name, hit, count)
+
+
+# Дописать метрики процесса в каталог PASSWORK_METRICS_SPOOL (для лукапов, у которых нет результата задачи)
+def spool_metrics(source: str, metrics: dict[str, Any]):
+    spool = os.environ.get(METRICS_SPOOL_ENV)
+    if not spool:
+        return
     try:
-        passwork = PassworkClient(api_server,VERIFY_SSL)
-        passwork.set_tokens(access_token, None)
+        with open(os.path.join(spool, f'{os.getpid()}.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'source': source, 'pw_metrics': metrics}) + '\n')
+    except OSError:
+        pass
+
+
+# Декоратор: время выполнения вспомогательной функции попадает в метрики helpers
+def timed(func: Callable) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _metrics is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _metrics.record_helper(func.__name__, time.perf_counter() - started)
+    return wrapper
+
+
+# Кэш расшифрованных ключей (ключи пользователя, мастер-ключи сейфов) с временем жизни.
+# Записи разделены по области scope (сервер + master_key). В режимах file и keyring записи также
+# сохраняются зашифрованными master_key в каталоге на контроллере или в хранилище ключей ОС,
+# чтобы их получали следующие процессы (каждая задача Ansible выполняется в отдельном процессе).
+# Устаревшие сохраненные записи удаляются при чтении
+class KeyCache:
+
+    SERVICE = 'passwork-ansible'
+
+    def __init__(self, ttl: float = 900, backend: str = 'memory', directory: str = KEY_CACHE_DIR):
+        self.ttl = ttl
+        self.backend = backend
+        self.directory = directory
+        self._items: dict[tuple[str, str], tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.clear)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.backend != 'none'
+
+    # Получить ключ, secret нужен для расшифровки записи из keyring
+    def get(self, scope: str, name: str, secret: str) -> str | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._items.get((scope, name))
+        if entry is not None and time.time() - entry[0] <= self.ttl:
+            return entry[1]
+        if not self._persistent:
+            return None
+        try:
+            from passwork_client.crypto import decrypt_aes
+            stored = self._read(f'{scope}/{name}')
+            if stored is None:
+                return None
+            stored = json.loads(stored)
+            if time.time() - stored['ts'] > self.ttl:
+                self._delete(f'{scope}/{name}')
+                return None
+            value = decrypt_aes(stored['data'], secret)
+        except Exception:
+            # Кэш не обязателен, недоступное хранилище ключей не прерывает задачу
+            return None
+        with self._lock:
+            self._items[(scope, name)] = (stored['ts'], value)
+        return value
+
+    # Сохранить ключ
+    def set(self, scope: str, name: str, value: str, secret: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._items[(scope, name)] = (now, value)
+        if not self._persistent:
+            return
+        try:
+            from passwork_client.crypto import encrypt_aes
+            self._write(f'{scope}/{name}', json.dumps({'ts': now, 'data': encrypt_aes(value, secret)}))
+        except Exception:
+            pass
+
+    # Записи сохраняются вне процесса. Каталог file, доступный другим пользователям, не используется
+    @property
+    def _persistent(self) -> bool:
+        if self.backend == 'file':
+            return _private_dir(self.directory, 0o077)
+        return self.backend == 'keyring' and HAS_KEYRING
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    # Прочитать сохраненную запись из каталога или хранилища ключей ОС
+    def _read(self, key: str) -> str | None:
+        if self.backend == 'keyring':
+            import keyring
+            return keyring.get_password(self.SERVICE, key)
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    # Сохранить запись: файл в каталоге с правами 0700 заменяется атомарно
+    def _write(self, key: str, stored: str):
+        if self.backend == 'keyring':
+            import keyring
+            keyring.set_password(self.SERVICE, key, stored)
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(stored)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    # Удалить сохраненную запись
+    def _delete(self, key: str):
+        if self.backend == 'keyring':
+            import keyring
+            keyring.delete_password(self.SERVICE, key)
+            return
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    # Очистить ключи в памяти процесса
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_key_cache = KeyCache(KEY_CACHE_TTL, KEY_CACHE)
+
+
+# Общая часть клиентов Passwork (passwork_client_v7 и облегченного passwork_light_v7):
+# обновление access токена при его истечении (401) и учет вызовов в метриках.
+# Наследник задает api_errors - ошибки API своего транспорта, и _api_call - вызов API без повтора.
+# Refresh токен одноразовый, поэтому обновление выполняется под файловой блокировкой:
+# процесс, получивший блокировку вторым, берет уже обновленную пару из хранилища
+class TokenStoreMixin(abc.ABC):
+
+    # Поддерживает ли клиент шифрование на стороне клиента (см. pw_login)
+    crypto = False
+    api_errors: tuple[type[Exception], ...] = ()
+
+    def _init_token_store(self, token_store_path: str | None):
+        self.token_store_path = token_store_path
+        self._refresh_lock = threading.Lock()
+        self._response_size = threading.local()
+
+    # Запрос к API без повтора при истекшем токене, реализуется клиентом
+    @abc.abstractmethod
+    def _api_call(self, method: str, endpoint: str, payload: dict | None, headers: dict | None):
+        ...
+
+    def call(self, method: str, endpoint: str, payload: dict | None = None, headers: dict | None = None):
+        used_token = self.access_token
+        try:
+            return self._measured_call(method, endpoint, payload, headers)
+        except self.api_errors as e:
+            if self.token_store_path is None or not _is_auth_error(e):
+                raise
+        self.refresh_stored_tokens(used_token)
+        return self._measured_call(method, endpoint, payload, headers)
+
+    # Вызов API с учетом времени, размера ответа и ошибок в метриках
+    def _measured_call(self, method: str, endpoint: str, payload: dict | None, headers: dict | None):
+        metrics = _metrics
+        if metrics is None:
+            return self._api_call(method, endpoint, payload, headers)
+        self._response_size.value = 0
+        started = time.perf_counter()
+        error = True
+        try:
+            result = self._api_call(method, endpoint, payload, headers)
+            error = False
+            return result
+        finally:
+            metrics.record_call(method, endpoint, time.perf_counter() - started, self._response_size.value, error)
+
+    # Учесть размер тела ответа в метриках текущего вызова
+    def _record_response_size(self, size: int):
+        if _metrics is not None:
+            self._response_size.value = getattr(self._response_size, 'value', 0) + size
+
+    # Обновить токены, если в хранилище нет пары новее использованного access токена.
+    # Возвращает ответ сервера на обновление или None, если взята пара из хранилища
+    def refresh_stored_tokens(self, used_token: str | None) -> dict | None:
+        with self._refresh_lock:
+            if self.access_token != used_token:
+                return None
+            os.makedirs(TOKEN_DIR, mode=0o700, exist_ok=True)
+            with open(f'{self.token_store_path}.lock', 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                stored = load_stored_tokens(self.token_store_path)
+                if stored is not None and stored['access_token'] != used_token:
+                    self.set_tokens(stored['access_token'], stored['refresh_token'])
+                    return None
+                response = self.update_tokens()
+                _save_stored_tokens(self.token_store_path, self.access_token, self.refresh_token)
+                return response
+
+# Ошибка авторизации: истекший (token_expired) или недействительный (401) access токен
+def _is_auth_error(e: Exception) -> bool:
+    return str(getattr(e, 'code', None)) in ('token_expired', '401')
+
+# Путь до записи хранилища токенов, ключ - исходный refresh токен из параметров
+def token_store_path(api_server: str, refresh_token: str) -> str:
+    return os.path.join(TOKEN_DIR, f'{server_fingerprint(api_server, refresh_token)}.json')
+
+# Прочитать пару токенов из хранилища
+def load_stored_tokens(path: str) -> dict | None:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Сохранить пару токенов в хранилище
+def _save_stored_tokens(path: str, access_token: str, refresh_token: str):
+    fd, tmp_path = tempfile.mkstemp(dir=TOKEN_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'access_token': access_token, 'refresh_token': refresh_token}, f)
+    os.replace(tmp_path, path)
+
+# Установка соединения с Пассворком.
+# Если передан refresh токен, истекший access токен обновляется автоматически,
+# а актуальная пара берется из хранилища токенов.
+# crypto=False - облегченный клиент на стандартной библиотеке (passwork_light_v7) для вызовов,
+# которым не нужна расшифровка: passwork_client и криптография при этом не импортируются
+@contextmanager
+def pw_login(api_server: str, access_token: str, refresh_token: str | None, master_key: str | None, crypto: bool = True)-> Generator[PassworkClient, None, None]:
+    client_key = (api_server, access_token, master_key)
+    passwork = _clients.get(client_key) if REUSE_CLIENTS else None
+    if passwork is not None and (passwork.crypto or not crypto):
+        yield passwork
+        return
+    started = time.perf_counter()
+    try:
+        if crypto:
+            from passwork_client_v7 import TokenRefreshingClient as client_class
+        else:
+            from passwork_light_v7 import LightClient as client_class
+        store_path = token_store_path(api_server, refresh_token) if refresh_token else None
+        passwork = client_class(api_server, VERIFY_SSL, store_path)
+        stored = load_stored_tokens(store_path) if store_path else None
+        if stored is not None:
+            passwork.set_tokens(stored['access_token'], stored['refresh_token'])
+        else:
+            passwork.set_tokens(access_token, refresh_token)
+        passwork.cache_key = server_fingerprint(api_server, access_token)
+        passwork.snapshot_server = api_server.rstrip('/')
+        passwork.snapshot_key = master_key or SNAPSHOT_CACHE_KEY
         if bool(master_key):
             passwork.set_master_key(master_key)
     except Exception as e:
         raise AnsibleError(f'Ошибка соединения с Passwork: {e}')
+    if _metrics is not None:
+        _metrics.record_helper('pw_login', time.perf_counter() - started)
+    if REUSE_CLIENTS:
+        _clients[client_key] = passwork
     yield passwork
 
+# Ключ кэша: сервер + отпечаток токена, сам токен на диск не пишется
+def server_fingerprint(api_server: str, access_token: str) -> str:
+    return hashlib.sha256(f'{api_server.rstrip("/")}\n{access_token}'.encode()).hexdigest()
+
+# Каталог создается с правами 0700. Чужой каталог или каталог с правами из mask не используется:
+# записи из него могли быть подменены или прочитаны
+def _private_dir(directory: str, mask: int) -> bool:
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.stat(directory)
+    except OSError:
+        return False
+    return st.st_uid == os.getuid() and not st.st_mode & mask
+
+# Каталог кэша метаданных: не доступен на запись другим
+def _private_cache_dir() -> bool:
+    return _private_dir(CACHE_DIR, 0o022)
+
+# Путь до файла кэша для соединения
+def _cache_path(pwClient: PassworkClient) -> str | None:
+    cache_key = getattr(pwClient, 'cache_key', None)
+    if cache_key is None or CACHE_TTL <= 0 or not _private_cache_dir():
+        return None
+    return os.path.join(CACHE_DIR, f'{cache_key}.json')
+
+# Блокировка файла кэша между процессами на время чтения-изменения-записи (как у хранилища токенов)
+@contextmanager
+def _cache_lock(path: str) -> Iterator[None]:
+    with open(f'{path}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+# Записать все записи кэша: временный файл заменяет файл кэша атомарно
+def _cache_save(path: str, entries: dict):
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+    os.replace(tmp_path, path)
+
+# Прочитать все записи кэша
+def _cache_load(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Получить запись из кэша, если она не устарела
+def cache_get(pwClient: PassworkClient, key: str) -> Any | None:
+    path = _cache_path(pwClient)
+    if path is None:
+        return None
+    entry = _cache_load(path).get(key)
+    if entry is None or time.time() - entry['ts'] > CACHE_TTL:
+        record_cache('metadata', False)
+        return None
+    record_cache('metadata', True)
+    return entry['data']
+
+# Сохранить запись в кэш
+def cache_set(pwClient: PassworkClient, key: str, data: Any):
+    cache_set_many(pwClient, {key: data})
+
+# Сохранить несколько записей кэша одной записью файла
+def cache_set_many(pwClient: PassworkClient, data: dict[str, Any]):
+    path = _cache_path(pwClient)
+    if path is None or not data:
+        return
+    try:
+        with _cache_lock(path):
+            now = time.time()
+            entries = {k: v for k, v in _cache_load(path).items() if now - v['ts'] <= CACHE_TTL}
+            entries.update((key, {'ts': now, 'data': value}) for key, value in data.items())
+            _cache_save(path, entries)
+    except OSError:
+        # Кэш не обязателен, ошибки записи не прерывают задачу
+        pass
+
+# Получить неустаревшие записи кэша, ключи которых начинаются с prefix
+def cache_items(pwClient: PassworkClient, prefix: str) -> dict[str, Any]:
+    path = _cache_path(pwClient)
+    if path is None:
+        return {}
+    now = time.time()
+    return {
+        key: entry['data']
+        for key, entry in _cache_load(path).items()
+        if key.startswith(prefix) and now - entry['ts'] <= CACHE_TTL
+    }
+
+# Предупреждение в выводе Ansible на контроллере
+def _warn(message: str):
+    from ansible.utils.display import Display
+    Display().warning(message)
+
+# Изменить неустаревшие записи кэша с ключами, начинающимися с prefix: update(ключ, данные) -> новые данные.
+# Чтение и запись выполняются под блокировкой файла кэша, время записи сохраняется
+def cache_update(pwClient: PassworkClient, prefix: str, update: Callable[[str, Any], Any]):
+    path = _cache_path(pwClient)
+    if path is None:
+        return
+    try:
+        with _cache_lock(path):
+            now = time.time()
+            entries = {k: v for k, v in _cache_load(path).items() if now - v['ts'] <= CACHE_TTL}
+            for key, entry in entries.items():
+                if key.startswith(prefix):
+                    entry['data'] = update(key, entry['data'])
+            _cache_save(path, entries)
+    except OSError:
+        pass
+
+# Сбросить кэш метаданных после изменения сейфов/папок.
+# Если указан prefix, удаляются только записи с этим префиксом
+def invalidate_cache(pwClient: PassworkClient, prefix: str | None = None):
+    if prefix is None or prefix.startswith('folder_index/') or 'folder_index/'.startswith(prefix):
+        _drop_folder_tries(pwClient)
+    path = _cache_path(pwClient)
+    if path is None:
+        return
+    try:
+        with _cache_lock(path):
+            if prefix is None:
+                os.remove(path)
+                return
+            entries = _cache_load(path)
+            for key in [key for key in entries if key.startswith(prefix)]:
+                del entries[key]
+            _cache_save(path, entries)
+    except OSError:
+        pass
+
 # Получить сейф
+@timed
 def get_vault(pwClient: PassworkClient, vault_name: str):
     try:
-        vaults_resp = pwClient.call("GET", f"/api/v1/vaults")
+        vaults = cache_get(pwClient, 'vaults')
+        if vaults is None:
+            vaults = pwClient.call("GET", f"/api/v1/vaults")['items']
+            cache_set(pwClient, 'vaults', vaults)
         vault = {
             vault['name']: vault
-            for vault in vaults_resp['items']
+            for vault in vaults
         }.get(vault_name)
     except Exception as e:
         raise AnsibleError(f'Ошибка соединения получения сейфа: {e}')
     return vault
 
+# Постраничный обход результатов поиска. Страницы запрашиваются лениво, по мере
+# потребления; при prefetch следующая страница запрашивается, пока обрабатывается текущая.
+# Обход завершается на странице короче page_size, поэтому результат в одну страницу стоит одного запроса.
+# Если сервер ограничивает размер страницы, он возвращает примененный limit в первом ответе,
+# и дальше страницы сравниваются с ним. Если сервер не поддерживает пагинацию (повторил уже
+# полученную страницу), обход завершается
+def iter_search(pwClient: PassworkClient, endpoint: str, payload: dict, page_size: int = PAGE_SIZE, prefetch: bool = False) -> Iterator[dict]:
+
+    def fetch(page: int) -> dict:
+        return pwClient.call("GET", endpoint, payload={**payload, 'page': page, 'limit': page_size})
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = 1
+        pending = executor.submit(fetch, page) if executor else None
+        limit = page_size
+        first_ids = set()
+        while True:
+            response = pending.result() if executor else fetch(page)
+            items = response['items']
+            if page == 1 and isinstance(response.get('limit'), int) and 0 < response['limit'] < page_size:
+                limit = response['limit']
+            if not items or items[0].get('id') in first_ids:
+                return
+            first_ids.add(items[0].get('id'))
+
+            last = len(items) < limit
+            if executor and not last:
+                pending = executor.submit(fetch, page + 1)
+
+            yield from items
+            if last:
+                return
+            page += 1
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Постраничный поиск паролей
+def iter_items_search(pwClient: PassworkClient, payload: dict, page_size: int = PAGE_SIZE, prefetch: bool = False) -> Iterator[dict]:
+    return iter_search(pwClient, "/api/v1/items/search", payload, page_size, prefetch)
+
+# Постраничный поиск папок
+def iter_folders_search(pwClient: PassworkClient, payload: dict, page_size: int = PAGE_SIZE, prefetch: bool = False) -> Iterator[dict]:
+    return iter_search(pwClient, "/api/v1/folders/search", payload, page_size, prefetch)
+
 # Поиск папки
+@timed
 def search_folder (pwClient: PassworkClient, folder_name: str, vault_id: str | None):
     try:
-        
+
+        cache_name = f'folders/{vault_id}/{folder_name}'
+        if (folders := cache_get(pwClient, cache_name)) is not None:
+            return folders
+
         body = {'query': folder_name}
 
         if vault_id is not None:
             body['vaultId'] = vault_id
-        folders= pwClient.call("GET", f"/api/v1/folders/search",payload=body)['items']
+        folders= list(iter_folders_search(pwClient, body))
 
         for folder in folders:
             if 'path' in folder:
                 folder['pathStr']= path_to_string(folder['path'])
 
+        cache_set(pwClient, cache_name, folders)
+
     except Exception as e:
         raise AnsibleError(f'Ошибка поиска папки: {e}')
     return folders
 
-# Получить папку по пути
-def get_folder_by_path(pwClient: PassworkClient, folder_name: str, path: str, vault_id: str | None) -> dict | None:
+# Получить все папки сейфа, список кэшируется и служит индексом папок
+@timed
+def get_vault_folders(pwClient: PassworkClient, vault_id: str) -> list[dict]:
 
+    cache_name = f'folder_index/{vault_id}'
+    if (folders := cache_get(pwClient, cache_name)) is not None:
+        return folders
 
-    body = {'query': folder_name}
+    try:
+        folders = list(iter_search(pwClient, "/api/v1/folders", {'vaultId': vault_id}))
+    except Exception as e:
+        raise AnsibleError(f'Ошибка получения папок сейфа: {e}')
 
-    folders= pwClient.call("GET", f"/api/v1/folders/search",payload=body)['items']
+    cache_set(pwClient, cache_name, folders)
+    return folders
 
-    if len(folders) == 0:
-        return None
+# Построить префиксное дерево (trie) путей папок сейфа: сегмент пути -> узел
+def build_folder_trie(folders: list[dict]) -> dict:
+
+    folders_by_id = {folder['id']: folder for folder in folders}
+    trie = {'children': {}, 'folders': []}
 
     for folder in folders:
-        if 'path' in folder:
-            folder['pathStr']= path_to_string(folder['path'])
+        if 'parentFolderId' in folder:
+            segments = []
+            current, seen = folder, set()
+            while current is not None and current['id'] not in seen:
+                seen.add(current['id'])
+                segments.append(current['name'])
+                current = folders_by_id.get(current.get('parentFolderId'))
+            segments.reverse()
+        else:
+            segments = [p['name'] for p in folder.get('path', [])[1:]] + [folder['name']]
 
-    matched_folders = [
-                folder
-                for folder in folders
-                if folder['vaultId'] == vault_id and folder['name'] == folder_name and folder['pathStr'] in path
-            ]
-    
-    if len(matched_folders) == 0:
-        return None
+        node = trie
+        for name in segments:
+            node = node['children'].setdefault(name, {'children': {}, 'folders': []})
+        node['folders'].append(folder)
+
+    return trie
+
+# Ключ соединения для данных в памяти процесса (деревья папок, найденные пароли)
+def _connection_key(pwClient: PassworkClient) -> str:
+    return getattr(pwClient, 'cache_key', None) or str(id(pwClient))
+
+# Сбросить деревья папок соединения в памяти процесса
+def _drop_folder_tries(pwClient: PassworkClient):
+    owner = _connection_key(pwClient)
+    with _folder_tries_lock:
+        for key in [key for key in _folder_tries if key[0] == owner]:
+            del _folder_tries[key]
+
+# Дерево папок сейфа: строится один раз на процесс, повторные обращения не читают кэш и не вызывают API
+def get_folder_trie(pwClient: PassworkClient, vault_id: str) -> dict:
+    key = (_connection_key(pwClient), vault_id)
+    with _folder_tries_lock:
+        trie = _folder_tries.get(key)
+    if trie is None:
+        trie = build_folder_trie(get_vault_folders(pwClient, vault_id))
+        with _folder_tries_lock:
+            trie = _folder_tries.setdefault(key, trie)
+    return trie
 
-    if len(matched_folders) > 1:
+# Обход дерева папок в глубину: (путь папки, айди папки)
+def walk_folders(trie: dict, path: str) -> Iterator[tuple[str, str]]:
+    for name, node in trie['children'].items():
+        for folder in node['folders']:
+            yield f'{path}/{name}', folder['id']
+        yield from walk_folders(node, f'{path}/{name}')
+
+# Найти папку по сегментам пути внутри сейфа (без названия сейфа)
+@timed
+def resolve_folder_path(pwClient: PassworkClient, vault_id: str, segments: list[str]) -> dict | None:
+
+    node = get_folder_trie(pwClient, vault_id)
+    for name in segments:
+        node = node['children'].get(name)
+        if node is None:
+            return None
+
+    if len(node['folders']) > 1:
         raise AnsibleError((
-            f'Не удалось найти единственную папку по пути {path}. '
+            f'Не удалось найти единственную папку по пути {"/".join(segments)}. '
         ))
+    if len(node['folders']) == 0:
+        return None
+    # Копия: дерево разделяется между вызовами
+    return dict(node['folders'][0])
+
+# Обновить закэшированные индексы папок после изменения одной папки
+def update_folder_index(pwClient: PassworkClient, folder_id: str, deleted: bool = False):
+
+    # Пути паролей в измененной папке изменились
+    _drop_folder_tries(pwClient)
+    forget_password_paths(pwClient)
+    if not cache_items(pwClient, 'folder_index/'):
+        return
+
+    folder = None
+    if not deleted:
+        try:
+            folder = get_folder_by_id(pwClient, folder_id)
+        except Exception as e:
+            # Запись папки уже выполнена, ошибка обновления кэша не прерывает задачу:
+            # индексы сбрасываются и строятся заново при следующем обращении
+            invalidate_cache(pwClient, 'folder_index/')
+            _warn(f'Не удалось обновить индекс папок, индекс сброшен: {e}')
+            return
+
+    def update(cache_name: str, folders: list[dict]) -> list[dict]:
+        removed = {folder_id}
+        if deleted:
+            added = True
+            while added:
+                added = False
+                for f in folders:
+                    if f.get('parentFolderId') in removed and f['id'] not in removed:
+                        removed.add(f['id'])
+                        added = True
+
+        updated = [f for f in folders if f['id'] not in removed]
+        if folder is not None and cache_name == f'folder_index/{folder["vaultId"]}':
+            updated.append(folder)
+        return updated
+
+    cache_update(pwClient, 'folder_index/', update)
+
+# Получить папку по пути.
+# path - путь до родительской папки вместе с названием сейфа: сейф/папка/.../
+@timed
+def get_folder_by_path(pwClient: PassworkClient, folder_name: str, path: str, vault_id: str | None) -> dict | None:
 
-    return matched_folders[0]
+    vault_name, *parents = [segment for segment in path.split('/') if segment] or ['']
+
+    folder = resolve_folder_path(pwClient, vault_id, parents + [folder_name])
+    if folder is None and parents and parents[-1] == folder_name:
+        # Путь указан вместе с самой папкой
+        parents = parents[:-1]
+        folder = resolve_folder_path(pwClient, vault_id, parents + [folder_name])
+
+    if folder is None:
+        return None
+    return dict(folder, pathStr='/'.join([vault_name] + parents) + '/')
 
 # Получить папку
+@timed
 def get_folder(pwClient: PassworkClient, folder_name: str, vault_id: str | None):
     
     folders= search_folder(pwClient,folder_name,vault_id)
@@ -94,19 +824,18 @@ def get_folder(pwClient: PassworkClient, folder_name: str, vault_id: str | None)
     return None
 
 # Получить папку по айди
+@timed
 def get_folder_by_id(pwClient: PassworkClient, folder_id: str):
     response = pwClient.call("GET", f"/api/v1/folders/{folder_id}")
     return response
 
 # Получить пароли
+@timed
 def _get_passwords(pwClient: PassworkClient, password_name: str):
     try:
-        passwords_response = pwClient.call("GET",f'/api/v1/items/search', payload={'query': password_name})
-
-        passwords = passwords_response['items']
         matched_passwords = [
             password
-            for password in passwords
+            for password in iter_items_search(pwClient, {'query': password_name})
             if password['name'] == password_name
         ]
         
@@ -119,8 +848,8 @@ def _get_passwords(pwClient: PassworkClient, password_name: str):
     except Exception as e:
         raise AnsibleError(f'Ошибка получения пароля: {e}')
 
-# Получить пароль по пути
-def get_password_by_path(pwClient: PassworkClient, path: str) -> dict | None:
+# Разбить путь до пароля на путь сейф/папки и название пароля
+def _split_password_path(path: str) -> tuple[str, str]:
 
     vault_folders, pass_name = path.rsplit('/', maxsplit=1)
 
@@ -129,9 +858,12 @@ def get_password_by_path(pwClient: PassworkClient, path: str) -> dict | None:
             'Путь невалидный, должен состоять минимум из трех частей: '
             f'наименование сейфа/папки(через /)/название пароля. {path=}'
         ))
-    
+    return vault_folders, pass_name
+
+# Выбрать из найденных паролей единственный с указанным путем
+def _match_password_path(passwords: list[dict], path: str) -> dict | None:
+
     matched_by_path_passwords = []
-    passwords = _get_passwords(pwClient, pass_name)
 
     for password in passwords:
         if password['pathStr']==path:
@@ -145,6 +877,245 @@ def get_password_by_path(pwClient: PassworkClient, path: str) -> dict | None:
         return None
     return matched_by_path_passwords[0]
 
+# Получить пароли папки сейфа (folder_id=None - корень сейфа)
+@timed
+def get_folder_passwords(pwClient: PassworkClient, vault_id: str, folder_id: str | None) -> list[dict]:
+    try:
+        body = {'vaultIds': [vault_id]}
+        if folder_id is not None:
+            body['folderIds'] = [folder_id]
+        return [
+            password
+            for password in iter_items_search(pwClient, body)
+            if password.get('folderId', folder_id) == folder_id
+        ]
+    except Exception as e:
+        raise AnsibleError(f'Ошибка получения паролей папки: {e}')
+
+# Получить пароли по путям через индекс папок: сейф -> папка -> пароли папки.
+# Один запрос на каждую уникальную папку, стоимость зависит от размера папки
+def _get_passwords_by_paths_index(pwClient: PassworkClient, paths: list[str], max_workers: int) -> dict[str, dict | None]:
+
+    paths_by_folder: dict[str, list[str]] = {}
+    for path in paths:
+        vault_folders, _ = _split_password_path(path)
+        paths_by_folder.setdefault(vault_folders, []).append(path)
+
+    folder_ids: dict[str, tuple[str, str | None] | None] = {}
+    for vault_folders in paths_by_folder:
+        vault_name, *folder_names = vault_folders.split('/')
+        vault = get_vault(pwClient, vault_name)
+        if vault is None:
+            folder_ids[vault_folders] = None
+        elif not folder_names:
+            folder_ids[vault_folders] = (vault['id'], None)
+        else:
+            folder = resolve_folder_path(pwClient, vault['id'], folder_names)
+            folder_ids[vault_folders] = None if folder is None else (vault['id'], folder['id'])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        listings = {
+            vault_folders: executor.submit(get_folder_passwords, pwClient, *ids)
+            for vault_folders, ids in folder_ids.items()
+            if ids is not None
+        }
+
+    matched = {}
+    for vault_folders, folder_paths in paths_by_folder.items():
+        passwords = listings[vault_folders].result() if vault_folders in listings else []
+        for password in passwords:
+            password['pathStr'] = f"{vault_folders}/{password['name']}"
+        for path in folder_paths:
+            matched[path] = _match_password_path(passwords, path)
+    return matched
+
+# Получить пароль по пути.
+# mode: search - поиск по названию во всем Passwork, index - через индекс папок сейфа
+@timed
+def get_password_by_path(pwClient: PassworkClient, path: str, mode: str = 'search') -> dict | None:
+
+    if mode == 'index':
+        return _get_passwords_by_paths_index(pwClient, [path], 1)[path]
+
+    _, pass_name = _split_password_path(path)
+    passwords = _get_passwords(pwClient, pass_name)
+    return _match_password_path(passwords, path)
+
+# Получить пароли по нескольким путям: один поиск на каждое уникальное название пароля
+@timed
+def get_passwords_by_paths(pwClient: PassworkClient, paths: list[str], max_workers: int = MAX_WORKERS, mode: str = 'search') -> dict[str, dict | None]:
+
+    if mode == 'index':
+        return _get_passwords_by_paths_index(pwClient, paths, max_workers)
+
+    paths_by_name: dict[str, list[str]] = {}
+    for path in paths:
+        _, pass_name = _split_password_path(path)
+        paths_by_name.setdefault(pass_name, []).append(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        searches = {
+            pass_name: executor.submit(_get_passwords, pwClient, pass_name)
+            for pass_name in paths_by_name
+        }
+
+    matched = {}
+    for pass_name, name_paths in paths_by_name.items():
+        passwords = searches[pass_name].result()
+        for path in name_paths:
+            matched[path] = _match_password_path(passwords, path)
+    return matched
+
+# Найти пароли по путям (без получения и расшифровки) вместе с дополнительными путями extra_paths
+# одним набором запросов (см. get_passwords_by_paths). Найденные пароли запоминаются в памяти процесса
+# и в кэше метаданных, поэтому следующие вызовы для тех же путей, в том числе из процессов других хостов,
+# не выполняют поиск. refresh - искать заново запрошенные пути, не используя запомненные
+@timed
+def resolve_password_paths(
+    pwClient: PassworkClient,
+    paths: list[str],
+    extra_paths: list[str] | tuple[str, ...] = (),
+    max_workers: int = MAX_WORKERS,
+    mode: str = 'search',
+    refresh: bool = False,
+) -> dict[str, dict | None]:
+
+    owner = _connection_key(pwClient)
+    prefix = f'password_paths/{mode}/'
+    resolved: dict[str, dict] = {}
+    if refresh:
+        forget_password_paths(pwClient)
+    else:
+        with _password_paths_lock:
+            resolved.update(
+                (path, password) for (key_owner, key_mode, path), password in _password_paths.items()
+                if key_owner == owner and key_mode == mode
+            )
+        if any(path not in resolved for path in paths):
+            resolved.update(
+                (key[len(prefix):], password) for key, password in cache_items(pwClient, prefix).items()
+                if key[len(prefix):] not in resolved
+            )
+
+    wanted = list(dict.fromkeys(path for path in [*paths, *extra_paths] if path not in resolved))
+    if wanted:
+        found = get_passwords_by_paths(pwClient, wanted, max_workers, mode)
+        found = {path: password for path, password in found.items() if password is not None}
+        resolved.update(found)
+        cache_set_many(pwClient, {f'{prefix}{path}': password for path, password in found.items()})
+
+    with _password_paths_lock:
+        for path in [*paths, *extra_paths]:
+            if path in resolved:
+                _password_paths[(owner, mode, path)] = resolved[path]
+    return {path: copy.deepcopy(resolved[path]) if path in resolved else None for path in paths}
+
+# Забыть найденные по путям пароли соединения: в памяти процесса и в кэше метаданных
+def forget_password_paths(pwClient: PassworkClient):
+    owner = _connection_key(pwClient)
+    with _password_paths_lock:
+        for key in [key for key in _password_paths if key[0] == owner]:
+            del _password_paths[key]
+    invalidate_cache(pwClient, 'password_paths/')
+
+# Собрать тело пароля для create_item/update_item из аргументов модуля
+def build_item_data(pass_args: dict[str, Any], vault_id: str, folder_id: str | None) -> dict[str, Any]:
+    return {
+        "vaultId": vault_id,
+        "name": pass_args.get('name'),
+        "login": pass_args.get('login'),
+        "password": pass_args.get('password'),
+        "url": pass_args.get('url'),
+        "description": pass_args.get('description'),
+        "color": pass_args.get('color'),
+        "tags": pass_args.get('tags') or [],
+        "customs": pass_args.get('custom') or [],
+        "folderId": folder_id
+    }
+
+# Получить пароли по айди параллельно и расшифровать их одним этапом (см. decrypt_items)
+@timed
+def get_items(pwClient: PassworkClient, item_ids: list[str], max_workers: int = MAX_WORKERS) -> dict[str, dict]:
+
+    unique_ids = list(dict.fromkeys(item_ids))
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            items = list(executor.map(lambda item_id: pwClient.call("GET", f"/api/v1/items/{item_id}"), unique_ids))
+        items = pwClient.decrypt_items(items)
+    except Exception as e:
+        raise AnsibleError(f'Ошибка получения пароля: {e}')
+    return dict(zip(unique_ids, items))
+
+# Путь до записи кэша редакции. Редакция неизменяема, поэтому адрес (сервер, пароль, редакция)
+# однозначно определяет содержимое; в имя входит отпечаток ключа, чтобы смена ключа не давала ошибок чтения
+def _snapshot_cache_path(pwClient: PassworkClient, item_id: str, snapshot_id: str) -> str | None:
+    key = getattr(pwClient, 'snapshot_key', None)
+    if not key:
+        return None
+    address = f'{pwClient.snapshot_server}\n{item_id}\n{snapshot_id}\n{hashlib.sha256(key.encode()).hexdigest()}'
+    digest = hashlib.sha256(address.encode()).hexdigest()
+    return os.path.join(SNAPSHOT_CACHE_DIR, digest[:2], digest)
+
+# Прочитать редакцию из постоянного кэша
+def _snapshot_cache_get(pwClient: PassworkClient, path: str) -> dict | None:
+    from passwork_client.crypto import decrypt_aes
+    try:
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f)
+        data = decrypt_aes(entry['data'], pwClient.snapshot_key)
+        if hashlib.sha256(data.encode()).hexdigest() != entry['sha256']:
+            return None
+        return json.loads(data)
+    except (OSError, ValueError, KeyError):
+        return None
+
+# Записать редакцию в постоянный кэш, существующая запись не перезаписывается
+def _snapshot_cache_set(pwClient: PassworkClient, path: str, snapshot: dict):
+    from passwork_client.crypto import encrypt_aes
+    data = json.dumps(snapshot)
+    entry = {'sha256': hashlib.sha256(data.encode()).hexdigest(), 'data': encrypt_aes(data, pwClient.snapshot_key)}
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    except OSError:
+        pass
+
+# Получить редакцию пароля в виде ответа сервера (поля зашифрованы), из постоянного кэша если есть
+@timed
+def get_item_snapshot(pwClient: PassworkClient, item_id: str, snapshot_id: str) -> dict:
+    path = _snapshot_cache_path(pwClient, item_id, snapshot_id)
+    if path is not None and (snapshot := _snapshot_cache_get(pwClient, path)) is not None:
+        record_cache('snapshots', True)
+        return snapshot
+    if path is not None:
+        record_cache('snapshots', False)
+    snapshot = pwClient.call("GET", f"/api/v1/items/{item_id}/snapshot/{snapshot_id}")
+    if path is not None:
+        _snapshot_cache_set(pwClient, path, snapshot)
+    return snapshot
+
+# Расшифровать редакцию пароля. При шифровании на стороне клиента нужен
+# vaultMasterKeyEncrypted пароля, его можно передать, чтобы не запрашивать пароль повторно
+@timed
+def decrypt_item_snapshot(pwClient: PassworkClient, item_id: str, snapshot: dict, vault_master_key: str | None = None) -> dict:
+    snapshot = copy.deepcopy(snapshot)
+    encrypted_key = ''
+    if pwClient.is_encrypt:
+        if vault_master_key is None:
+            vault_master_key = pwClient.get_item(item_id)['vaultMasterKeyEncrypted']
+        encrypted_key = pwClient.item_key(vault_master_key, snapshot['keyEncrypted'])
+    pwClient.decrypt_item(snapshot, encrypted_key)
+    pwClient.decrypt_item_customs(snapshot, encrypted_key)
+    return snapshot
+
 # Преобразование массива папок в путь
 def path_to_string(path: dict):
     pathStr=""
@@ -152,3 +1123,87 @@ def path_to_string(path: dict):
         pathStr+=p['name']+"/"
     return pathStr
 
+
+# Кэш расшифрованных паролей в памяти процесса: TTL, вытеснение LRU и
+# объединение одновременных запросов одного ключа в один запрос к серверу.
+# На диск ничего не пишется, при завершении процесса кэш очищается
+class SecretCache:
+
+    def __init__(self, ttl: float = 300, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Any, Future] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.clear)
+
+    # Получить значения по ключам, отсутствующие запросить одним вызовом fetch(keys) -> {key: value}
+    def get_many(self, keys: list, fetch: Callable[[list], dict]) -> dict:
+        found = {}
+        owned = []
+        waiting = {}
+
+        with self._lock:
+            now = time.monotonic()
+            for key in dict.fromkeys(keys):
+                entry = self._items.get(key)
+                if entry is not None and now - entry[0] <= self.ttl:
+                    self._items.move_to_end(key)
+                    found[key] = entry[1]
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    self._items.pop(key, None)
+                    self._inflight[key] = Future()
+                    owned.append(key)
+
+        record_cache('secrets', True, len(found) + len(waiting))
+        record_cache('secrets', False, len(owned))
+
+        if owned:
+            try:
+                fetched = fetch(owned)
+            except Exception as e:
+                with self._lock:
+                    futures = [self._inflight.pop(key) for key in owned]
+                for future in futures:
+                    future.set_exception(e)
+                raise
+
+            with self._lock:
+                now = time.monotonic()
+                resolved = []
+                missing = []
+                for key in owned:
+                    future = self._inflight.pop(key)
+                    if key not in fetched:
+                        missing.append(future)
+                        continue
+                    if self.ttl > 0:
+                        self._items[key] = (now, fetched[key])
+                        self._items.move_to_end(key)
+                    resolved.append((future, fetched[key]))
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+            for future, value in resolved:
+                future.set_result(value)
+            # Ожидающие отсутствующие ключи получают ошибку, а не ждут бесконечно
+            if missing:
+                error = AnsibleError(f'Не получены значения для {len(missing)} из {len(owned)} запрошенных ключей')
+                for future in missing:
+                    future.set_exception(error)
+                raise error
+            found.update((key, fetched[key]) for key in owned)
+
+        for key, future in waiting.items():
+            found[key] = future.result()
+
+        return {key: copy.deepcopy(found[key]) for key in keys}
+
+    # Очистить кэш, затирая содержимое закэшированных словарей
+    def clear(self):
+        with self._lock:
+            for _, value in self._items.values():
+                if isinstance(value, dict):
+                    value.clear()
+            self._items.clear()
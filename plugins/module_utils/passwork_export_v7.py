@@ -0,0 +1,139 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+from typing import Any, Iterator
+from ansible.errors import AnsibleError
+
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    HAS_ZSTANDARD = False
+
+# Поддерживаемые виды сжатия выгрузки
+COMPRESSIONS = ('gzip', 'zstd', 'none')
+
+
+# Проверить, что выбранное сжатие доступно
+def check_compression(compression: str):
+    if compression == 'zstd' and not HAS_ZSTANDARD:
+        raise AnsibleError('Для сжатия zstd нужен python пакет zstandard')
+
+
+# Сжать блок строк
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == 'gzip':
+        return gzip.compress(data)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+# Потоковая запись JSONL выгрузки. Строки сжимаются блоками по block_size строк:
+# каждый блок - отдельный gzip member / zstd frame, поэтому по смещению блока
+# из индекса можно прочитать одну запись, не распаковывая весь файл
+class JsonlBlockWriter:
+
+    def __init__(self, path: str, compression: str = 'gzip', block_size: int = 100, index_path: str | None = None):
+        check_compression(compression)
+        self.path = path
+        self.index_path = index_path
+        self.compression = compression
+        self.block_size = block_size
+        self.count = 0
+        self._block: list[bytes] = []
+        self._block_offset = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+        self._index = None
+        if index_path is not None:
+            fd, self._tmp_index_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)), suffix='.tmp')
+            self._index = os.fdopen(fd, 'w', encoding='utf-8')
+
+    # Записать одну запись, в индекс попадают поля index_fields и положение записи
+    def write(self, record: dict[str, Any], index_fields: dict[str, Any] | None = None):
+        self._block.append(json.dumps(record, ensure_ascii=False).encode() + b'\n')
+        if self._index is not None:
+            entry = dict(index_fields or {}, offset=self._block_offset, line=len(self._block) - 1)
+            self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.count += 1
+        if len(self._block) >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        self._file.write(_compress(b''.join(self._block), self.compression))
+        self._block = []
+        self._block_offset = self._file.tell()
+
+    # Дописать последний блок и атомарно переместить файлы на место
+    def close(self):
+        self._flush_block()
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        if self._index is not None:
+            self._index.close()
+            os.replace(self._tmp_index_path, self.index_path)
+
+    # Удалить незавершенные файлы при ошибке
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp_path)
+        if self._index is not None:
+            self._index.close()
+            os.remove(self._tmp_index_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+# Открыть поток распакованных данных выгрузки
+def _open_decompressed(f, compression: str):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=f)
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+    return f
+
+
+# Определить сжатие по расширению файла
+def compression_by_path(path: str) -> str:
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return 'none'
+
+
+# Потоковое чтение записей JSONL выгрузки (сжатой или нет) с постоянным расходом памяти
+def iter_jsonl(path: str, compression: str | None = None) -> Iterator[dict[str, Any]]:
+    compression = compression or compression_by_path(path)
+    check_compression(compression)
+    with open(path, 'rb') as f:
+        stream = io.TextIOWrapper(_open_decompressed(f, compression), encoding='utf-8')
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Прочитать одну запись выгрузки по записи индекса (смещение блока и номер строки в блоке)
+def read_indexed_record(path: str, index_entry: dict[str, Any], compression: str | None = None) -> dict[str, Any]:
+    compression = compression or compression_by_path(path)
+    check_compression(compression)
+    with open(path, 'rb') as f:
+        f.seek(index_entry['offset'])
+        stream = io.TextIOWrapper(_open_decompressed(f, compression), encoding='utf-8')
+        for number, line in enumerate(stream):
+            if number == index_entry['line']:
+                return json.loads(line)
+    raise AnsibleError(f'Запись не найдена в выгрузке {path}: {index_entry}')
@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import json
+import os
+import ssl
+import urllib.error
+import urllib.parse
+import urllib.request
+from passwork_common_v7 import TokenStoreMixin
+
+
+# Ошибка клиента, аналог passwork_client.exceptions.PassworkError
+class LightClientError(ValueError):
+
+    def __init__(self, message: str, code: str | None = None):
+        super().__init__(message)
+        self.code = code
+
+
+# Ошибка ответа API (4xx/5xx): поля и текст как у passwork_client.exceptions.PassworkResponseError,
+# code - HTTP статус
+class LightResponseError(ValueError):
+
+    def __init__(self, message: str, url: str | None = None, method: str | None = None, code: int | None = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.url = url
+        self.method = method
+
+    def __str__(self):
+        return f"Message: {self.message} \nUrl: {self.url} \nMethod: {self.method} \nCode: {self.code}"
+
+
+# Облегченный клиент Passwork на стандартной библиотеке (urllib) для вызовов без расшифровки:
+# папки, поиск, перемещение и удаление паролей, настройки, обновление токенов.
+# Запросы и разбор ответов повторяют PassworkClient.call, но без импорта requests и криптографии.
+# master_key передается только заголовком X-Master-Key-Hash: ключи пользователя не запрашиваются,
+# поэтому шифровать и расшифровывать пароли клиент не умеет (is_encrypt всегда False)
+class LightClient(TokenStoreMixin):
+
+    api_errors = (LightClientError, LightResponseError)
+
+    def __init__(self, host: str, verify_ssl: bool | str = True, token_store_path: str | None = None):
+        if not host:
+            raise LightClientError('Host must be specified', 'host_not_specified')
+        self.host = host.rstrip('/')
+        self.verify_ssl = verify_ssl
+        self.access_token = None
+        self.refresh_token = None
+        self.master_key = None
+        self.master_key_hash = None
+        self.is_encrypt = False
+        self._ssl_context = None
+        self._init_token_store(token_store_path)
+
+    def set_tokens(self, access_token: str | None, refresh_token: str | None):
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+
+    def set_master_key(self, master_key: str | None):
+        self.master_key = master_key or None
+        self.master_key_hash = hashlib.sha256(master_key.encode()).hexdigest() if master_key else None
+
+    # Контекст SSL по VERIFY_SSL: True - системные сертификаты, False - без проверки,
+    # строка - путь до файла или каталога сертификатов
+    def _context(self) -> ssl.SSLContext | None:
+        if not self.host.startswith('https:'):
+            return None
+        if self._ssl_context is None:
+            if self.verify_ssl is False:
+                self._ssl_context = ssl._create_unverified_context()
+            elif isinstance(self.verify_ssl, str) and os.path.isdir(self.verify_ssl):
+                self._ssl_context = ssl.create_default_context(capath=self.verify_ssl)
+            elif isinstance(self.verify_ssl, str):
+                self._ssl_context = ssl.create_default_context(cafile=self.verify_ssl)
+            else:
+                self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    # Отправить запрос, вернуть HTTP статус и тело ответа
+    def _send(self, method: str, url: str, data: bytes | None, headers: dict) -> tuple[int, bytes]:
+        request = urllib.request.Request(url, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, context=self._context()) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        self._record_response_size(len(body))
+        return status, body
+
+    # Разобрать ответ: base64 формат, ошибки API, истекший access токен
+    def _process_body(self, status: int, body: bytes, url: str, method: str):
+        result = json.loads(body or b'null')
+        if result and isinstance(result, dict) and result.get('format') == 'base64':
+            result = json.loads(base64.b64decode(result.get('content', '')).decode('utf-8'))
+        if status < 400:
+            return result
+        errors = result.get('errors', []) if isinstance(result, dict) else []
+        if any(err.get('code') == 'accessTokenExpired' for err in errors):
+            raise LightClientError('Access token expired', 'token_expired')
+        messages = [f"{err['field']} => {err['message']}" if err.get('field') else f"{err['message']}" for err in errors]
+        raise LightResponseError(str(messages), url, method, status)
+
+    # GET - параметры в строке запроса (списки как key[]), остальные методы - JSON в теле
+    def _api_call(self, method: str, endpoint: str, payload: dict | None, headers: dict | None):
+        method = method.upper()
+        url = f'{self.host}{endpoint}'
+        data = None
+        request_headers = {'Accept': 'application/json'}
+        if method == 'GET':
+            params = [
+                (f'{key}[]' if isinstance(value, (list, tuple)) else key, value)
+                for key, value in (payload or {}).items()
+                if value is not None
+            ]
+            if params:
+                url += ('&' if '?' in url else '?') + urllib.parse.urlencode(params, doseq=True)
+        else:
+            data = json.dumps(payload or {}).encode('utf-8')
+            request_headers['Content-Type'] = 'application/json'
+        if self.access_token:
+            request_headers['Authorization'] = f'Bearer {self.access_token}'
+        if self.master_key_hash:
+            request_headers['X-Master-Key-Hash'] = self.master_key_hash
+        request_headers.update(headers or {})
+        status, body = self._send(method, url, data, request_headers)
+        return self._process_body(status, body, url, method)
+
+    # Обновить пару токенов по refresh токену (/api/v1/sessions/refresh)
+    def update_tokens(self) -> dict:
+        if not self.refresh_token:
+            raise LightClientError('No refresh token available', 'no_refresh_token')
+        url = f'{self.host}/api/v1/sessions/refresh'
+        headers = {'Authorization': f'Bearer {self.access_token}', 'Content-Type': 'application/json'}
+        if self.master_key_hash:
+            headers['X-Master-Key-Hash'] = self.master_key_hash
+        data = json.dumps({'refreshToken': self.refresh_token}).encode('utf-8')
+        self.access_token = None
+        self.refresh_token = None
+        status, body = self._send('POST', url, data, headers)
+        if status >= 400:
+            raise LightClientError(f'Failed to refresh token: {status}', 'refresh_token_failed')
+        result = self._process_body(status, body, url, 'POST')
+        self.access_token = result['accessToken']
+        self.refresh_token = result['refreshToken']
+        return result
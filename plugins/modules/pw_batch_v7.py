@@ -0,0 +1,482 @@
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+from ansible.errors import AnsibleError
+from ansible.module_utils.basic import AnsibleModule
+from passwork_common_v7 import (
+  pw_login,
+  get_vault,
+  get_folder,
+  get_folder_by_id,
+  build_item_data,
+  invalidate_cache,
+  update_folder_index,
+  MAX_WORKERS
+)
+
+DOCUMENTATION = r'''
+---
+module: pw_batch
+
+short_description: Модуль для выполнения списка операций с паролями и папками passwork за одно соединение
+
+description:
+    - Операции выполняются с одним клиентом, сейфы и папки по имени определяются один раз на весь список.
+    - Аргументы операции могут ссылаться на результаты предыдущих операций строкой ${id} или ${id.поле}
+      (индексы списков - числа). Если строка состоит только из ссылки, подставляется значение как есть,
+      иначе ссылка заменяется текстом.
+    - Операция выполняется после операций, на которые ссылается или которые указаны в depends_on.
+      Независимые операции выполняются параллельно, не более max_workers одновременно.
+      При max_workers 1 операции выполняются по порядку списка.
+    - Операция, которая ищет папку по имени, созданной или измененной в этом же списке, должна ссылаться
+      на эту операцию (например folder_id ${id.id}) или указывать ее в depends_on.
+    - Ошибка операции отменяет зависящие от нее операции, с stop_on_error также все еще не начатые.
+    - "Операции и их аргументы в args:"
+    - item create - vault, folder или folder_id, name, login, url, description, tags, color, custom
+      (как pass_args модуля pw_pass_create_v7). Результат - айди пароля.
+    - item update - password_id, vault и изменяемые поля (как pass_args модуля pw_pass_update_v7).
+    - item move - password_id, vault, folder (имя) или folderId (как folder_args модуля pw_pass_move_v7).
+    - item delete, item get - password_id.
+    - folder create - vault, name, parent или parent_id (как folder_args модуля pw_folder_create_v7).
+    - folder update - folder_id либо vault и folder, изменяемые поля (как pw_folder_update_v7).
+    - folder move - folder_id, move_id (как pw_folder_move_v7).
+    - folder delete, folder get - folder_id либо vault и name.
+
+options:
+    api_server:
+        description: HTTP путь до API сервера https://example.ru/api/v4
+        required: true
+        type: str
+    access_token:
+        description: Access API токен
+        required: true
+        type: str
+    refresh_token:
+        description: Refresh API токен
+        required: false
+        type: str
+    master_key:
+        description: Ключ шифрования для шифрования на стороне клиента
+        required: false
+        type: str
+    operations:
+        description: Список операций
+        required: true
+        type: list
+        elements: dict
+        suboptions:
+            id:
+                description: Имя операции для ссылок и depends_on, по умолчанию номер операции в списке с 0
+                required: false
+                type: str
+            target:
+                description: Объект операции
+                required: true
+                type: str
+                choices: [item, folder]
+            action:
+                description: Операция
+                required: true
+                type: str
+                choices: [create, update, move, delete, get]
+            args:
+                description: Аргументы операции
+                required: false
+                type: dict
+                default: {}
+            password:
+                description: Пароль для item create и item update (скрывается в выводе, в отличие от args)
+                required: false
+                type: str
+            depends_on:
+                description: Операции, которые должны быть выполнены до этой
+                required: false
+                type: list
+                elements: str
+                default: []
+    max_workers:
+        description: Максимальное число одновременно выполняемых операций
+        required: false
+        type: int
+        default: 8
+    stop_on_error:
+        description: Не начинать новые операции после первой ошибки
+        required: false
+        type: bool
+        default: true
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+RETURN = r'''
+response:
+    description: Результаты в порядке operations (id, target, action, response либо failed или skipped и msg)
+    type: list
+    elements: dict
+    returned: always
+outputs:
+    description: Результаты выполненных операций по id
+    type: dict
+    returned: always
+'''
+
+# Ссылка на результат предыдущей операции: ${id} или ${id.поле.поле}
+REFERENCE_RE = re.compile(r'\$\{([\w-]+)((?:\.[\w-]+)*)\}')
+
+# Операции, которым нужна расшифровка или шифрование паролей (клиент passwork_client)
+CRYPTO_OPERATIONS = {('item', 'create'), ('item', 'update'), ('item', 'get')}
+
+
+# Айди операций, на которые ссылаются строки в value
+def _references(value: Any) -> set[str]:
+    if isinstance(value, str):
+        return {match.group(1) for match in REFERENCE_RE.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*map(_references, value.values()))
+    if isinstance(value, list):
+        return set().union(*map(_references, value))
+    return set()
+
+
+# Значение по ссылке: результат операции op_id и путь по его полям
+def _lookup(outputs: dict[str, Any], op_id: str, path: str) -> Any:
+    value = outputs[op_id]
+    for key in filter(None, path.split('.')):
+        if isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        elif isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            raise AnsibleError(f'Нет поля {key} в результате операции {op_id}')
+    return value
+
+
+# Подставить результаты предыдущих операций в аргументы, исходные аргументы не меняются
+def _resolve(value: Any, outputs: dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        if (match := REFERENCE_RE.fullmatch(value)) is not None:
+            return _lookup(outputs, match.group(1), match.group(2))
+        return REFERENCE_RE.sub(lambda match: str(_lookup(outputs, match.group(1), match.group(2))), value)
+    if isinstance(value, dict):
+        return {key: _resolve(item, outputs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, outputs) for item in value]
+    return value
+
+
+# Проверить операции и определить их зависимости: ссылаться можно только на предыдущие операции
+def _plan(operations: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    plan = []
+    seen = set()
+    for index, operation in enumerate(operations):
+        op_id = operation['id'] or str(index)
+        if op_id in seen:
+            raise AnsibleError(f'Повторяется id операции {op_id}')
+        depends_on = set(operation['depends_on']) | _references(operation['args'])
+        unknown = sorted(depends_on - seen)
+        if unknown:
+            raise AnsibleError(f'Операция {op_id} ссылается на неизвестные или следующие операции: {", ".join(unknown)}')
+        seen.add(op_id)
+        plan.append(dict(operation, id=op_id, depends_on=depends_on))
+    return plan
+
+
+# Сейфы и папки, найденные по имени в рамках списка: один запрос на каждое имя,
+# одновременные запросы одного имени ждут первый. Изменение папок сбрасывает найденные папки
+class _Locations:
+
+    def __init__(self, pwClient):
+        self.pwClient = pwClient
+        self._found: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple, fetch: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._found.get(key)
+            owner = future is None
+            if owner:
+                future = self._found[key] = Future()
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                with self._lock:
+                    self._found.pop(key, None)
+                future.set_exception(e)
+        return future.result()
+
+    def vault_id(self, vault: str) -> str:
+        vault_data = self._get(('vault', vault), lambda: get_vault(self.pwClient, vault))
+        if vault_data is None:
+            raise AnsibleError(f'Не найден сейф {vault}')
+        return vault_data['id']
+
+    def folder_id(self, folder: str, vault_id: str) -> str:
+        folder_data = self._get(('folder', vault_id, folder), lambda: get_folder(self.pwClient, folder, vault_id))
+        if folder_data is None:
+            raise AnsibleError(f'Не найдена папка {folder}')
+        return folder_data['id']
+
+    # Папки изменены: сбросить найденные папки и кэш поиска папок
+    def folders_changed(self, folder_id: str, deleted: bool = False):
+        with self._lock:
+            for key in [key for key in self._found if key[0] == 'folder']:
+                del self._found[key]
+        invalidate_cache(self.pwClient, 'folders/')
+        update_folder_index(self.pwClient, folder_id, deleted=deleted)
+
+
+# Обязательный аргумент операции
+def _required(args: dict[str, Any], name: str) -> Any:
+    value = args.pop(name, None)
+    if value is None:
+        raise AnsibleError(f'Не указан аргумент {name}')
+    return value
+
+
+# Айди папки: folder_id либо vault и имя папки из аргумента name_arg
+def _folder_id(locations: _Locations, args: dict[str, Any], name_arg: str) -> str:
+    if (folder_id := args.pop('folder_id', None)) is not None:
+        return folder_id
+    vault_id = locations.vault_id(_required(args, 'vault'))
+    return locations.folder_id(_required(args, name_arg), vault_id)
+
+
+def _item_create(pwClient, locations: _Locations, args: dict[str, Any]):
+    vault_id = locations.vault_id(_required(args, 'vault'))
+    folder_id = args.pop('folder_id', None)
+    if folder_id is None and (folder := args.pop('folder', None)) is not None:
+        folder_id = locations.folder_id(folder, vault_id)
+    return pwClient.create_item(build_item_data(args, vault_id, folder_id))
+
+
+def _item_update(pwClient, locations: _Locations, args: dict[str, Any]):
+    password_id = _required(args, 'password_id')
+    args['vaultId'] = locations.vault_id(_required(args, 'vault'))
+    return pwClient.update_item(password_id, args)
+
+
+def _item_move(pwClient, locations: _Locations, args: dict[str, Any]):
+    password_id = _required(args, 'password_id')
+    args['vaultId'] = locations.vault_id(_required(args, 'vault'))
+    if (folder := args.pop('folder', None)) is not None:
+        args['folderId'] = locations.folder_id(folder, args['vaultId'])
+    return pwClient.call("POST", f"/api/v1/items/{password_id}/move", payload = args)
+
+
+def _item_delete(pwClient, locations: _Locations, args: dict[str, Any]):
+    return pwClient.call("DELETE", f"/api/v1/items/{_required(args, 'password_id')}")
+
+
+def _item_get(pwClient, locations: _Locations, args: dict[str, Any]):
+    return pwClient.get_item(_required(args, 'password_id'))
+
+
+def _folder_create(pwClient, locations: _Locations, args: dict[str, Any]):
+    args['vaultId'] = locations.vault_id(_required(args, 'vault'))
+    parent_id = args.pop('parent_id', None)
+    parent = args.pop('parent', None)
+    if parent_id is None and parent is not None:
+        parent_id = locations.folder_id(parent, args['vaultId'])
+    if parent_id is not None:
+        args['parentFolderId'] = parent_id
+    response = pwClient.call("POST", "/api/v1/folders", payload = args)
+    locations.folders_changed(response['id'])
+    return response
+
+
+def _folder_update(pwClient, locations: _Locations, args: dict[str, Any]):
+    folder_id = _folder_id(locations, args, 'folder')
+    args.pop('parent', None)
+    response = pwClient.call("POST", f"/api/v1/folders/{folder_id}", payload = args)
+    locations.folders_changed(folder_id)
+    return response
+
+
+def _folder_move(pwClient, locations: _Locations, args: dict[str, Any]):
+    folder_id = _required(args, 'folder_id')
+    response = pwClient.call("POST", f"/api/v1/folders/{folder_id}/move", payload = {'targetFolderId': _required(args, 'move_id')})
+    locations.folders_changed(folder_id)
+    return response
+
+
+def _folder_delete(pwClient, locations: _Locations, args: dict[str, Any]):
+    folder_id = _folder_id(locations, args, 'name')
+    response = pwClient.call("DELETE", f"/api/v1/folders/{folder_id}")
+    locations.folders_changed(folder_id, deleted=True)
+    return response
+
+
+def _folder_get(pwClient, locations: _Locations, args: dict[str, Any]):
+    return get_folder_by_id(pwClient, _folder_id(locations, args, 'name'))
+
+
+OPERATIONS: dict[tuple[str, str], Callable] = {
+    ('item', 'create'): _item_create,
+    ('item', 'update'): _item_update,
+    ('item', 'move'): _item_move,
+    ('item', 'delete'): _item_delete,
+    ('item', 'get'): _item_get,
+    ('folder', 'create'): _folder_create,
+    ('folder', 'update'): _folder_update,
+    ('folder', 'move'): _folder_move,
+    ('folder', 'delete'): _folder_delete,
+    ('folder', 'get'): _folder_get,
+}
+
+
+# Выполнить операции: готовые (все зависимости выполнены) запускаются в пуле потоков,
+# после завершения каждой запускаются ставшие готовыми
+def _run_operations(pwClient, plan: list[dict[str, Any]], max_workers: int, stop_on_error: bool) -> tuple[list[dict], dict]:
+
+    locations = _Locations(pwClient)
+    outputs: dict[str, Any] = {}
+    results: list[dict[str, Any]] = [{'id': op['id'], 'target': op['target'], 'action': op['action']} for op in plan]
+    pending = dict(enumerate(plan))
+    running: dict[Future, int] = {}
+    not_done: set[str] = set()
+    stopped = False
+
+    def fail(index: int, msg: str, skipped: bool = False):
+        nonlocal stopped
+        results[index].update({'skipped' if skipped else 'failed': True, 'msg': msg})
+        not_done.add(plan[index]['id'])
+        stopped = stopped or stop_on_error
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for index, op in list(pending.items()):
+                if stopped or op['depends_on'] & not_done:
+                    del pending[index]
+                    failed = sorted(op['depends_on'] & not_done)
+                    fail(index, f'Не выполнена: ошибка в операции {failed[0]}' if failed else 'Не выполнена: остановлено после ошибки', True)
+                    continue
+                if not op['depends_on'] <= outputs.keys():
+                    continue
+                del pending[index]
+                try:
+                    args = _resolve(op['args'], outputs)
+                except AnsibleError as e:
+                    fail(index, str(e))
+                    continue
+                if op['password'] is not None:
+                    args['password'] = op['password']
+                running[executor.submit(OPERATIONS[(op['target'], op['action'])], pwClient, locations, args)] = index
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    fail(index, f'Ошибка операции {plan[index]["target"]} {plan[index]["action"]}: {e}')
+                    continue
+                outputs[plan[index]['id']] = response
+                results[index]['response'] = response
+
+    return results, outputs
+
+
+def _batch(
+    api_server: str,
+    access_token: str,
+    refresh_token: str | None,
+    master_key: str | None,
+    operations: list[dict[str, Any]],
+    max_workers: int,
+    stop_on_error: bool,
+):
+    plan = _plan(operations)
+    crypto = any((op['target'], op['action']) in CRYPTO_OPERATIONS for op in plan)
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=crypto) as pwClient:
+        return _run_operations(pwClient, plan, max_workers, stop_on_error)
+
+
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'max_workers': {'required': False, 'type': 'int', 'default': MAX_WORKERS},
+    'stop_on_error': {'required': False, 'type': 'bool', 'default': True},
+    'operations': {
+        'required': True,
+        'type': 'list',
+        'elements': 'dict',
+        'options': {
+            'id': {
+                'required': False,
+            },
+            'target': {
+                'required': True,
+                'choices': ['item', 'folder'],
+            },
+            'action': {
+                'required': True,
+                'choices': ['create', 'update', 'move', 'delete', 'get'],
+            },
+            'args': {
+                'required': False,
+                'type': 'dict',
+                'default': {},
+            },
+            'password': {
+                'required': False,
+                'no_log': True,
+            },
+            'depends_on': {
+                'required': False,
+                'type': 'list',
+                'elements': 'str',
+                'default': [],
+            },
+        },
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    operations: list[dict[str, Any]] = params['operations']
+    max_workers: int = params['max_workers']
+    stop_on_error: bool = params['stop_on_error']
+
+    response, outputs = _batch(api_server, access_token, refresh_token, master_key, operations, max_workers, stop_on_error)
+    failed = [op for op in response if op.get('failed') or op.get('skipped')]
+
+    result['response'] = response
+    result['outputs'] = outputs
+    result['changed'] = any(op['action'] != 'get' and 'response' in op for op in response)
+    if failed:
+        result['failed'] = True
+        result['msg'] = f'Не выполнено операций: {len(failed)} из {len(response)}'
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
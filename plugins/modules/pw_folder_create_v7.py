@@ -3,7 +3,9 @@ from ansible.module_utils.basic import AnsibleModule
 from passwork_common_v7 import (
   pw_login, 
   get_vault, 
-  get_folder
+  get_folder,
+  invalidate_cache,
+  update_folder_index
   )
 
 DOCUMENTATION = r'''
@@ -52,7 +54,7 @@ def _password_folder_create(
     master_key: str | None,
     folder_args: dict[str, Any]
 ):
-        with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+        with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
             
             vault = folder_args.pop('vault', None)
             vault_id = get_vault(pwClient,  vault)['id']
@@ -67,22 +69,42 @@ def _password_folder_create(
                     folder_args['parentFolderId'] = get_folder(pwClient,parent_folder,vault_id)['id']
                 
             response=pwClient.call("POST", f"/api/v1/folders", payload = folder_args)
+            invalidate_cache(pwClient, 'folders/')
+            update_folder_index(pwClient, response['id'])
             return response
         
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'folder_args': {
+        'required': True,
+        'type': 'raw',
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    folder_args: dict[str, Any] = params['folder_args']
+
+    result['response'] = _password_folder_create(api_server, access_token, refresh_token, master_key, folder_args)
+
+    return result
+
+
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'folder_args': {
-                'required': True,
-                'type': 'raw',
-            },
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
 
@@ -90,13 +112,7 @@ def main():
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    folder_args: dict[str, Any] = module.params['folder_args']
-
-    result['response'] = _password_folder_create(api_server, access_token, refresh_token, master_key, folder_args)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
@@ -3,7 +3,9 @@ from ansible.module_utils.basic import AnsibleModule
 from passwork_common_v7 import (
   pw_login, 
   get_vault, 
-  get_folder
+  get_folder,
+  invalidate_cache,
+  update_folder_index
   )
 from ansible.errors import AnsibleError
 DOCUMENTATION = r'''
@@ -53,25 +55,46 @@ def _password_folder_move(
     folder_id: str,
     move_id: str
 ):
-        with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+        with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
             
             body={}
             body['targetFolderId']=move_id
             response=pwClient.call("POST", f"/api/v1/folders/{folder_id}/move", payload = body)
+            invalidate_cache(pwClient, 'folders/')
+            update_folder_index(pwClient, folder_id)
             return response
         
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'folder_id': {'required': True, 'no_log': True},
+    'move_id': {'required': True, 'no_log': True},
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    folder_id: str | None = params['folder_id']
+    move_id: str | None = params['move_id']
+
+    result['response'] = _password_folder_move(api_server, access_token, refresh_token, master_key, folder_id,move_id)
+
+    return result
+
+
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'folder_id': {'required': True, 'no_log': True},
-            'move_id': {'required': True, 'no_log': True},
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
 
@@ -79,14 +102,7 @@ def main():
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    folder_id: str | None = module.params['folder_id']
-    move_id: str | None = module.params['move_id']
-
-    result['response'] = _password_folder_move(api_server, access_token, refresh_token, master_key, folder_id,move_id)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
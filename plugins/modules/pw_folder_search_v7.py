@@ -1,9 +1,14 @@
+from contextlib import closing
+from itertools import islice
 from typing import Any
 from ansible.module_utils.basic import AnsibleModule
 from passwork_common_v7 import (
   pw_login, 
   get_vault, 
-  get_folder 
+  get_folder,
+  iter_folders_search,
+  path_to_string,
+  PAGE_SIZE
   )
 
 DOCUMENTATION = r'''
@@ -33,6 +38,17 @@ options:
         description: Аргументы папки
         required: true
         type: dict
+    limit:
+        description:
+            - Максимальное число возвращаемых папок, поиск прекращается после его достижения
+            - Если задан, возвращается список найденных по имени папок (response.items), а не одна папка с точным совпадением имени
+        required: false
+        type: int
+    page_size:
+        description: Размер страницы при постраничном запросе результатов
+        required: false
+        type: int
+        default: 100
 
 author:
     - Ширяев Дмитрий (dshi@efsystem.ru)
@@ -51,31 +67,63 @@ def _password_folder_search(
     refresh_token: str,
     master_key: str | None,
     folder_args: dict[str, Any],
+    limit: int | None,
+    page_size: int,
 ):
 
-    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
 
         vault= folder_args.pop('vault', None)
         vault_id = get_vault(pwClient, vault)['id']
 
         folder_name= folder_args.pop('name', None)
-        response = get_folder(pwClient, folder_name, vault_id)
+        if limit is None:
+            return get_folder(pwClient, folder_name, vault_id)
+
+        with closing(iter_folders_search(pwClient, {'query': folder_name, 'vaultId': vault_id}, page_size, prefetch=True)) as folders:
+            response = {'items': list(islice(folders, limit))}
+
+        for folder in response['items']:
+            if 'path' in folder:
+                folder['pathStr'] = path_to_string(folder['path'])
 
         return response
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True, 'no_log': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'limit': {'required': False, 'type': 'int'},
+    'page_size': {'required': False, 'type': 'int', 'default': PAGE_SIZE},
+    'folder_args': {
+        'required': True,
+        'type': 'raw',
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    folder_args: dict[str, Any] = params['folder_args']
+    limit: int | None = params['limit']
+    page_size: int = params['page_size']
+
+    result['response'] = _password_folder_search(api_server, access_token, refresh_token, master_key, folder_args, limit, page_size)
+
+    return result
+
+
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True, 'no_log': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'folder_args': {
-                'required': True,
-                'type': 'raw',
-            },
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
 
@@ -83,13 +131,7 @@ def main():
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    folder_args: dict[str, Any] = module.params['folder_args']
-
-    result['response'] = _password_folder_search(api_server, access_token, refresh_token, master_key, folder_args)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
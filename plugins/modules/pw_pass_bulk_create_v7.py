@@ -0,0 +1,210 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from ansible.module_utils.basic import AnsibleModule
+from passwork_common_v7 import (
+  pw_login,
+  get_vault,
+  get_folder,
+  build_item_data,
+  MAX_WORKERS
+)
+
+DOCUMENTATION = r'''
+---
+module: pw_pass_bulk_create
+
+short_description: Модуль для массового создания паролей в passwork
+
+description:
+    - Сейфы и папки определяются один раз на каждое уникальное значение.
+    - Пароли создаются параллельно, не более max_workers одновременных запросов.
+    - Ошибка создания одного пароля не прерывает создание остальных.
+
+options:
+    api_server:
+        description: HTTP путь до API сервера https://example.ru/api/v4
+        required: true
+        type: str
+    access_token:
+        description: Access API токен
+        required: true
+        type: str
+    refresh_token:
+        description: Refresh API токен
+        required: false
+        type: str
+    master_key:
+        description: Ключ шифрования для шифрования на стороне клиента
+        required: false
+        type: str
+    items:
+        description: Список аргументов паролей, поля как у pass_args модуля pw_pass_create_v7
+        required: true
+        type: list
+        elements: dict
+    max_workers:
+        description: Максимальное число параллельных запросов к API
+        required: false
+        type: int
+        default: 8
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+RETURN = r'''
+response:
+    description: Результаты создания в порядке items (name, vault, folder, id либо failed и msg)
+    type: list
+    elements: dict
+    returned: always
+created:
+    description: Число созданных паролей
+    type: int
+    returned: always
+'''
+
+
+# Определить айди сейфов и папок, по одному запросу на каждое уникальное значение
+def _resolve_locations(pwClient, items: list[dict[str, Any]]) -> dict[tuple, tuple[str, str | None] | str]:
+
+    locations = {}
+    for vault, folder in dict.fromkeys((item['vault'], item.get('folder')) for item in items):
+        vault_data = get_vault(pwClient, vault)
+        if vault_data is None:
+            locations[(vault, folder)] = f'Не найден сейф {vault}'
+            continue
+        if folder is None:
+            locations[(vault, folder)] = (vault_data['id'], None)
+            continue
+        folder_data = get_folder(pwClient, folder, vault_data['id'])
+        if folder_data is None:
+            locations[(vault, folder)] = f'Не найдена папка {folder} в сейфе {vault}'
+            continue
+        locations[(vault, folder)] = (vault_data['id'], folder_data['id'])
+    return locations
+
+
+def _password_bulk_create(
+    api_server: str,
+    access_token: str,
+    refresh_token: str | None,
+    master_key: str | None,
+    items: list[dict[str, Any]],
+    max_workers: int,
+):
+    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+
+        locations = _resolve_locations(pwClient, items)
+
+        def create(item: dict[str, Any]) -> dict[str, Any]:
+            result = {'name': item['name'], 'vault': item['vault'], 'folder': item.get('folder')}
+            location = locations[(item['vault'], item.get('folder'))]
+            if isinstance(location, str):
+                return dict(result, failed=True, msg=location)
+            try:
+                result['id'] = pwClient.create_item(build_item_data(item, *location))
+            except Exception as e:
+                return dict(result, failed=True, msg=f'Ошибка создания пароля: {e}')
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(create, items))
+
+
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'max_workers': {'required': False, 'type': 'int', 'default': MAX_WORKERS},
+    'items': {
+        'required': True,
+        'type': 'list',
+        'elements': 'dict',
+        'options': {
+            'vault': {
+                'required': True,
+            },
+            'name': {
+                'required': True,
+            },
+            'url': {
+                'required': False,
+            },
+            'login': {
+                'required': True,
+            },
+            'description': {
+                'required': False,
+            },
+            'folder': {
+                'required': False,
+                'default': None,
+            },
+            'password': {
+                'required': True,
+                'no_log': True,
+            },
+            'tags': {
+                'required': False,
+                'type': 'list',
+                'elements': 'str',
+                'default': [],
+            },
+            'color': {
+                'required': False,
+                'type': 'int',
+            },
+            'custom': {
+                'required': False,
+                'type': 'list',
+                'elements': 'dict',
+                'default': [],
+            },
+        },
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    items: list[dict[str, Any]] = params['items']
+    max_workers: int = params['max_workers']
+
+    response = _password_bulk_create(api_server, access_token, refresh_token, master_key, items, max_workers)
+    failed = [item for item in response if item.get('failed')]
+
+    result['response'] = response
+    result['created'] = len(response) - len(failed)
+    result['changed'] = result['created'] > 0
+    if failed:
+        result['failed'] = True
+        result['msg'] = f'Не удалось создать паролей: {len(failed)} из {len(response)}'
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
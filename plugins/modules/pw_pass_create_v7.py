@@ -3,7 +3,8 @@ from ansible.module_utils.basic import AnsibleModule
 from passwork_common_v7 import (
   pw_login, 
   get_vault, 
-  get_folder
+  get_folder,
+  build_item_data
 )
 
 DOCUMENTATION = r'''
@@ -61,100 +62,98 @@ def _password_password_create(
             folder= pass_args.pop('folder', None)
             folder_id = get_folder(pwClient,folder,vault_id)['id']
 
-            custom_fields = pass_args.pop('custom', None)
-            tags = pass_args.pop('tags', None)
-            name = pass_args.pop('name', None)
-            login = pass_args.pop('login', None)
-            passw = pass_args.pop('password', None)
-            url = pass_args.pop('url', None)
-            description = pass_args.pop('description', None)
-            color = pass_args.pop('color', None)
-
-            item_data = {
-                "vaultId": vault_id,
-                "name": name,
-                "login": login,
-                "password": passw,
-                "url": url,
-                "description": description,
-                "color": color,
-                "tags": tags,
-                "customs": custom_fields,
-                "folderId": folder_id
-            }
+            item_data = build_item_data(pass_args, vault_id, folder_id)
 
             response = pwClient.create_item(item_data)
 
             return response
         
 
-def main():
-
-    module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'pass_args': {
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'pass_args': {
+        'required': True,
+        'type': 'dict',
+        'no_log': True,
+        'options': {
+            'vault': {
+                'required': True,
+            },
+            'name': {
+                'required': True,
+            },
+            'url': {
+                'required': False,
+            },
+            'login': {
+                'required': True,
+            },
+            'description': {
+                'required': False,
+            },
+            'folder': {
+                'required': False,
+                'deafault': None,
+            },
+            'password': {
                 'required': True,
-                'type': 'dict',
                 'no_log': True,
-                'options': {
-                    'vault': {
-                        'required': True,
-                    },
-                    'name': {
-                        'required': True,
-                    },
-                    'url': {
-                        'required': False,
-                    },
-                    'login': {
-                        'required': True,
-                    },
-                    'description': {
-                        'required': False,
-                    },
-                    'folder': {
-                        'required': False,
-                        'deafault': None,
-                    },
-                    'password': {
-                        'required': True,
-                        'no_log': True,
-                    },
-                    'shortcutId': {
-                        'required': False,
-                    },
-                    'tags': {
-                        'required': False,
-                        'type': 'list',
-                        'elements': 'str',
-                        'default': [],
-                    },
-                    'snapshot': {
-                        'required': False,
-                    },
-                    'color': {
-                        'required': False,
-                        'type': 'int',
-                    },
-                    'custom': {
-                        'required': False,
-                        'type': 'list',
-                        'elements': 'dict',
-                        'default': [],
-                    },
-                    'attachments': {
-                        'required': False,
-                        'type': 'list',
-                        'elements': 'dict',
-                        'default': [],
-                    },
-                },
+            },
+            'shortcutId': {
+                'required': False,
+            },
+            'tags': {
+                'required': False,
+                'type': 'list',
+                'elements': 'str',
+                'default': [],
+            },
+            'snapshot': {
+                'required': False,
+            },
+            'color': {
+                'required': False,
+                'type': 'int',
+            },
+            'custom': {
+                'required': False,
+                'type': 'list',
+                'elements': 'dict',
+                'default': [],
+            },
+            'attachments': {
+                'required': False,
+                'type': 'list',
+                'elements': 'dict',
+                'default': [],
             },
         },
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    pass_args: dict[str, Any] = params['pass_args']
+
+    result['response'] = _password_password_create(api_server, access_token, refresh_token, master_key, pass_args)
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
 
@@ -162,13 +161,7 @@ def main():
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    pass_args: dict[str, Any] = module.params['pass_args']
-
-    result['response'] = _password_password_create(api_server, access_token, refresh_token, master_key, pass_args)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
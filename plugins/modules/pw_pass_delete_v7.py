@@ -48,69 +48,65 @@ response:
 
 def _delete_password(api_server:str,access_token:str,refresh_token:str,master_key:str, password_id: str
 ):
-    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
         
         response = pwClient.call("DELETE", f"/api/v1/items/{password_id}")
         return response
 
-def main():
-
-    module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'password_id': {'required': False, 'no_log': True},
-            'search_args': {
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'password_id': {'required': False, 'no_log': True},
+    'search_args': {
+        'required': False,
+        'type': 'dict',
+        'options': {
+            'query': {
+                'required': True,
+            },
+            'tags': {
                 'required': False,
-                'type': 'dict',
-                'options': {
-                    'query': {
-                        'required': True,
-                    },
-                    'tags': {
-                        'required': False,
-                        'type': 'list',
-                        'default': [],
-                    },
-                    'colors': {
-                        'required': False,
-                        'type': 'list',
-                        'elements': 'int',
-                        'default': [],
-                    },
-                    'vault': {
-                        'required': False,
-                        'default': None,
-                    },
-                    'includeShared': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                    'includeShortcuts': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                },
-
+                'type': 'list',
+                'default': [],
+            },
+            'colors': {
+                'required': False,
+                'type': 'list',
+                'elements': 'int',
+                'default': [],
+            },
+            'vault': {
+                'required': False,
+                'default': None,
+            },
+            'includeShared': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
+            },
+            'includeShortcuts': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
             },
         },
-        supports_check_mode=True,
-    )
 
-    result = {'changed': False, 'message': ''}
-    if module.check_mode:
-        module.exit_json(**result)
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    password_id: dict | None = module.params['password_id']
-    search_args: dict[str, Any] | None = module.params['search_args']
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    password_id: dict | None = params['password_id']
+    search_args: dict[str, Any] | None = params['search_args']
 
     if not password_id and not search_args:
         raise AnsibleError('Нужно указать либо "password_id", либо "search_args"')
@@ -119,6 +115,22 @@ def main():
 
         result['response'] =_delete_password(api_server, access_token,refresh_token, master_key, password_id)
         
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
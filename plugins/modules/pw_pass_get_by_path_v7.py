@@ -1,3 +1,4 @@
+from typing import Any
 from ansible.module_utils.basic import AnsibleModule
 from passwork_common_v7 import  get_password_by_path, pw_login
 
@@ -29,6 +30,15 @@ options:
         description: Путь до пароля
         required: true
         type: str
+    resolve_mode:
+        description:
+            - Способ поиска пароля.
+            - search - поиск по названию пароля во всем Passwork и фильтрация по пути.
+            - index - сейф и папка находятся через кэшируемый индекс папок, запрашиваются только пароли этой папки.
+        required: false
+        type: str
+        choices: [search, index]
+        default: search
 
 author:
     - Ширяев Дмитрий (dshi@efsystem.ru)
@@ -41,17 +51,37 @@ response:
     returned: always
 '''
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'path': {'required': True, 'no_log': True},
+    'resolve_mode': {'required': False, 'choices': ['search', 'index'], 'default': 'search'},
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    path: str = params['path']
+    resolve_mode: str = params['resolve_mode']
+
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
+        result['response'] = get_password_by_path(pwClient,path,resolve_mode)
+
+    return result
+
 
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'path': {'required': True, 'no_log': True}
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
 
@@ -63,15 +93,7 @@ def main():
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    path: str = module.params['path']
-
-    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
-        result['response'] = get_password_by_path(pwClient,path)
-
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
@@ -1,6 +1,6 @@
 from typing import Any
 from ansible.module_utils.basic import AnsibleModule
-from passwork_common_v7 import pw_login
+from passwork_common_v7 import pw_login, get_item_snapshot
 
 
 DOCUMENTATION = r'''
@@ -9,6 +9,11 @@ module: pw_pass_get_snapshots_by_id
 
 short_description: Модуль для получения конкретной редакции пароля в Passwork
 
+description:
+    - Редакции не меняются, поэтому полученная редакция сохраняется в постоянный кэш и повторно не запрашивается.
+    - Кэш шифруется ключом master_key или переменной окружения PASSWORK_SNAPSHOT_CACHE_KEY, без ключа кэш не используется.
+    - Каталог кэша задается переменной окружения PASSWORK_SNAPSHOT_CACHE_DIR.
+
 options:
     api_server:
         description: HTTP путь до API сервера https://example.ru/api/v4
@@ -56,35 +61,47 @@ def _get_snapshot_by_id(
 ):
     with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
 
-        response = pwClient.call("GET", f"/api/v1/items/{password_id}/snapshot/{snapshot_id}")
+        response = get_item_snapshot(pwClient, password_id, snapshot_id)
         
         return response
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'password_id': {'required': True, 'no_log': True},
+    'snapshot_id': {'required': True, 'no_log': True},
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    password_id: str = params['password_id']
+    snapshot_id: str = params['snapshot_id']
+
+    result['response'] = _get_snapshot_by_id(api_server,access_token,refresh_token,master_key,password_id,snapshot_id)
+
+    return result
+
+
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'password_id': {'required': True, 'no_log': True},
-            'snapshot_id': {'required': True, 'no_log': True},
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
     result = {'changed': False, 'message': ''}
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    password_id: str = module.params['password_id']
-    snapshot_id: str = module.params['snapshot_id']
-
-    result['response'] = _get_snapshot_by_id(api_server,access_token,refresh_token,master_key,password_id,snapshot_id)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
@@ -1,6 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
+from ansible.errors import AnsibleError
 from ansible.module_utils.basic import AnsibleModule
-from passwork_common_v7 import pw_login
+from passwork_common_v7 import (
+  pw_login,
+  get_item_snapshot,
+  decrypt_item_snapshot,
+  MAX_WORKERS
+)
 
 DOCUMENTATION = r'''
 ---
@@ -29,6 +36,28 @@ options:
         description: ID пароля, чьи редакции необходимо получить
         required: true
         type: dict
+    history:
+        description:
+            - Получить редакции параллельно и вернуть историю изменений по полям в history.
+            - Редакции упорядочиваются по createdAt, каждая сравнивается с предыдущей.
+            - Полученные редакции сохраняются в постоянный зашифрованный кэш, повторно запрашиваются только новые редакции.
+        required: false
+        type: bool
+        default: false
+    last:
+        description: Количество последних редакций для истории, по умолчанию все
+        required: false
+        type: int
+    show_secrets:
+        description: Показывать в истории значения пароля и дополнительных полей, иначе только факт изменения
+        required: false
+        type: bool
+        default: false
+    max_workers:
+        description: Максимальное число параллельных запросов к API
+        required: false
+        type: int
+        default: 8
 
 author:
     - Ширяев Дмитрий (dshi@efsystem.ru)
@@ -39,51 +68,145 @@ response:
     description: Ответ от сервера
     type: dict
     returned: always
+history:
+    description: История изменений, для каждой редакции snapshot_id, createdAt и changes (поле -> from/to)
+    type: list
+    elements: dict
+    returned: when history=true
 '''
 
+# Поля, по которым строится история изменений
+HISTORY_FIELDS = ('name', 'login', 'password', 'url', 'description', 'color', 'tags', 'customs')
+# Поля, значения которых не выводятся без show_secrets
+SECRET_FIELDS = ('password', 'customs')
+
+
+# Изменения полей редакции относительно предыдущей
+def _snapshot_changes(previous: dict | None, snapshot: dict, show_secrets: bool) -> dict[str, Any]:
+    changes = {}
+    for field in HISTORY_FIELDS:
+        old = previous.get(field) if previous is not None else None
+        new = snapshot.get(field)
+        if previous is not None and old == new:
+            continue
+        if field in SECRET_FIELDS and not show_secrets:
+            changes[field] = {'changed': True}
+        else:
+            changes[field] = {'from': old, 'to': new}
+    return changes
+
+
+# Получить редакции параллельно и построить историю изменений
+def _snapshot_history(pwClient, password_id: str, snapshots: list[dict], last: int | None, show_secrets: bool, max_workers: int) -> list[dict]:
+
+    snapshots = sorted(snapshots, key=lambda snapshot: snapshot.get('createdAt') or '')
+    # Для последних N редакций берется еще одна, предыдущая, чтобы сравнить первую из них
+    selected = snapshots[-(last + 1):] if last else snapshots
+    skip_first = bool(last) and len(snapshots) > last
+
+    try:
+        vault_master_key = pwClient.get_item(password_id)['vaultMasterKeyEncrypted'] if pwClient.is_encrypt else None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            details = list(executor.map(
+                lambda snapshot: decrypt_item_snapshot(
+                    pwClient,
+                    password_id,
+                    get_item_snapshot(pwClient, password_id, snapshot['id']),
+                    vault_master_key,
+                ),
+                selected,
+            ))
+    except Exception as e:
+        raise AnsibleError(f'Ошибка получения редакций пароля: {e}')
+
+    history = []
+    previous = None
+    for snapshot, detail in zip(selected, details):
+        history.append({
+            'snapshot_id': snapshot['id'],
+            'createdAt': snapshot.get('createdAt'),
+            'changes': _snapshot_changes(previous, detail, show_secrets),
+        })
+        previous = detail
+    return history[1:] if skip_first else history
+
 def _get_snapshots(
     api_server: str,
     access_token: str,
     refresh_token: str,
     master_key: str | None,
     password_id: str,
+    history: bool = False,
+    last: int | None = None,
+    show_secrets: bool = False,
+    max_workers: int = MAX_WORKERS,
 ):
     
     with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
 
         response = pwClient.call("GET", f"/api/v1/items/{password_id}/snapshots")
+        if not history:
+            return response, None
 
-        return response
+        snapshots = response['items'] if isinstance(response, dict) else response
+        return response, _snapshot_history(pwClient, password_id, snapshots, last, show_secrets, max_workers)
 
-def main():
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'password_id': {'required': False, 'no_log': True},
+    'history': {'required': False, 'type': 'bool', 'default': False},
+    'last': {'required': False, 'type': 'int'},
+    'show_secrets': {'required': False, 'type': 'bool', 'default': False},
+    'max_workers': {'required': False, 'type': 'int', 'default': MAX_WORKERS},
+}
 
-    module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'password_id': {'required': False, 'no_log': True},
-        },
-        supports_check_mode=True,
-    )
-    result = {'changed': False, 'message': ''}
-    if module.check_mode:
-        module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    password_id: dict[str, Any] = module.params['password_id']
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    password_id: dict[str, Any] = params['password_id']
+
+    history: bool = params['history']
+    last: int | None = params['last']
+    show_secrets: bool = params['show_secrets']
+    max_workers: int = params['max_workers']
 
-    result['response'] = _get_snapshots(
+    result['response'], snapshot_history = _get_snapshots(
             api_server,
             access_token,
             refresh_token,
             master_key,
             password_id,
+            history,
+            last,
+            show_secrets,
+            max_workers,
         )
+    if snapshot_history is not None:
+        result['history'] = snapshot_history
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
@@ -59,63 +59,61 @@ def _get_password(
         response=pwClient.get_item(password_id)
         return response
     
-def main():
 
-    module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'password_id': {'required': False, 'no_log': True},
-            'search_args': {
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'password_id': {'required': False, 'no_log': True},
+    'search_args': {
+        'required': False,
+        'type': 'dict',
+        'options': {
+            'query': {
+                'required': True,
+            },
+            'tags': {
                 'required': False,
-                'type': 'dict',
-                'options': {
-                    'query': {
-                        'required': True,
-                    },
-                    'tags': {
-                        'required': False,
-                        'type': 'list',
-                        'default': [],
-                    },
-                    'colors': {
-                        'required': False,
-                        'type': 'list',
-                        'elements': 'int',
-                        'default': [],
-                    },
-                    'vault': {
-                        'required': False,
-                        'default': None,
-                    },
-                    'includeShared': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                    'includeShortcuts': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                },
-
+                'type': 'list',
+                'default': [],
+            },
+            'colors': {
+                'required': False,
+                'type': 'list',
+                'elements': 'int',
+                'default': [],
+            },
+            'vault': {
+                'required': False,
+                'default': None,
+            },
+            'includeShared': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
+            },
+            'includeShortcuts': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
             },
         },
-        supports_check_mode=True,
-    )
-    result = {'changed': False, 'message': ''}
-    if module.check_mode:
-        module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str = module.params['refresh_token']
-    master_key: str | None = module.params.get('master_key')
-    search_args: str = module.params['search_args']
-    password_id: dict[str, Any] = module.params['password_id']
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str = params['refresh_token']
+    master_key: str | None = params.get('master_key')
+    search_args: str = params['search_args']
+    password_id: dict[str, Any] = params['password_id']
 
     if not password_id and not search_args:
         raise AnsibleError('Нужно указать "password_id".')
@@ -123,6 +121,20 @@ def main():
     if password_id:
         result['response'] = _get_password(api_server, access_token,refresh_token, master_key, password_id)
 
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
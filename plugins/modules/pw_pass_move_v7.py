@@ -48,7 +48,7 @@ response:
 
 def _move_password(api_server:str,access_token:str,refresh_token:str,master_key:str, password_id: str, folder_args: dict[str, Any]
 ):
-    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
 
         vault = folder_args.pop('vault', None)
         vault_id = get_vault(pwClient,  vault)['id']
@@ -57,33 +57,29 @@ def _move_password(api_server:str,access_token:str,refresh_token:str,master_key:
         response = pwClient.call("POST", f"/api/v1/items/{password_id}/move", payload = folder_args)
         return response
 
-def main():
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'password_id': {'required': False, 'no_log': True},
+    'folder_args': {
+        'required': True,
+        'type': 'raw',
+    },
+}
 
-    module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'password_id': {'required': False, 'no_log': True},
-            'folder_args': {
-                'required': True,
-                'type': 'raw',
-            },
-        },
-        supports_check_mode=True,
-    )
 
-    result = {'changed': False, 'message': ''}
-    if module.check_mode:
-        module.exit_json(**result)
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    password_id: dict | None = module.params['password_id']
-    folder_args: dict[str, Any] = module.params['folder_args']
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    password_id: dict | None = params['password_id']
+    folder_args: dict[str, Any] = params['folder_args']
 
     if not password_id:
         raise AnsibleError('Нужно указать "password_id".')
@@ -92,6 +88,22 @@ def main():
 
         result['response'] =_move_password(api_server, access_token,refresh_token, master_key,password_id , folder_args)
         
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
@@ -59,7 +59,7 @@ def _get_snapshot_by_id(
         vault_id = get_vault(pwClient, vault)['id']
 
         folder= search_args.pop('folder', None)
-        folder_id=get_folder(pwClient, folder, vault_id,None)['id']
+        folder_id=get_folder(pwClient, folder, vault_id)['id']
         
         snap_name= search_args.pop('query', None)
 
@@ -73,50 +73,62 @@ def _get_snapshot_by_id(
         
         return response
 
-def main():
-
-    module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'search_args': {
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'search_args': {
+        'required': True,
+        'type': 'dict',
+        'options': {
+            'query': {
+                'required': True,
+            },
+            'tags': {
+                'required': False,
+                'type': 'list',
+                'default': [],
+            },
+            'vault': {
+                'required': False,
+                'default': None,
+            },
+            'folder': {
                 'required': True,
-                'type': 'dict',
-                'options': {
-                    'query': {
-                        'required': True,
-                    },
-                    'tags': {
-                        'required': False,
-                        'type': 'list',
-                        'default': [],
-                    },
-                    'vault': {
-                        'required': False,
-                        'default': None,
-                    },
-                    'folder': {
-                        'required': True,
-                    },
-                },
-
             },
         },
+
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    search_args: str = params['search_args']
+
+    result['response'] = _get_snapshot_by_id(api_server,access_token,refresh_token,master_key,search_args)
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
     result = {'changed': False, 'message': ''}
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    search_args: str = module.params['search_args']
-
-    result['response'] = _get_snapshot_by_id(api_server,access_token,refresh_token,master_key,search_args)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
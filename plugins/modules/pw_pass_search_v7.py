@@ -1,8 +1,12 @@
+from contextlib import closing
+from itertools import islice
 from typing import Any
 from ansible.module_utils.basic import AnsibleModule
 from passwork_common_v7 import (
   get_vault,
-  pw_login
+  pw_login,
+  iter_items_search,
+  PAGE_SIZE
 )
 
 DOCUMENTATION = r'''
@@ -32,6 +36,15 @@ options:
         description: Аргументы поиска пароля
         required: true
         type: dict
+    limit:
+        description: Максимальное число возвращаемых паролей, поиск прекращается после его достижения
+        required: false
+        type: int
+    page_size:
+        description: Размер страницы при постраничном запросе результатов
+        required: false
+        type: int
+        default: 100
 
 author:
     - Ширяев Дмитрий (dshi@efsystem.ru)
@@ -51,74 +64,92 @@ def _search_passwords(
     refresh_token: str,
     master_key: str | None,
     search_args: dict[str, Any],
+    limit: int | None,
+    page_size: int,
 ):
-    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
 
         vault_name = search_args.pop('vault')
         search_args['vaultId'] = get_vault(pwClient, vault_name)['id']
-        
-        response= pwClient.call("GET", f"/api/v1/items/search",payload=search_args)
+
+        with closing(iter_items_search(pwClient, search_args, page_size, prefetch=True)) as passwords:
+            response = {'items': list(islice(passwords, limit))}
 
         return response
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'limit': {'required': False, 'type': 'int'},
+    'page_size': {'required': False, 'type': 'int', 'default': PAGE_SIZE},
+    'search_args': {
+        'required': True,
+        'type': 'dict',
+        'options': {
+            'query': {
+                'required': True,
+            },
+            'tags': {
+                'required': False,
+                'type': 'list',
+                'default': [],
+            },
+            'colors': {
+                'required': False,
+                'type': 'list',
+                'elements': 'int',
+                'default': [],
+            },
+            'vault': {
+                'required': False,
+                'default': None,
+            },
+            'includeShared': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
+            },
+            'includeShortcuts': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
+            },
+        },
+
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    search_args: str = params['search_args']
+    limit: int | None = params['limit']
+    page_size: int = params['page_size']
+
+    result['response'] = _search_passwords(api_server,access_token,refresh_token,master_key,search_args,limit,page_size)
+
+    return result
+
 
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'search_args': {
-                'required': True,
-                'type': 'dict',
-                'options': {
-                    'query': {
-                        'required': True,
-                    },
-                    'tags': {
-                        'required': False,
-                        'type': 'list',
-                        'default': [],
-                    },
-                    'colors': {
-                        'required': False,
-                        'type': 'list',
-                        'elements': 'int',
-                        'default': [],
-                    },
-                    'vault': {
-                        'required': False,
-                        'default': None,
-                    },
-                    'includeShared': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                    'includeShortcuts': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                },
-
-            },
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
     result = {'changed': False, 'message': ''}
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    search_args: str = module.params['search_args']
-
-    result['response'] = _search_passwords(api_server,access_token,refresh_token,master_key,search_args)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
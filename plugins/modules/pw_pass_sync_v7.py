@@ -0,0 +1,293 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from ansible.errors import AnsibleError
+from ansible.module_utils.basic import AnsibleModule
+from passwork_common_v7 import (
+  pw_login,
+  get_vault,
+  get_folder,
+  get_folder_passwords,
+  get_items,
+  build_item_data,
+  MAX_WORKERS
+)
+
+DOCUMENTATION = r'''
+---
+module: pw_pass_sync
+
+short_description: Модуль для приведения паролей папки к заданному состоянию
+
+description:
+    - Текущее состояние папки запрашивается один раз, затем для каждого пароля вычисляется разница по полям.
+    - Создаются только отсутствующие пароли, обновляются только пароли с изменившимися полями.
+    - Пароли сопоставляются по названию, поля со значением null не сравниваются.
+    - Запросы на запись выполняются параллельно, не более max_workers одновременно.
+    - В режиме проверки (--check) разница вычисляется и возвращается так же, но запросы на запись не выполняются.
+
+options:
+    api_server:
+        description: HTTP путь до API сервера https://example.ru/api/v4
+        required: true
+        type: str
+    access_token:
+        description: Access API токен
+        required: true
+        type: str
+    refresh_token:
+        description: Refresh API токен
+        required: false
+        type: str
+    master_key:
+        description: Ключ шифрования для шифрования на стороне клиента
+        required: false
+        type: str
+    vault:
+        description: Название сейфа
+        required: true
+        type: str
+    folder:
+        description: Название папки, если не указана - корень сейфа
+        required: false
+        type: str
+    items:
+        description: Желаемый список паролей папки, поля как у pass_args модуля pw_pass_create_v7 (без vault и folder)
+        required: true
+        type: list
+        elements: dict
+    purge:
+        description: Удалять пароли папки, отсутствующие в items
+        required: false
+        type: bool
+        default: false
+    max_workers:
+        description: Максимальное число параллельных запросов к API
+        required: false
+        type: int
+        default: 8
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+RETURN = r'''
+created:
+    description: Названия созданных паролей (в режиме проверки - паролей, которые будут созданы)
+    type: list
+    elements: str
+    returned: always
+updated:
+    description: Названия обновленных паролей и список изменившихся полей (в режиме проверки - которые будут обновлены)
+    type: dict
+    returned: always
+deleted:
+    description: Названия удаленных паролей (в режиме проверки - которые будут удалены)
+    type: list
+    elements: str
+    returned: always
+'''
+
+# Режим проверки: разница вычисляется без записи (см. PassworkActionBase)
+SUPPORTS_CHECK_MODE = True
+
+# Поля пароля, которые сравниваются: аргумент модуля -> поле ответа сервера
+SYNC_FIELDS = {
+    'login': 'login',
+    'password': 'password',
+    'url': 'url',
+    'description': 'description',
+    'color': 'color',
+    'tags': 'tags',
+    'custom': 'customs',
+}
+
+
+# Привести значение поля к виду, пригодному для сравнения
+def _normalize(field: str, value: Any) -> Any:
+    if field == 'tags':
+        return sorted(value or [])
+    if field == 'custom':
+        return [
+            {'name': custom.get('name'), 'type': custom.get('type'), 'value': custom.get('value')}
+            for custom in value or []
+        ]
+    if value == '':
+        return None
+    return value
+
+
+# Список полей, отличающихся от желаемого состояния
+def _diff_fields(desired: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    return [
+        field
+        for field, current_field in SYNC_FIELDS.items()
+        if desired.get(field) is not None
+        and _normalize(field, desired[field]) != _normalize(field, current.get(current_field))
+    ]
+
+
+def _password_sync(
+    api_server: str,
+    access_token: str,
+    refresh_token: str | None,
+    master_key: str | None,
+    vault: str,
+    folder: str | None,
+    items: list[dict[str, Any]],
+    purge: bool,
+    max_workers: int,
+    check_mode: bool = False,
+):
+    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+
+        vault_id = get_vault(pwClient, vault)['id']
+        folder_id = None
+        if folder is not None:
+            folder_id = get_folder(pwClient, folder, vault_id)['id']
+
+        found = get_folder_passwords(pwClient, vault_id, folder_id)
+        current_by_id = get_items(pwClient, [password['id'] for password in found], max_workers)
+
+        current: dict[str, dict[str, Any]] = {}
+        for password in current_by_id.values():
+            if password['name'] in current:
+                raise AnsibleError(f'В папке несколько паролей с названием {password["name"]}')
+            current[password['name']] = password
+
+        desired = {item['name']: item for item in items}
+        if len(desired) != len(items):
+            raise AnsibleError('Названия паролей в items должны быть уникальны')
+
+        to_create = [item for name, item in desired.items() if name not in current]
+        to_update = {}
+        for name, item in desired.items():
+            if name in current and (fields := _diff_fields(item, current[name])):
+                to_update[name] = fields
+        to_delete = [name for name in current if name not in desired] if purge else []
+        plan = {
+            'created': [item['name'] for item in to_create],
+            'updated': to_update,
+            'deleted': to_delete,
+        }
+        if check_mode:
+            return plan
+
+        def create(item: dict[str, Any]):
+            pwClient.create_item(build_item_data(item, vault_id, folder_id))
+
+        def update(name: str):
+            item_data = {'vaultId': vault_id}
+            for field in to_update[name]:
+                item_data[SYNC_FIELDS[field]] = desired[name][field]
+            pwClient.update_item(current[name]['id'], item_data)
+
+        def delete(name: str):
+            pwClient.call("DELETE", f"/api/v1/items/{current[name]['id']}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(create, item) for item in to_create]
+                futures += [executor.submit(update, name) for name in to_update]
+                futures += [executor.submit(delete, name) for name in to_delete]
+                for future in futures:
+                    future.result()
+        except Exception as e:
+            raise AnsibleError(f'Ошибка синхронизации паролей: {e}')
+
+        return plan
+
+
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'vault': {'required': True},
+    'folder': {'required': False, 'default': None},
+    'purge': {'required': False, 'type': 'bool', 'default': False},
+    'max_workers': {'required': False, 'type': 'int', 'default': MAX_WORKERS},
+    'items': {
+        'required': True,
+        'type': 'list',
+        'elements': 'dict',
+        'options': {
+            'name': {
+                'required': True,
+            },
+            'url': {
+                'required': False,
+            },
+            'login': {
+                'required': False,
+            },
+            'description': {
+                'required': False,
+            },
+            'password': {
+                'required': False,
+                'no_log': True,
+            },
+            'tags': {
+                'required': False,
+                'type': 'list',
+                'elements': 'str',
+            },
+            'color': {
+                'required': False,
+                'type': 'int',
+            },
+            'custom': {
+                'required': False,
+                'type': 'list',
+                'elements': 'dict',
+            },
+        },
+    },
+}
+
+
+def run_module(params: dict[str, Any], check_mode: bool = False) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    vault: str = params['vault']
+    folder: str | None = params['folder']
+    items: list[dict[str, Any]] = params['items']
+    purge: bool = params['purge']
+    max_workers: int = params['max_workers']
+
+    result.update(_password_sync(
+        api_server,
+        access_token,
+        refresh_token,
+        master_key,
+        vault,
+        folder,
+        items,
+        purge,
+        max_workers,
+        check_mode,
+    ))
+    result['changed'] = bool(result['created'] or result['updated'] or result['deleted'])
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    result.update(run_module(module.params, module.check_mode))
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
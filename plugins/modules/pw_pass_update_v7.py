@@ -71,72 +71,66 @@ def _password_update(
         response = pwClient.update_item(password_id, pass_args)
         return response
 
-
-
-def main():
-
-    module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-            'password_id': {'required': False, 'no_log': True},
-            'search_args': {
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'password_id': {'required': False, 'no_log': True},
+    'search_args': {
+        'required': False,
+        'type': 'dict',
+        'options': {
+            'query': {
+                'required': True,
+            },
+            'tags': {
                 'required': False,
-                'type': 'dict',
-                'options': {
-                    'query': {
-                        'required': True,
-                    },
-                    'tags': {
-                        'required': False,
-                        'type': 'list',
-                        'default': [],
-                    },
-                    'colors': {
-                        'required': False,
-                        'type': 'list',
-                        'elements': 'int',
-                        'default': [],
-                    },
-                    'vault': {
-                        'required': False,
-                        'default': None,
-                    },
-                    'includeShared': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                    'includeShortcuts': {
-                        'required': False,
-                        'type': 'bool',
-                        'default': False,
-                    },
-                },
-
+                'type': 'list',
+                'default': [],
             },
-            'pass_args': {
-                'required': True,
-                'type': 'raw',
-                'no_log': True,
+            'colors': {
+                'required': False,
+                'type': 'list',
+                'elements': 'int',
+                'default': [],
+            },
+            'vault': {
+                'required': False,
+                'default': None,
+            },
+            'includeShared': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
+            },
+            'includeShortcuts': {
+                'required': False,
+                'type': 'bool',
+                'default': False,
             },
         },
-        supports_check_mode=True,
-    )
 
-    result = {'changed': False, 'message': ''}
-    if module.check_mode:
-        module.exit_json(**result)
+    },
+    'pass_args': {
+        'required': True,
+        'type': 'raw',
+        'no_log': True,
+    },
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-    search_args: dict[str, Any] | None  = module.params['search_args']
-    pass_args: dict[str, Any]  = module.params['pass_args']
-    password_id: str | None = module.params['password_id']
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    search_args: dict[str, Any] | None  = params['search_args']
+    pass_args: dict[str, Any]  = params['pass_args']
+    password_id: str | None = params['password_id']
 
     if not password_id and not search_args:
         raise AnsibleError('Нужно указать "password_id".')
@@ -156,6 +150,21 @@ def main():
 
     result['response'] = password_create_result
 
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
@@ -1,7 +1,6 @@
 from typing import Any
 from ansible.module_utils.basic import AnsibleModule
 from passwork_common_v7 import pw_login
-from passwork_client import PassworkClient
 
 DOCUMENTATION = r'''
 ---
@@ -9,6 +8,11 @@ module: pw_refresh_tokens
 
 short_description: Модуль для обновления токена
 
+description:
+    - Если передан refresh_token, используется пара токенов из хранилища токенов на контроллере (PASSWORK_TOKEN_DIR),
+      если она уже обновлялась другими задачами. Новая пара сохраняется в хранилище.
+    - Если другой процесс обновил токены во время выполнения, возвращается пара из хранилища без повторного обновления.
+
 options:
     api_server:
         description: HTTP путь до API сервера https://example.ru/api/v4
@@ -45,21 +49,40 @@ def _refresh_token(
     master_key: str | None
 ):
 
-        pwClient = PassworkClient(api_server,False)
-        pwClient.set_tokens(access_token,refresh_token)
-        response = pwClient.update_tokens()
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
+        if pwClient.token_store_path is None:
+            return pwClient.update_tokens()
+        response = pwClient.refresh_stored_tokens(pwClient.access_token)
+        if response is None:
+            response = {'accessToken': pwClient.access_token, 'refreshToken': pwClient.refresh_token}
         return response
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params.get('master_key')
+
+    result['response'] = _refresh_token(api_server, access_token,refresh_token,master_key)
+
+    return result
+
 
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True,
     )
 
@@ -67,12 +90,7 @@ def main():
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params.get('master_key')
-
-    result['response'] = _refresh_token(api_server, access_token,refresh_token,master_key)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
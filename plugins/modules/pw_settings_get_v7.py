@@ -45,21 +45,37 @@ def _get_settings(
     master_key: str | None
 ):
 
-    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+    with pw_login(api_server,access_token,refresh_token,master_key,crypto=False) as pwClient:
 
         response=pwClient.call("GET", f"/api/v1/app/settings/additional")
         return response
 
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+
+    result['response'] = _get_settings(api_server, access_token, refresh_token, master_key)
+
+    return result
+
 
 def main():
 
     module = AnsibleModule(
-        argument_spec={
-            'api_server': {'required': True},
-            'access_token': {'required': True, 'no_log': True},
-            'refresh_token': {'required': False, 'no_log': True},
-            'master_key': {'required': False, 'no_log': True},
-        },
+        argument_spec=ARGUMENT_SPEC,
         supports_check_mode=True
     )
 
@@ -67,12 +83,7 @@ def main():
     if module.check_mode:
         module.exit_json(**result)
 
-    api_server: str = module.params['api_server']
-    access_token: str = module.params['access_token']
-    refresh_token: str | None = module.params['refresh_token']
-    master_key: str | None = module.params['master_key']
-
-    result['response'] = _get_settings(api_server, access_token, refresh_token, master_key)
+    result.update(run_module(module.params))
     module.exit_json(**result)
 
 
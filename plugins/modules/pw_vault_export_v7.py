@@ -0,0 +1,224 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+from ansible.errors import AnsibleError
+from ansible.module_utils.basic import AnsibleModule
+from passwork_common_v7 import (
+  pw_login,
+  get_vault,
+  get_folder_trie,
+  walk_folders,
+  iter_items_search,
+  path_to_string,
+  MAX_WORKERS
+)
+from passwork_export_v7 import JsonlBlockWriter, COMPRESSIONS
+
+DOCUMENTATION = r'''
+---
+module: pw_vault_export
+
+short_description: Модуль для выгрузки сейфа passwork в JSONL файл
+
+description:
+    - Читает пароли сейфа одним постраничным поиском (каждый пароль читается один раз), путь пароля строится
+      по дереву папок сейфа. Пароли получаются и расшифровываются параллельно и построчно пишутся в JSONL файл.
+    - Расход памяти не зависит от размера сейфа, в обработке одновременно находится не более 2*max_workers паролей.
+    - Файл пишется там, где выполняется модуль; при использовании action плагина коллекции - на контроллере.
+    - Строки сжимаются блоками, индекс позволяет прочитать отдельный пароль без распаковки всего файла.
+
+options:
+    api_server:
+        description: HTTP путь до API сервера https://example.ru/api/v4
+        required: true
+        type: str
+    access_token:
+        description: Access API токен
+        required: true
+        type: str
+    refresh_token:
+        description: Refresh API токен
+        required: false
+        type: str
+    master_key:
+        description: Ключ шифрования для шифрования на стороне клиента
+        required: false
+        type: str
+    vault:
+        description: Название сейфа
+        required: true
+        type: str
+    dest:
+        description: Путь до файла выгрузки
+        required: true
+        type: path
+    compression:
+        description: Сжатие файла, для zstd нужен python пакет zstandard
+        required: false
+        type: str
+        choices: [gzip, zstd, none]
+        default: gzip
+    block_size:
+        description: Число строк в одном сжатом блоке
+        required: false
+        type: int
+        default: 100
+    index:
+        description: Записать индекс смещений в файл dest.idx (JSONL id, name, path, offset, line)
+        required: false
+        type: bool
+        default: false
+    max_workers:
+        description: Максимальное число параллельных запросов к API
+        required: false
+        type: int
+        default: 8
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+RETURN = r'''
+dest:
+    description: Путь до файла выгрузки
+    type: str
+    returned: always
+index:
+    description: Путь до файла индекса
+    type: str
+    returned: when index=true
+items:
+    description: Число выгруженных паролей
+    type: int
+    returned: always
+folders:
+    description: Число папок сейфа
+    type: int
+    returned: always
+'''
+
+
+def _vault_export(
+    api_server: str,
+    access_token: str,
+    refresh_token: str | None,
+    master_key: str | None,
+    vault: str,
+    dest: str,
+    compression: str,
+    block_size: int,
+    index: bool,
+    max_workers: int,
+):
+    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+
+        vault_data = get_vault(pwClient, vault)
+        if vault_data is None:
+            raise AnsibleError(f'Не найден сейф {vault}')
+        vault_id = vault_data['id']
+
+        trie = get_folder_trie(pwClient, vault_id)
+        folder_paths = {folder_id: folder_path for folder_path, folder_id in walk_folders(trie, vault)}
+
+        # Один обход всех паролей сейфа, включая корень. Папку, которой нет в дереве
+        # (создана после его построения), дает путь из результата поиска
+        def found_items() -> Iterator[tuple[str, dict]]:
+            for password in iter_items_search(pwClient, {'vaultIds': [vault_id]}, prefetch=True):
+                if password.get('folderId') in folder_paths:
+                    yield folder_paths[password['folderId']], password
+                elif password.get('path'):
+                    yield path_to_string(password['path']).rstrip('/'), password
+                else:
+                    yield vault, password
+
+        index_path = f'{dest}.idx' if index else None
+        try:
+            with JsonlBlockWriter(dest, compression, block_size, index_path) as writer, \
+                    ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+                def write(folder_path: str, future):
+                    item = future.result()
+                    item['pathStr'] = f'{folder_path}/{item["name"]}'
+                    writer.write(item, {'id': item['id'], 'name': item['name'], 'path': item['pathStr']})
+
+                pending = deque()
+                for folder_path, password in found_items():
+                    pending.append((folder_path, executor.submit(pwClient.get_item, password['id'])))
+                    if len(pending) >= 2 * max_workers:
+                        write(*pending.popleft())
+                while pending:
+                    write(*pending.popleft())
+        except AnsibleError:
+            raise
+        except Exception as e:
+            raise AnsibleError(f'Ошибка выгрузки сейфа: {e}')
+
+        response = {'dest': dest, 'items': writer.count, 'folders': len(folder_paths)}
+        if index_path is not None:
+            response['index'] = index_path
+        return response
+
+
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'vault': {'required': True},
+    'dest': {'required': True, 'type': 'path'},
+    'compression': {'required': False, 'choices': list(COMPRESSIONS), 'default': 'gzip'},
+    'block_size': {'required': False, 'type': 'int', 'default': 100},
+    'index': {'required': False, 'type': 'bool', 'default': False},
+    'max_workers': {'required': False, 'type': 'int', 'default': MAX_WORKERS},
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    vault: str = params['vault']
+    dest: str = params['dest']
+    compression: str = params['compression']
+    block_size: int = params['block_size']
+    index: bool = params['index']
+    max_workers: int = params['max_workers']
+
+    result.update(_vault_export(
+        api_server,
+        access_token,
+        refresh_token,
+        master_key,
+        vault,
+        dest,
+        compression,
+        block_size,
+        index,
+        max_workers,
+    ))
+    result['changed'] = True
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
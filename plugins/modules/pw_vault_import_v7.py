@@ -0,0 +1,328 @@
+import csv
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+from ansible.errors import AnsibleError
+from ansible.module_utils.basic import AnsibleModule
+from passwork_common_v7 import (
+  pw_login,
+  get_vault,
+  resolve_folder_path,
+  update_folder_index,
+  invalidate_cache,
+  build_item_data,
+  MAX_WORKERS
+)
+from passwork_export_v7 import iter_jsonl
+
+DOCUMENTATION = r'''
+---
+module: pw_vault_import
+
+short_description: Модуль для загрузки паролей в сейф passwork из CSV или JSONL
+
+description:
+    - Строки читаются потоково, файл целиком в память не загружается.
+    - Недостающие папки по пути каждой строки создаются один раз, результат запоминается.
+    - Пароли создаются параллельно, не более max_workers одновременных запросов.
+    - Номер каждой загруженной строки записывается в журнал. При повторном запуске строки из журнала пропускаются,
+      поэтому прерванная загрузка продолжается без создания дубликатов.
+    - Путь папки берется из поля path (папки внутри сейфа через /) или pathStr (формат pw_vault_export_v7, сейф/папки/название).
+    - Путь в поле path задается строкой через / или, в JSONL, списком названий папок.
+    - В CSV теги перечисляются через запятую в поле tags, цвет color указывается числом,
+      дополнительные поля custom - JSON списком.
+    - Строки с некорректными полями не загружаются и попадают в errors с номером строки.
+
+options:
+    api_server:
+        description: HTTP путь до API сервера https://example.ru/api/v4
+        required: true
+        type: str
+    access_token:
+        description: Access API токен
+        required: true
+        type: str
+    refresh_token:
+        description: Refresh API токен
+        required: false
+        type: str
+    master_key:
+        description: Ключ шифрования для шифрования на стороне клиента
+        required: false
+        type: str
+    vault:
+        description: Название сейфа, в который загружаются пароли
+        required: true
+        type: str
+    src:
+        description: Путь до файла CSV или JSONL (JSONL может быть сжат gzip .gz или zstd .zst)
+        required: true
+        type: path
+    format:
+        description: Формат файла, auto - по расширению
+        required: false
+        type: str
+        choices: [auto, csv, jsonl]
+        default: auto
+    journal:
+        description: Путь до журнала загрузки, по умолчанию src.journal
+        required: false
+        type: path
+    max_workers:
+        description: Максимальное число параллельных запросов к API
+        required: false
+        type: int
+        default: 8
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+RETURN = r'''
+created:
+    description: Число созданных паролей
+    type: int
+    returned: always
+skipped_rows:
+    description: Число строк, пропущенных по журналу
+    type: int
+    returned: always
+folders_created:
+    description: Число созданных папок
+    type: int
+    returned: always
+errors:
+    description: Ошибки по номерам строк
+    type: list
+    elements: dict
+    returned: always
+'''
+
+
+# Потоковое чтение строк файла загрузки
+def _iter_rows(src: str, file_format: str) -> Iterator[dict[str, Any]]:
+    if file_format == 'auto':
+        file_format = 'csv' if src.endswith('.csv') else 'jsonl'
+    if file_format == 'jsonl':
+        yield from iter_jsonl(src)
+        return
+    with open(src, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+# Привести поля строки к типам build_item_data, ValueError для некорректной строки
+def _normalize_row(row: dict[str, Any]) -> dict[str, Any]:
+    if not isinstance(row, dict):
+        raise ValueError('строка должна быть объектом')
+    row = {key: value for key, value in row.items() if key is not None}
+    if not isinstance(row.get('name'), str) or not row['name'].strip():
+        raise ValueError('не задано название name')
+    for field in ('login', 'password', 'url', 'description', 'pathStr'):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            raise ValueError(f'поле {field} должно быть строкой')
+
+    color = row.get('color')
+    if color is None or color == '':
+        row.pop('color', None)
+    elif isinstance(color, bool):
+        raise ValueError(f'некорректный цвет color: {color}')
+    else:
+        try:
+            row['color'] = int(color)
+        except (TypeError, ValueError):
+            raise ValueError(f'некорректный цвет color: {color}')
+
+    tags = row.get('tags')
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    if tags is not None and not (isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)):
+        raise ValueError('поле tags должно быть списком строк')
+    row['tags'] = tags or []
+
+    custom = row['custom'] if 'custom' in row else row.get('customs')
+    if isinstance(custom, str):
+        try:
+            custom = json.loads(custom) if custom.strip() else None
+        except ValueError:
+            raise ValueError('поле custom должно быть JSON списком')
+    if custom is not None and not (isinstance(custom, list) and all(isinstance(field, dict) for field in custom)):
+        raise ValueError('поле custom должно быть списком словарей')
+    row['custom'] = custom or []
+
+    path = row.get('path')
+    if path is not None and not isinstance(path, str) and not (
+        isinstance(path, list) and all(isinstance(segment, str) for segment in path)
+    ):
+        raise ValueError('поле path должно быть строкой или списком строк')
+    return row
+
+
+# Путь папки строки внутри сейфа
+def _row_folder_path(row: dict[str, Any]) -> tuple[str, ...]:
+    path = row.get('path')
+    if path:
+        segments = path if isinstance(path, list) else path.split('/')
+        return tuple(segment for segment in segments if segment)
+    if row.get('pathStr'):
+        return tuple(segment for segment in row['pathStr'].split('/') if segment)[1:-1]
+    return ()
+
+
+# Номера строк, уже загруженных по журналу
+def _read_journal(journal: str) -> set[int]:
+    done = set()
+    try:
+        with open(journal, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    done.add(json.loads(line)['row'])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def _vault_import(
+    api_server: str,
+    access_token: str,
+    refresh_token: str | None,
+    master_key: str | None,
+    vault: str,
+    src: str,
+    file_format: str,
+    journal: str,
+    max_workers: int,
+):
+    with pw_login(api_server,access_token,refresh_token,master_key) as pwClient:
+
+        vault_data = get_vault(pwClient, vault)
+        if vault_data is None:
+            raise AnsibleError(f'Не найден сейф {vault}')
+        vault_id = vault_data['id']
+
+        done = _read_journal(journal)
+        folder_ids: dict[tuple[str, ...], str | None] = {(): None}
+        stats = {'created': 0, 'skipped_rows': 0, 'folders_created': 0, 'errors': []}
+
+        # Найти или создать папку по пути, каждый путь обрабатывается один раз
+        def ensure_folder(segments: tuple[str, ...]) -> str | None:
+            if segments in folder_ids:
+                return folder_ids[segments]
+            parent_id = ensure_folder(segments[:-1])
+            folder = resolve_folder_path(pwClient, vault_id, list(segments))
+            if folder is None:
+                body = {'vaultId': vault_id, 'name': segments[-1]}
+                if parent_id is not None:
+                    body['parentFolderId'] = parent_id
+                folder = pwClient.call("POST", "/api/v1/folders", payload=body)
+                invalidate_cache(pwClient, 'folders/')
+                update_folder_index(pwClient, folder['id'])
+                stats['folders_created'] += 1
+            folder_ids[segments] = folder['id']
+            return folder['id']
+
+        journal_lock = threading.Lock()
+        with open(journal, 'a', encoding='utf-8') as journal_file:
+
+            def create(number: int, row: dict[str, Any], folder_id: str | None):
+                item_id = pwClient.create_item(build_item_data(row, vault_id, folder_id))
+                with journal_lock:
+                    journal_file.write(json.dumps({'row': number, 'id': item_id}) + '\n')
+                    journal_file.flush()
+
+            def collect(number: int, future):
+                try:
+                    future.result()
+                    stats['created'] += 1
+                except Exception as e:
+                    stats['errors'].append({'row': number, 'msg': f'Ошибка создания пароля: {e}'})
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending = deque()
+                for number, row in enumerate(_iter_rows(src, file_format)):
+                    if number in done:
+                        stats['skipped_rows'] += 1
+                        continue
+                    try:
+                        row = _normalize_row(row)
+                    except ValueError as e:
+                        stats['errors'].append({'row': number, 'msg': f'Ошибка в строке: {e}'})
+                        continue
+                    try:
+                        folder_id = ensure_folder(_row_folder_path(row))
+                    except Exception as e:
+                        stats['errors'].append({'row': number, 'msg': f'Ошибка создания папки: {e}'})
+                        continue
+                    pending.append((number, executor.submit(create, number, row, folder_id)))
+                    if len(pending) >= 2 * max_workers:
+                        collect(*pending.popleft())
+                while pending:
+                    collect(*pending.popleft())
+
+        return stats
+
+
+ARGUMENT_SPEC = {
+    'api_server': {'required': True},
+    'access_token': {'required': True, 'no_log': True},
+    'refresh_token': {'required': False, 'no_log': True},
+    'master_key': {'required': False, 'no_log': True},
+    'vault': {'required': True},
+    'src': {'required': True, 'type': 'path'},
+    'format': {'required': False, 'choices': ['auto', 'csv', 'jsonl'], 'default': 'auto'},
+    'journal': {'required': False, 'type': 'path'},
+    'max_workers': {'required': False, 'type': 'int', 'default': MAX_WORKERS},
+}
+
+
+def run_module(params: dict[str, Any]) -> dict[str, Any]:
+
+    result = {}
+
+    api_server: str = params['api_server']
+    access_token: str = params['access_token']
+    refresh_token: str | None = params['refresh_token']
+    master_key: str | None = params['master_key']
+    vault: str = params['vault']
+    src: str = params['src']
+    file_format: str = params['format']
+    journal: str = params['journal'] or f'{src}.journal'
+    max_workers: int = params['max_workers']
+
+    result.update(_vault_import(
+        api_server,
+        access_token,
+        refresh_token,
+        master_key,
+        vault,
+        src,
+        file_format,
+        journal,
+        max_workers,
+    ))
+    result['changed'] = result['created'] > 0 or result['folders_created'] > 0
+    if result['errors']:
+        result['failed'] = True
+        result['msg'] = f'Не удалось загрузить строк: {len(result["errors"])}, повторный запуск продолжит загрузку по журналу {journal}'
+
+    return result
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=ARGUMENT_SPEC,
+        supports_check_mode=True,
+    )
+
+    result = {'changed': False, 'message': ''}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    result.update(run_module(module.params))
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+DOCUMENTATION = r'''
+---
+name: pw_vars_v7
+
+short_description: Переменные хостов из паролей Passwork, получаемые при обращении
+
+description:
+    - Сопоставление переменных и паролей задается файлами passwork_vars/<хост или группа>.yml рядом с инвентарем,
+      по аналогии с host_vars и group_vars.
+    - Значение в файле - путь до пароля (сейф/папка/название) или словарь path и field (поле пароля, по умолчанию password).
+    - Плагин не обращается к API. Каждая переменная становится шаблоном лукапа pw_get_pswd_v7, который выполняется
+      только при обращении к переменной, поэтому неиспользуемые пароли не запрашиваются и не расшифровываются.
+    - Шаблон переменной получает и расшифровывает только пароль своего пути, а пути остальных переменных хоста
+      передает лукапу в resolve_paths. Первая использованная переменная находит все пути хоста одним набором
+      запросов и одним входом, следующие переменные хоста не выполняют поиск. Найденные айди попадают в кэш
+      метаданных, поэтому хосты с теми же путями (например, из общих групп) тоже не выполняют поиск.
+    - Повторные обращения к тому же пути в пределах задачи хоста берутся из кэша лукапа в памяти процесса.
+    - Параметры соединения берутся лукапом из переменных окружения PASSWORK_API_SERVER, PASSWORK_ACCESS_TOKEN,
+      PASSWORK_REFRESH_TOKEN, PASSWORK_MASTER_KEY.
+
+options:
+    stage:
+        ini:
+            - key: stage
+              section: vars_pw_vars_v7
+        env:
+            - name: ANSIBLE_VARS_PLUGIN_STAGE
+    lookup:
+        description: Название лукапа для получения паролей
+        type: str
+        default: pw_get_pswd_v7
+        ini:
+            - key: lookup
+              section: vars_pw_vars_v7
+        env:
+            - name: PASSWORK_VARS_LOOKUP
+
+extends_documentation_fragment:
+    - vars_plugin_staging
+
+author:
+    - Ширяев Дмитрий (dshi@efsystem.ru)
+'''
+
+EXAMPLES = r'''
+# passwork_vars/db1.yml
+db_password: INFRA/servers/db/postgres
+db_user:
+  path: INFRA/servers/db/postgres
+  field: login
+'''
+
+import json
+import os
+from ansible.errors import AnsibleParserError
+from ansible.inventory.group import InventoryObjectType
+from ansible.plugins.vars import BaseVarsPlugin
+from ansible.utils.path import basedir
+
+try:
+    from ansible.template import trust_as_template
+except ImportError:
+    # До ansible-core 2.19 все строковые переменные шаблонизируются
+    def trust_as_template(value):
+        return value
+
+# Каталог файлов сопоставления относительно инвентаря
+SUBDIR = 'passwork_vars'
+
+# Прочитанные файлы сопоставления: каталог/хост или группа -> {переменная: (путь, поле)}
+MAPPINGS: dict[str, dict[str, tuple[str, str]]] = {}
+
+
+class VarsModule(BaseVarsPlugin):
+
+    REQUIRES_ENABLED = True
+    is_stateless = True
+
+    # Сопоставление переменных и путей для хоста или группы: {переменная: (путь, поле)}
+    def _load_mapping(self, loader, directory: str, name: str) -> dict[str, tuple[str, str]]:
+        key = f'{directory}/{name}'
+        if key in MAPPINGS:
+            return MAPPINGS[key]
+
+        mapping = {}
+        if os.path.isdir(directory):
+            for found in loader.find_vars_files(directory, name):
+                for var_name, value in (loader.load_from_file(found) or {}).items():
+                    if isinstance(value, str):
+                        mapping[var_name] = (value, 'password')
+                    elif isinstance(value, dict) and 'path' in value:
+                        mapping[var_name] = (value['path'], value.get('field', 'password'))
+                    else:
+                        raise AnsibleParserError(f'Ожидается путь до пароля или словарь с path: {found}, {var_name}')
+        MAPPINGS[key] = mapping
+        return mapping
+
+    def get_vars(self, loader, path, entities, cache=True):
+        super().get_vars(loader, path, entities)
+        if not isinstance(entities, list):
+            entities = [entities]
+        if not cache:
+            MAPPINGS.clear()
+
+        directory = os.path.join(os.path.realpath(basedir(path)), SUBDIR)
+        lookup = self.get_option('lookup')
+
+        data = {}
+        for entity in entities:
+            if entity.base_type is not InventoryObjectType.HOST:
+                continue
+
+            # Группы от общих к частным, переменные хоста важнее переменных групп
+            mapping = {}
+            groups = sorted(entity.get_groups(), key=lambda group: (group.depth, group.priority, group.name))
+            for name in [group.name for group in groups] + [entity.name]:
+                mapping.update(self._load_mapping(loader, directory, name))
+            if not mapping:
+                continue
+
+            host_paths = json.dumps(sorted({password_path for password_path, _ in mapping.values()}))
+            for var_name, (password_path, field) in mapping.items():
+                template = (
+                    f'{{{{ query({json.dumps(lookup)}, {json.dumps(password_path)}, resolve_paths={host_paths})'
+                    f'[0][{json.dumps(field)}] }}}}'
+                )
+                data[var_name] = trust_as_template(template)
+        return data
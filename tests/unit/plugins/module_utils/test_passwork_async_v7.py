@@ -0,0 +1,116 @@
+# Асинхронный слой passwork_async_v7 против поддельного сервера Passwork (tools/pw_fake_server_v7.py):
+# результаты совпадают с синхронными помощниками, запросы выполняются одновременно в пределах max_concurrency.
+#
+# Запуск:
+#     python -m pytest tests/unit
+
+import asyncio
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'module_utils'))
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import passwork_common_v7
+from passwork_async_v7 import (
+    get_items_async,
+    get_password_by_path_async,
+    get_passwords_by_paths_async,
+    get_vault_async,
+    pw_login_async,
+    search_folder_async,
+)
+from pw_fake_server_v7 import Behavior, Store, populate, start_server
+
+ACCESS_TOKEN = 'test-access-token'
+REFRESH_TOKEN = 'test-refresh-token'
+
+# Задержка каждого ответа сервера, мс
+LATENCY = 30
+CONCURRENCY = 4
+
+
+@pytest.fixture(scope='module')
+def fake():
+    store = Store(':memory:')
+    store.add_token(ACCESS_TOKEN, REFRESH_TOKEN)
+    paths = populate(store, vaults=1, folders=4, items=4, snapshots=0, depth=2)
+    server, url = start_server(store, Behavior(latency=LATENCY))
+    yield store, server, url, paths
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(passwork_common_v7, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(passwork_common_v7, 'TOKEN_DIR', str(tmp_path / 'tokens'))
+
+
+def _stats(server) -> dict:
+    return server.RequestHandlerClass.api.stats.to_dict(reset=True)
+
+
+def _login(url, crypto=False):
+    return pw_login_async(url, ACCESS_TOKEN, REFRESH_TOKEN, None, crypto=crypto, max_concurrency=CONCURRENCY)
+
+
+def test_paths_are_resolved_concurrently_within_limit(fake):
+    store, server, url, paths = fake
+    # Разные названия паролей: один поиск на каждое
+    selected = [path for path in paths if path.endswith(('item00000', 'item00001', 'item00002', 'item00003'))][:8]
+
+    async def resolve():
+        async with _login(url) as pwClient:
+            return await get_passwords_by_paths_async(pwClient, selected + ['vault000/missing/item00000'])
+
+    _stats(server)
+    matched = asyncio.run(resolve())
+    stats = _stats(server)
+
+    assert all(matched[path]['pathStr'] == path for path in selected)
+    assert matched['vault000/missing/item00000'] is None
+    # 4 поиска по названию (по одному на название) выполняются одновременно
+    assert stats['requests'] == 4
+    assert stats['max_in_flight'] == CONCURRENCY
+
+
+def test_helpers_match_sync_results(fake):
+    store, server, url, paths = fake
+
+    async def run():
+        async with _login(url) as pwClient:
+            vault = await get_vault_async(pwClient, 'vault000')
+            folders = await search_folder_async(pwClient, 'folder0000', vault['id'])
+            password = await get_password_by_path_async(pwClient, paths[0])
+            indexed = await get_passwords_by_paths_async(pwClient, paths[:3], mode='index')
+            return vault, folders, password, indexed
+
+    vault, folders, password, indexed = asyncio.run(run())
+    assert vault['name'] == 'vault000'
+    assert [folder['name'] for folder in folders] == ['folder0000']
+    assert password['pathStr'] == paths[0]
+    assert {path: item['pathStr'] for path, item in indexed.items()} == {path: path for path in paths[:3]}
+
+
+def test_items_are_fetched_concurrently_and_decrypted(fake):
+    store, server, url, paths = fake
+    rows = store.query('SELECT id, data FROM items ORDER BY id LIMIT 8')
+
+    async def fetch():
+        async with _login(url, crypto=True) as pwClient:
+            return await get_items_async(pwClient, [row['id'] for row in rows] * 2)
+
+    _stats(server)
+    items = asyncio.run(fetch())
+    stats = _stats(server)
+
+    assert list(items) == [row['id'] for row in rows]
+    for row in rows:
+        secret = base64.b64decode(json.loads(row['data'])['passwordEncrypted']).decode()
+        assert items[row['id']]['password'] == secret
+    assert stats['max_in_flight'] == CONCURRENCY
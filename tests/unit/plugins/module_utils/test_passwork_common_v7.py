@@ -0,0 +1,414 @@
+# Постраничный обход поиска против поддельного сервера Passwork (tools/pw_fake_server_v7.py),
+# который ограничивает размер страницы меньше запрошенного, и число запросов обхода.
+#
+# Запуск:
+#     python -m pytest tests/unit
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import closing
+from itertools import islice
+
+import pytest
+from ansible.errors import AnsibleError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'module_utils'))
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import passwork_common_v7
+from passwork_common_v7 import (
+    KeyCache,
+    SecretCache,
+    get_folder_trie,
+    iter_folders_search,
+    iter_items_search,
+    resolve_folder_path,
+    load_stored_tokens,
+    resolve_password_paths,
+    token_store_path,
+    update_folder_index,
+)
+from passwork_light_v7 import LightClient
+from pw_fake_server_v7 import Behavior, Store, populate, start_server
+
+ACCESS_TOKEN = 'test-access-token'
+REFRESH_TOKEN = 'test-refresh-token'
+
+# Сервер отдает не больше SERVER_PAGE_SIZE записей на страницу, клиент запрашивает по 100
+SERVER_PAGE_SIZE = 50
+TOTAL = 250
+
+
+def _server(**dataset):
+    store = Store(':memory:')
+    store.add_token(ACCESS_TOKEN, REFRESH_TOKEN)
+    populate(store, vaults=1, snapshots=0, **dataset)
+    server, url = start_server(store, Behavior(page_size=SERVER_PAGE_SIZE))
+    client = LightClient(url, False)
+    client.set_tokens(ACCESS_TOKEN, REFRESH_TOKEN)
+    return server, client
+
+
+# Число запросов к серверу с прошлого вызова
+def _requests(client) -> int:
+    return client.call('GET', '/_fake/stats', payload={'reset': 1})['requests']
+
+
+@pytest.fixture(scope='module')
+def items_client():
+    server, client = _server(folders=0, items=TOTAL)
+    yield client
+    server.shutdown()
+
+
+@pytest.fixture(scope='module')
+def folders_client():
+    server, client = _server(folders=TOTAL, items=0)
+    yield client
+    server.shutdown()
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_items_search_reads_short_pages(items_client, prefetch):
+    items = list(iter_items_search(items_client, {'query': 'item'}, page_size=100, prefetch=prefetch))
+    assert len(items) == TOTAL
+    assert len({item['id'] for item in items}) == TOTAL
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_folders_search_reads_short_pages(folders_client, prefetch):
+    folders = list(iter_folders_search(folders_client, {'query': 'folder'}, page_size=100, prefetch=prefetch))
+    assert len(folders) == TOTAL
+    assert len({folder['id'] for folder in folders}) == TOTAL
+
+
+def test_items_search_limit_stops_early(items_client):
+    with closing(iter_items_search(items_client, {'query': 'item'}, page_size=100, prefetch=True)) as items:
+        assert len(list(islice(items, 120))) == 120
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_search_single_short_page_costs_one_request(items_client, prefetch):
+    _requests(items_client)
+    items = list(iter_items_search(items_client, {'query': 'item0001'}, page_size=100, prefetch=prefetch))
+    assert 0 < len(items) < SERVER_PAGE_SIZE
+    assert _requests(items_client) == 1
+
+
+def test_search_capped_pages_stop_without_empty_page(items_client):
+    _requests(items_client)
+    assert len(list(iter_items_search(items_client, {'query': 'item'}, page_size=100))) == TOTAL
+    # TOTAL кратно SERVER_PAGE_SIZE: последняя полная страница требует еще одного запроса
+    assert _requests(items_client) == TOTAL // SERVER_PAGE_SIZE + 1
+
+
+# Дерево папок строится по всем страницам списка папок один раз на процесс, даже без кэша на диске
+def test_folder_trie_is_built_once_per_process(folders_client, monkeypatch):
+    monkeypatch.setattr(passwork_common_v7, 'CACHE_TTL', 0)
+    vault_id = folders_client.call('GET', '/api/v1/vaults')['items'][0]['id']
+    folder = next(iter_folders_search(folders_client, {'query': 'folder0249'}))
+    segments = [p['name'] for p in folder['path'][1:]] + [folder['name']]
+    _requests(folders_client)
+
+    assert resolve_folder_path(folders_client, vault_id, segments)['id'] == folder['id']
+    assert sum(len(node['folders']) for node in _trie_nodes(get_folder_trie(folders_client, vault_id))) == TOTAL
+    assert _requests(folders_client) == TOTAL // SERVER_PAGE_SIZE + 1
+    for _ in range(10):
+        assert resolve_folder_path(folders_client, vault_id, segments)['id'] == folder['id']
+    assert _requests(folders_client) == 0
+
+    update_folder_index(folders_client, folder['id'])
+    assert resolve_folder_path(folders_client, vault_id, segments)['id'] == folder['id']
+    assert _requests(folders_client) == TOTAL // SERVER_PAGE_SIZE + 1
+
+
+def _trie_nodes(node):
+    for child in node['children'].values():
+        yield child
+        yield from _trie_nodes(child)
+
+
+# Кэш ключей: по умолчанию только в памяти, file - в приватном каталоге, устаревшие записи удаляются
+SECRET = 'master-key'
+
+
+def test_key_cache_memory_backend_writes_nothing(tmp_path):
+    cache = KeyCache(ttl=60, directory=str(tmp_path / 'keys'))
+    cache.set('scope', 'vault', 'value', SECRET)
+    assert cache.get('scope', 'vault', SECRET) == 'value'
+    assert not (tmp_path / 'keys').exists()
+
+
+def test_key_cache_file_backend_is_shared_and_expired_entries_are_removed(tmp_path):
+    directory = tmp_path / 'keys'
+    KeyCache(ttl=60, backend='file', directory=str(directory)).set('scope', 'vault', 'value', SECRET)
+    assert oct(directory.stat().st_mode & 0o777) == oct(0o700)
+    assert KeyCache(ttl=60, backend='file', directory=str(directory)).get('scope', 'vault', SECRET) == 'value'
+
+    entry = next(directory.iterdir())
+    stored = json.loads(entry.read_text())
+    entry.write_text(json.dumps(dict(stored, ts=time.time() - 120)))
+    assert KeyCache(ttl=60, backend='file', directory=str(directory)).get('scope', 'vault', SECRET) is None
+    assert not entry.exists()
+
+
+@pytest.mark.parametrize('mode', [0o750, 0o705, 0o770])
+def test_key_cache_refuses_shared_directory(tmp_path, mode):
+    directory = tmp_path / 'keys'
+    directory.mkdir(mode=0o700)
+    directory.chmod(mode)
+    cache = KeyCache(ttl=60, backend='file', directory=str(directory))
+    cache.set('scope', 'vault', 'value', SECRET)
+    assert list(directory.iterdir()) == []
+
+
+# Пути паролей находятся вместе с дополнительными путями одним набором запросов и запоминаются в процессе
+def test_password_paths_are_resolved_together_and_memoized(items_client, monkeypatch):
+    monkeypatch.setattr(passwork_common_v7, 'CACHE_TTL', 0)
+    first, second, missing = 'vault000/item00100', 'vault000/item00200', 'vault000/item99999'
+    _requests(items_client)
+
+    resolved = resolve_password_paths(items_client, [first], [second, missing])
+    assert resolved[first]['name'] == 'item00100'
+    # Один поиск на каждое уникальное название
+    assert _requests(items_client) == 3
+
+    assert resolve_password_paths(items_client, [second])[second]['name'] == 'item00200'
+    assert resolve_password_paths(items_client, [first], [second])[first]['name'] == 'item00100'
+    assert _requests(items_client) == 0
+
+    # Ненайденный путь не запоминается, refresh ищет заново
+    assert resolve_password_paths(items_client, [missing])[missing] is None
+    assert _requests(items_client) == 1
+    assert resolve_password_paths(items_client, [first], refresh=True)[first]['name'] == 'item00100'
+    assert _requests(items_client) == 1
+
+
+# Кэш секретов лукапа: TTL, вытеснение LRU, объединение одновременных запросов одного ключа
+class Fetcher:
+
+    def __init__(self, values=None, release=None):
+        self.values = values
+        self.release = release
+        self.calls = []
+
+    def __call__(self, keys):
+        self.calls.append(list(keys))
+        if self.release is not None:
+            self.release.wait(5)
+        values = self.values if self.values is not None else {key: {'value': key} for key in keys}
+        return {key: values[key] for key in keys if key in values}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(passwork_common_v7.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_secret_cache_serves_fresh_entries_and_refetches_expired(clock):
+    cache, fetch = SecretCache(ttl=10), Fetcher()
+    assert cache.get_many(['a', 'b', 'a'], fetch) == {'a': {'value': 'a'}, 'b': {'value': 'b'}}
+    clock[0] += 10
+    assert cache.get_many(['a'], fetch) == {'a': {'value': 'a'}}
+    clock[0] += 1
+    cache.get_many(['a', 'b'], fetch)
+    assert fetch.calls == [['a', 'b'], ['a', 'b']]
+
+
+def test_secret_cache_ttl_zero_does_not_store(clock):
+    cache, fetch = SecretCache(ttl=0), Fetcher()
+    cache.get_many(['a'], fetch)
+    cache.get_many(['a'], fetch)
+    assert fetch.calls == [['a'], ['a']]
+
+
+def test_secret_cache_evicts_least_recently_used(clock):
+    cache, fetch = SecretCache(ttl=60, max_size=2), Fetcher()
+    cache.get_many(['a'], fetch)
+    cache.get_many(['b'], fetch)
+    cache.get_many(['a'], fetch)
+    cache.get_many(['c'], fetch)
+    cache.get_many(['a', 'c'], fetch)
+    cache.get_many(['b'], fetch)
+    assert fetch.calls == [['a'], ['b'], ['c'], ['b']]
+
+
+def test_secret_cache_returns_copies(clock):
+    cache, fetch = SecretCache(ttl=60), Fetcher()
+    cache.get_many(['a'], fetch)['a']['value'] = 'changed'
+    assert cache.get_many(['a'], fetch)['a'] == {'value': 'a'}
+
+
+def _run_concurrently(cache, keys_list, fetchers):
+    results, errors = [None] * len(keys_list), [None] * len(keys_list)
+
+    def run(index):
+        try:
+            results[index] = cache.get_many(keys_list[index], fetchers[index])
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(keys_list))]
+    threads[0].start()
+    # Первый поток владеет запросом ключей, остальные приходят, пока он выполняется
+    while not fetchers[0].calls:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    return threads, results, errors
+
+
+def test_secret_cache_coalesces_concurrent_requests():
+    release = threading.Event()
+    cache = SecretCache(ttl=60)
+    owner, waiter = Fetcher(release=release), Fetcher()
+    threads, results, errors = _run_concurrently(cache, [['a', 'b'], ['b', 'c']], [owner, waiter])
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == [None, None]
+    assert owner.calls == [['a', 'b']]
+    # Ожидающий запросил только ключ, которого нет в запросе владельца
+    assert waiter.calls == [['c']]
+    assert results[1] == {'b': {'value': 'b'}, 'c': {'value': 'c'}}
+
+
+def test_secret_cache_fails_waiters_on_fetch_error():
+    release = threading.Event()
+
+    class Failing(Fetcher):
+        def __call__(self, keys):
+            super().__call__(keys)
+            raise AnsibleError('boom')
+
+    cache = SecretCache(ttl=60)
+    owner, waiter = Failing(release=release), Fetcher()
+    threads, results, errors = _run_concurrently(cache, [['a'], ['a']], [owner, waiter])
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [str(error) for error in errors] == ['boom', 'boom']
+    assert waiter.calls == []
+    # Ошибка не запоминается: следующий запрос выполняется заново
+    assert cache.get_many(['a'], Fetcher()) == {'a': {'value': 'a'}}
+
+
+def test_secret_cache_fails_waiters_on_keys_missing_from_fetch():
+    release = threading.Event()
+    cache = SecretCache(ttl=60)
+    owner, waiter = Fetcher(values={'a': {'value': 'a'}}, release=release), Fetcher()
+    threads, results, errors = _run_concurrently(cache, [['a', 'b'], ['b']], [owner, waiter])
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(not thread.is_alive() for thread in threads)
+    assert isinstance(errors[0], AnsibleError) and isinstance(errors[1], AnsibleError)
+    assert waiter.calls == []
+    # Полученный ключ закэширован, отсутствовавший запрашивается снова
+    fetch = Fetcher()
+    cache.get_many(['a', 'b'], fetch)
+    assert fetch.calls == [['b']]
+
+
+# Хранилище токенов: истекший access токен обновляется одним клиентом под файловой блокировкой,
+# остальные клиенты с той же записью хранилища берут обновленную пару (refresh токен одноразовый)
+CLIENTS = 8
+
+
+@pytest.fixture
+def expired(tmp_path, monkeypatch):
+    monkeypatch.setattr(passwork_common_v7, 'TOKEN_DIR', str(tmp_path / 'tokens'))
+    store = Store(':memory:')
+    store.execute('INSERT INTO tokens VALUES (?, ?, ?)', (ACCESS_TOKEN, REFRESH_TOKEN, 0))
+    populate(store, vaults=1, folders=0, items=0, snapshots=0)
+    server, url = start_server(store, Behavior())
+    api = server.RequestHandlerClass.api
+    refreshes = []
+    dispatch = api.dispatch
+
+    def recording(method, path, query, body):
+        if path == '/api/v1/sessions/refresh':
+            refreshes.append(body.get('refreshToken'))
+        return dispatch(method, path, query, body)
+
+    api.dispatch = recording
+    yield store, url, refreshes
+    server.shutdown()
+
+
+def _expired_client(url: str, store_path: str | None) -> LightClient:
+    client = LightClient(url, False, store_path)
+    client.set_tokens(ACCESS_TOKEN, REFRESH_TOKEN)
+    return client
+
+
+def _call_concurrently(clients: list[LightClient]) -> tuple[list, list]:
+    barrier = threading.Barrier(len(clients))
+    results, errors = [None] * len(clients), []
+
+    def run(index: int, client: LightClient):
+        barrier.wait(5)
+        try:
+            results[index] = client.call('GET', '/api/v1/vaults')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(index, client)) for index, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results, errors
+
+
+@pytest.mark.parametrize('shared', [False, True], ids=['processes', 'threads'])
+def test_expired_token_is_refreshed_once(expired, shared):
+    store, url, refreshes = expired
+    store_path = token_store_path(url, REFRESH_TOKEN)
+    # Отдельные клиенты одной записи хранилища - как процессы форков Ansible, общий клиент - как потоки одного процесса
+    if shared:
+        clients = [_expired_client(url, store_path)] * CLIENTS
+    else:
+        clients = [_expired_client(url, store_path) for _ in range(CLIENTS)]
+
+    results, errors = _call_concurrently(clients)
+
+    assert errors == []
+    assert all(result['items'][0]['name'] == 'vault000' for result in results)
+    assert refreshes == [REFRESH_TOKEN]
+    stored = load_stored_tokens(store_path)
+    assert {(client.access_token, client.refresh_token) for client in clients} == {
+        (stored['access_token'], stored['refresh_token'])
+    }
+    assert stored['access_token'] != ACCESS_TOKEN
+    assert oct(os.stat(passwork_common_v7.TOKEN_DIR).st_mode & 0o777) == oct(0o700)
+
+
+def test_stale_client_takes_stored_pair(expired):
+    store, url, refreshes = expired
+    store_path = token_store_path(url, REFRESH_TOKEN)
+    _expired_client(url, store_path).call('GET', '/api/v1/vaults')
+    assert len(refreshes) == 1
+
+    # Следующий запуск начинает с исходной пары из параметров и без обновления берет пару из хранилища
+    client = _expired_client(url, store_path)
+    assert client.call('GET', '/api/v1/vaults')['items'][0]['name'] == 'vault000'
+    assert len(refreshes) == 1
+    assert client.access_token == load_stored_tokens(store_path)['access_token']
+
+
+def test_expired_token_without_store_is_not_refreshed(expired):
+    store, url, refreshes = expired
+    with pytest.raises(Exception, match='expired'):
+        _expired_client(url, None).call('GET', '/api/v1/vaults')
+    assert refreshes == []
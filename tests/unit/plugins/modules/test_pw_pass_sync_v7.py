@@ -0,0 +1,175 @@
+# Синхронизация паролей папки pw_pass_sync_v7: сравнение полей SYNC_FIELDS и режим проверки
+# против поддельного сервера Passwork (tools/pw_fake_server_v7.py).
+#
+# Запуск:
+#     python -m pytest tests/unit
+
+import base64
+import json
+import os
+import sys
+
+import pytest
+from ansible.errors import AnsibleError
+from ansible.module_utils.common.arg_spec import ArgumentSpecValidator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'module_utils'))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'modules'))
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import passwork_common_v7
+from pw_pass_sync_v7 import ARGUMENT_SPEC, _diff_fields, run_module
+from pw_fake_server_v7 import Behavior, Store, populate, start_server
+
+ACCESS_TOKEN = 'test-access-token'
+REFRESH_TOKEN = 'test-refresh-token'
+
+# Текущее состояние пароля в формате ответа get_items
+CURRENT = {
+    'name': 'db',
+    'login': 'admin',
+    'password': 'secret',
+    'url': 'https://db.example',
+    'description': '',
+    'color': 3,
+    'tags': ['prod', 'db'],
+    'customs': [{'name': 'port', 'type': 'text', 'value': '5432', 'id': 'c1'}],
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(passwork_common_v7, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(passwork_common_v7, 'TOKEN_DIR', str(tmp_path / 'tokens'))
+
+
+# Сервер с папкой vault000/folder0000 из паролей item00000..item00002 и журнал изменяющих запросов
+@pytest.fixture
+def fake():
+    store = Store(':memory:')
+    store.add_token(ACCESS_TOKEN, REFRESH_TOKEN)
+    populate(store, vaults=1, folders=1, items=3, snapshots=0, depth=1)
+    server, url = start_server(store, Behavior())
+    api = server.RequestHandlerClass.api
+    writes = []
+    dispatch = api.dispatch
+
+    def recording(method, path, query, body):
+        if method != 'GET' and not path.endswith('/sessions/refresh'):
+            writes.append((method, path))
+        return dispatch(method, path, query, body)
+
+    api.dispatch = recording
+    yield store, url, writes
+    server.shutdown()
+
+
+def _params(url: str, items: list[dict], purge: bool = True) -> dict:
+    result = ArgumentSpecValidator(ARGUMENT_SPEC).validate({
+        'api_server': url,
+        'access_token': ACCESS_TOKEN,
+        'refresh_token': REFRESH_TOKEN,
+        'vault': 'vault000',
+        'folder': 'folder0000',
+        'purge': purge,
+        'items': items,
+    })
+    assert not result.error_messages, result.error_messages
+    return result.validated_parameters
+
+
+def _items(store: Store) -> dict[str, dict]:
+    items = {}
+    for row in store.query('SELECT name, data FROM items'):
+        data = json.loads(row['data'])
+        data['password'] = base64.b64decode(data.pop('passwordEncrypted')).decode()
+        items[row['name']] = data
+    return items
+
+
+def test_unset_and_equivalent_fields_are_not_changed():
+    desired = {
+        'name': 'db',
+        'login': 'admin',
+        'password': None,
+        'url': None,
+        'description': '',
+        'color': 3,
+        'tags': ['db', 'prod'],
+        'custom': [{'name': 'port', 'type': 'text', 'value': '5432'}],
+    }
+    # Порядок тегов, служебные ключи дополнительных полей и пустая строка вместо отсутствующего значения не отличие
+    assert _diff_fields(desired, CURRENT) == []
+    assert _diff_fields({'name': 'db', 'description': ''}, dict(CURRENT, description=None)) == []
+
+
+def test_changed_fields_are_reported_by_module_name():
+    desired = {
+        'name': 'db',
+        'login': 'root',
+        'password': 'secret2',
+        'url': 'https://db.example',
+        'color': 0,
+        'tags': ['prod'],
+        'custom': [{'name': 'port', 'type': 'text', 'value': '6432'}],
+    }
+    assert _diff_fields(desired, CURRENT) == ['login', 'password', 'color', 'tags', 'custom']
+    # Пустой список задан явно и отличается от текущих значений
+    assert _diff_fields({'name': 'db', 'tags': [], 'custom': []}, CURRENT) == ['tags', 'custom']
+
+
+def test_check_mode_reports_plan_without_writes(fake):
+    store, url, writes = fake
+    before = _items(store)
+    items = [
+        {'name': 'item00000', 'login': 'user0', 'tags': ['tag0'], 'description': ''},
+        {'name': 'item00001', 'login': 'admin', 'password': 'changed'},
+        {'name': 'new', 'login': 'new', 'password': 'new-secret'},
+    ]
+
+    result = run_module(_params(url, items), check_mode=True)
+
+    assert result['changed'] is True
+    assert result['created'] == ['new']
+    assert result['updated'] == {'item00001': ['login', 'password']}
+    assert result['deleted'] == ['item00002']
+    assert writes == []
+    assert _items(store) == before
+
+
+def test_sync_applies_plan_and_is_idempotent(fake):
+    store, url, writes = fake
+    items = [
+        {'name': 'item00000', 'login': 'user0', 'tags': ['tag0']},
+        {'name': 'item00001', 'login': 'admin', 'password': 'changed', 'tags': ['b', 'a'], 'color': 2},
+        {'name': 'new', 'login': 'new', 'password': 'new-secret', 'custom': [{'name': 'k', 'type': 'text', 'value': 'v'}]},
+    ]
+
+    result = run_module(_params(url, items))
+
+    assert result['changed'] is True
+    assert result['updated'] == {'item00001': ['login', 'password', 'color', 'tags']}
+    stored = _items(store)
+    assert sorted(stored) == ['item00000', 'item00001', 'new']
+    assert stored['item00001']['login'] == 'admin'
+    assert stored['item00001']['password'] == 'changed'
+    assert stored['item00001']['color'] == 2
+    assert sorted(stored['item00001']['tags']) == ['a', 'b']
+    assert stored['new']['password'] == 'new-secret'
+    assert sorted(method for method, _ in writes) == ['DELETE', 'PATCH', 'POST']
+
+    # Повторный запуск с тем же желаемым состоянием ничего не меняет
+    writes.clear()
+    result = run_module(_params(url, items))
+    assert result == {'created': [], 'updated': {}, 'deleted': [], 'changed': False}
+    assert writes == []
+
+
+def test_duplicate_desired_names_are_rejected(fake):
+    store, url, writes = fake
+    items = [{'name': 'item00000'}, {'name': 'item00000', 'login': 'other'}]
+
+    with pytest.raises(AnsibleError, match='уникальны'):
+        run_module(_params(url, items), check_mode=True)
+    assert writes == []
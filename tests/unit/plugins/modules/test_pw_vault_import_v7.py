@@ -0,0 +1,104 @@
+# Проверка и приведение строк файла загрузки pw_vault_import_v7 к типам build_item_data.
+#
+# Запуск:
+#     python -m pytest tests/unit
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'module_utils'))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'modules'))
+
+from pw_vault_import_v7 import _normalize_row, _row_folder_path
+
+
+def test_csv_row_is_coerced():
+    # Строка csv.DictReader: все значения строками, лишние значения под ключом None
+    row = _normalize_row({
+        'name': 'db',
+        'login': 'admin',
+        'password': 'secret',
+        'color': '3',
+        'tags': 'prod, db,,',
+        'custom': '[{"name": "port", "type": "text", "value": "5432"}]',
+        'path': 'infra/db',
+        None: ['extra'],
+    })
+    assert row == {
+        'name': 'db',
+        'login': 'admin',
+        'password': 'secret',
+        'color': 3,
+        'tags': ['prod', 'db'],
+        'custom': [{'name': 'port', 'type': 'text', 'value': '5432'}],
+        'path': 'infra/db',
+    }
+
+
+def test_empty_csv_fields_are_dropped():
+    row = _normalize_row({'name': 'db', 'color': '', 'tags': '', 'custom': ' '})
+    assert row == {'name': 'db', 'tags': [], 'custom': []}
+
+
+def test_jsonl_row_is_kept():
+    # Строка pw_vault_export_v7: дополнительные поля в customs, путь в pathStr
+    source = {
+        'name': 'db',
+        'color': 2,
+        'tags': ['prod'],
+        'customs': [{'name': 'port', 'type': 'text', 'value': '5432'}],
+        'pathStr': 'vault/infra/db/db',
+    }
+    row = _normalize_row(source)
+    assert row['color'] == 2
+    assert row['tags'] == ['prod']
+    assert row['custom'] == source['customs']
+    assert row['pathStr'] == 'vault/infra/db/db'
+    # Исходная строка не изменяется
+    assert 'custom' not in source
+
+
+def test_custom_takes_precedence_over_customs():
+    row = _normalize_row({'name': 'db', 'custom': [], 'customs': [{'name': 'port'}]})
+    assert row['custom'] == []
+
+
+@pytest.mark.parametrize('row, message', [
+    (['db'], 'объектом'),
+    ({'login': 'admin'}, 'name'),
+    ({'name': '  '}, 'name'),
+    ({'name': 1}, 'name'),
+    ({'name': 'db', 'password': 123}, 'password'),
+    ({'name': 'db', 'pathStr': ['vault', 'db']}, 'pathStr'),
+    ({'name': 'db', 'color': 'red'}, 'color'),
+    ({'name': 'db', 'color': True}, 'color'),
+    ({'name': 'db', 'color': [1]}, 'color'),
+    ({'name': 'db', 'tags': ['prod', 1]}, 'tags'),
+    ({'name': 'db', 'tags': {'prod': True}}, 'tags'),
+    ({'name': 'db', 'custom': '{not json'}, 'JSON'),
+    ({'name': 'db', 'custom': '{"name": "port"}'}, 'custom'),
+    ({'name': 'db', 'customs': ['port']}, 'custom'),
+    ({'name': 'db', 'path': ['infra', 1]}, 'path'),
+    ({'name': 'db', 'path': {'infra': 'db'}}, 'path'),
+])
+def test_invalid_row_is_rejected(row, message):
+    with pytest.raises(ValueError, match=message):
+        _normalize_row(row)
+
+
+@pytest.mark.parametrize('row, segments', [
+    ({'path': 'infra/db'}, ('infra', 'db')),
+    ({'path': '/infra//db/'}, ('infra', 'db')),
+    ({'path': ['infra', 'a/b']}, ('infra', 'a/b')),
+    # path важнее pathStr, pathStr без сейфа и названия пароля
+    ({'path': 'infra', 'pathStr': 'vault/other/db'}, ('infra',)),
+    ({'pathStr': 'vault/infra/db/db'}, ('infra', 'db')),
+    ({'pathStr': 'vault/db'}, ()),
+    ({'path': '', 'pathStr': ''}, ()),
+    ({}, ()),
+])
+def test_row_folder_path(row, segments):
+    assert _row_folder_path(row) == segments
@@ -0,0 +1,417 @@
+"""Бенчмарк функций и модулей коллекции на локальной замене сервера Passwork v7.
+
+Для каждого набора данных поднимает pw_fake_server_v7 в процессе, заполняет его синтетическими
+данными и замеряет сценарии: функции passwork_common_v7, лукап pw_get_pswd_v7 и модули
+создания/изменения/удаления паролей. Выводит пропускную способность, перцентили задержки
+и число запросов к API на операцию, сохраняет и сравнивает базовые замеры.
+
+С --decrypt вместо сценариев замеряется расшифровка паролей (нужен passwork_client): в процессе
+и в пуле процессов для разного числа паролей. По замерам подбирается PASSWORK_DECRYPT_PROCESS_THRESHOLD.
+
+Запуск:
+    python tools/pw_bench_v7.py --datasets 10-shallow,1k-deep --save-baseline /tmp/pw_bench.json
+    python tools/pw_bench_v7.py --datasets 10-shallow,1k-deep --baseline /tmp/pw_bench.json
+    python tools/pw_bench_v7.py --decrypt 10,50,100,200,400,800,1600
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'module_utils'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import passwork_common_v7
+from passwork_common_v7 import (
+    pw_login,
+    collect_metrics,
+    get_vault,
+    get_folder,
+    get_folder_by_path,
+    get_password_by_path,
+)
+from pw_fake_server_v7 import Behavior, Store, percentile, populate, start_server
+
+ACCESS_TOKEN = 'bench-access-token'
+REFRESH_TOKEN = 'bench-refresh-token'
+
+# Наборы данных: параметры populate. Глубокие деревья строятся выбором родителя среди последних папок
+DATASETS: dict[str, dict[str, int]] = {
+    '10-shallow': {'vaults': 1, 'folders': 2, 'items': 5, 'depth': 1},
+    '10-deep': {'vaults': 1, 'folders': 10, 'items': 1, 'depth': 10, 'width': 1},
+    '1k-shallow': {'vaults': 1, 'folders': 20, 'items': 50, 'depth': 1},
+    '1k-deep': {'vaults': 1, 'folders': 20, 'items': 50, 'depth': 20, 'width': 2},
+    '100k-shallow': {'vaults': 1, 'folders': 200, 'items': 500, 'depth': 1},
+    '100k-deep': {'vaults': 1, 'folders': 200, 'items': 500, 'depth': 25, 'width': 3},
+}
+
+# Размер выборки папок и паролей, по которым идут запросы
+SAMPLE_SIZE = 100
+
+
+# Выборка папок и паролей набора данных: [{'id', 'name', 'vault', 'vault_id', 'parent', 'path'}]
+def sample_targets(store: Store, table: str, column: str) -> list[dict[str, str]]:
+    sample = []
+    for row in store.query(f'SELECT id, name, vault_id, {column} AS parent_id FROM {table} ORDER BY id LIMIT ?', (SAMPLE_SIZE,)):
+        path = [segment['name'] for segment in store.path(row['vault_id'], row['parent_id'])]
+        sample.append({
+            'id': row['id'],
+            'name': row['name'],
+            'vault': path[0],
+            'vault_id': row['vault_id'],
+            'parent': '/'.join(path),
+            'path': '/'.join(path + [row['name']]),
+        })
+    return sample
+
+
+# Подготовить хранилище набора данных. Если задан db_dir, заполненная база переиспользуется между запусками
+def prepare_store(name: str, db_dir: str | None, seed: int) -> Store:
+    path = os.path.join(db_dir, f'{name}-{seed}.sqlite') if db_dir else ':memory:'
+    exists = path != ':memory:' and os.path.exists(path)
+    store = Store(path)
+    store.add_token(ACCESS_TOKEN, REFRESH_TOKEN)
+    if not exists:
+        populate(store, snapshots=0, seed=seed, **DATASETS[name])
+    return store
+
+
+# Загрузить модуль коллекции и проверить параметры так же, как action-плагин
+def module_runner(name: str) -> Callable[[dict], dict]:
+    from ansible.module_utils.common.arg_spec import ArgumentSpecValidator
+    from passwork_action_v7 import _load_module
+
+    module = _load_module(name)
+
+    def run(args: dict) -> dict:
+        validation = ArgumentSpecValidator(module.ARGUMENT_SPEC).validate(args)
+        if validation.error_messages:
+            raise ValueError('; '.join(validation.error_messages))
+        return module.run_module(validation.validated_parameters)
+    return run
+
+
+# Модуль Python лукапа pw_get_pswd_v7, загруженный загрузчиком плагинов Ansible
+# (опции лукапа берутся из документации плагина только при такой загрузке)
+def lookup_plugin_module():
+    from ansible.plugins.loader import lookup_loader
+
+    lookup_loader.add_directory(os.path.join(ROOT, 'plugins', 'lookup'))
+    return sys.modules[type(lookup_loader.get('pw_get_pswd_v7')).__module__]
+
+
+# Лукап pw_get_pswd_v7 без кэша паролей между вызовами: каждый вызов обращается к API
+def lookup_runner() -> Callable[[list[str], dict], list]:
+    from ansible.plugins.loader import lookup_loader
+
+    module = lookup_plugin_module()
+
+    def run(paths: list[str], options: dict) -> list:
+        module._secret_cache.clear()
+        return lookup_loader.get('pw_get_pswd_v7').run(paths, variables={}, **options)
+    return run
+
+
+# Сценарии: название -> функция (контекст, номер итерации). Порядок важен: удаляются созданные пароли
+def _scenarios(ctx: dict[str, Any]) -> dict[str, Callable[[int], Any]]:
+    folders, items, rng = ctx['folders'], ctx['items'], ctx['rng']
+    connection = {'api_server': ctx['url'], 'access_token': ACCESS_TOKEN, 'refresh_token': REFRESH_TOKEN, 'master_key': None}
+    vault = items[0]['vault']
+    created: list[str] = []
+
+    def pass_create(i: int):
+        folder = rng.choice(folders)
+        result = ctx['modules']['pw_pass_create_v7'](dict(connection, pass_args={
+            'vault': folder['vault'], 'folder': folder['name'], 'name': f'bench{i:06d}', 'login': 'bench', 'password': 'bench',
+        }))
+        created.append(result['response'])
+
+    def pass_update(i: int):
+        ctx['modules']['pw_pass_update_v7'](dict(connection, password_id=created[i % len(created)], pass_args={
+            'vault': vault, 'login': 'bench', 'password': f'bench{i}', 'description': 'updated',
+        }))
+
+    def pass_delete(i: int):
+        if created:
+            ctx['modules']['pw_pass_delete_v7'](dict(connection, password_id=created.pop()))
+
+    client = ctx['client']
+    return {
+        'get_vault': lambda i: get_vault(client, vault),
+        'get_folder': lambda i: (folder := rng.choice(folders)) and get_folder(client, folder['name'], folder['vault_id']),
+        'get_folder_by_path': lambda i: (folder := rng.choice(folders)) and get_folder_by_path(client, folder['name'], folder['parent'], folder['vault_id']),
+        'get_password_by_path': lambda i: get_password_by_path(client, rng.choice(items)['path']),
+        'lookup': lambda i: ctx['lookup']([rng.choice(items)['path']], {k: v for k, v in connection.items() if v}),
+        'pw_pass_create_v7': pass_create,
+        'pw_pass_update_v7': pass_update,
+        'pw_pass_delete_v7': pass_delete,
+    }
+
+
+# Прогнать сценарий: warmup итераций без замера, затем iterations с замером
+def _measure(func: Callable[[int], Any], iterations: int, warmup: int) -> dict[str, Any]:
+    for i in range(warmup):
+        func(i)
+    latencies, calls, errors = [], 0, 0
+    started = time.perf_counter()
+    for i in range(warmup, warmup + iterations):
+        with collect_metrics() as metrics:
+            op_started = time.perf_counter()
+            try:
+                func(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - op_started)
+        calls += sum(endpoint['count'] for endpoint in metrics.to_dict()['calls'].values())
+    elapsed = time.perf_counter() - started
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'throughput': iterations / elapsed if elapsed else 0,
+        'mean': sum(latencies) / len(latencies),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'calls': calls / iterations,
+    }
+
+
+def run_dataset(name: str, args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    store = prepare_store(name, args.db_dir, args.seed)
+    behavior = Behavior(args.latency, args.jitter, 0, args.page_size, args.seed)
+    server, url = start_server(store, behavior)
+    try:
+        with pw_login(url, ACCESS_TOKEN, REFRESH_TOKEN, None) as client:
+            ctx = {
+                'url': url,
+                'client': client,
+                'rng': random.Random(args.seed),
+                'folders': sample_targets(store, 'folders', 'parent_id'),
+                'items': sample_targets(store, 'items', 'folder_id'),
+                'lookup': lookup_runner(),
+                'modules': {name: module_runner(name) for name in ('pw_pass_create_v7', 'pw_pass_update_v7', 'pw_pass_delete_v7')},
+            }
+            scenarios = _scenarios(ctx)
+            selected = args.scenarios.split(',') if args.scenarios else list(scenarios)
+            results = {}
+            for scenario in selected:
+                if scenario not in scenarios:
+                    raise SystemExit(f'Неизвестный сценарий: {scenario}')
+                passwork_common_v7.invalidate_cache(client)
+                results[scenario] = _measure(scenarios[scenario], args.iterations, args.warmup)
+            return results
+    finally:
+        server.shutdown()
+
+
+# Пароли в виде ответа сервера с шифрованием на стороне клиента: ключ пароля зашифрован ключом сейфа,
+# пароль и пользовательское поле - ключом пароля
+def _encrypted_items(count: int, vault_key: str) -> list[dict[str, Any]]:
+    from passwork_client.crypto import encrypt_aes, generate_key
+
+    items = []
+    for i in range(count):
+        item_key = generate_key()
+        items.append({
+            'id': f'{i:024x}',
+            'vaultMasterKeyEncrypted': 'bench',
+            'keyEncrypted': encrypt_aes(item_key, vault_key),
+            'passwordEncrypted': encrypt_aes(f'bench-secret-{i}', item_key),
+            'customs': [{key: encrypt_aes(value, item_key) for key, value in (('name', 'token'), ('type', 'password'), ('value', f'bench-{i}'))}],
+        })
+    return items
+
+
+# Прямая по методу наименьших квадратов: (свободный член, наклон)
+def _fit(xs: list[float], ys: list[float]) -> tuple[float, float]:
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+    return mean_y - slope * mean_x, slope
+
+
+# Замер TokenRefreshingClient.decrypt_items в процессе и в пуле из workers процессов, медиана runs запусков, мс.
+# Ключ сейфа подставляется без RSA: замеряется только то, что делит порог DECRYPT_PROCESS_THRESHOLD
+def decrypt_bench(sizes: list[int], workers: int, runs: int) -> dict[str, Any]:
+    import passwork_client_v7
+    from passwork_client.crypto import generate_key
+
+    vault_key = generate_key()
+    client = passwork_client_v7.TokenRefreshingClient('http://127.0.0.1', False)
+    client.is_encrypt = True
+    client.master_key = 'bench'
+    client.vault_key = lambda encrypted: vault_key
+    passwork_client_v7.decrypt_workers = lambda: workers
+
+    threshold = passwork_common_v7.DECRYPT_PROCESS_THRESHOLD
+    timings: dict[int, dict[str, float]] = {}
+    try:
+        for size in sizes:
+            items = _encrypted_items(size, vault_key)
+            timings[size] = {}
+            for mode, mode_threshold in (('process', sys.maxsize), ('pool', 0)):
+                passwork_common_v7.DECRYPT_PROCESS_THRESHOLD = mode_threshold
+                samples = []
+                for _ in range(runs):
+                    batch = copy.deepcopy(items)
+                    started = time.perf_counter()
+                    client.decrypt_items(batch)
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[size][mode] = statistics.median(samples)
+    finally:
+        passwork_common_v7.DECRYPT_PROCESS_THRESHOLD = threshold
+
+    # Модель: в процессе t мс на пароль, в пуле F мс на запуск и p мс на пароль
+    _, per_item = _fit(sizes, [timings[size]['process'] for size in sizes])
+    startup, pool_per_item = _fit(sizes, [timings[size]['pool'] for size in sizes])
+    crossover = next((size for size in sizes if timings[size]['pool'] < timings[size]['process']), None)
+    return {
+        'workers': workers,
+        'timings': {str(size): timing for size, timing in timings.items()},
+        'process_ms_per_item': per_item,
+        'pool_startup_ms': startup,
+        'pool_ms_per_item': pool_per_item,
+        'crossover': crossover,
+    }
+
+
+def print_decrypt(result: dict[str, Any], cores: int):
+    print(f'Расшифровка паролей, медиана мс (пул из {result["workers"]} процессов, доступно ядер: {cores})')
+    print(f'{"паролей":>8}{"в процессе":>12}{"в пуле":>10}')
+    for size, timing in result['timings'].items():
+        print(f'{size:>8}{timing["process"]:>12.2f}{timing["pool"]:>10.2f}')
+    t, startup, p = result['process_ms_per_item'], result['pool_startup_ms'], result['pool_ms_per_item']
+    print(f'в процессе {t:.3f} мс на пароль; пул: запуск {startup:.1f} мс, {p:.3f} мс на пароль')
+    if result['crossover'] is not None:
+        print(f'пул быстрее начиная с {result["crossover"]} паролей')
+    # На одном ядре пул не ускоряет расшифровку: порог оценивается для W ядер,
+    # считая, что расшифровка делится между ними, а передача паролей в пул (p - t) не меняется
+    overhead = max(p - t, 0) if cores < 2 else p - t / result['workers']
+    for target in (2, 4, 8):
+        gain = t * (1 - 1 / target) - overhead
+        if gain > 0:
+            print(f'оценка порога для {target} ядер: {startup / gain:.0f} паролей')
+
+
+# Сравнить замеры с базовыми: задержка хуже более чем на tolerance или больше запросов к API
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for dataset, scenarios in results.items():
+        for scenario, current in scenarios.items():
+            base = baseline.get(dataset, {}).get(scenario)
+            if base is None:
+                continue
+            for metric in ('p50', 'p95'):
+                if current[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(f'{dataset}/{scenario}: {metric} {base[metric] * 1000:.2f} -> {current[metric] * 1000:.2f} ms')
+            if current['calls'] > base['calls'] + 1e-9:
+                regressions.append(f'{dataset}/{scenario}: запросов на операцию {base["calls"]:.2f} -> {current["calls"]:.2f}')
+            if current['errors'] > base['errors']:
+                regressions.append(f'{dataset}/{scenario}: ошибок {base["errors"]} -> {current["errors"]}')
+    return regressions
+
+
+def print_results(results: dict, baseline: dict | None = None):
+    header = f'{"набор":<14}{"сценарий":<22}{"оп/с":>9}{"p50 мс":>9}{"p95 мс":>9}{"p99 мс":>9}{"запр/оп":>9}{"ошибки":>8}'
+    print(header)
+    for dataset, scenarios in results.items():
+        for scenario, r in scenarios.items():
+            line = (
+                f'{dataset:<14}{scenario:<22}{r["throughput"]:>9.1f}{r["p50"] * 1000:>9.2f}{r["p95"] * 1000:>9.2f}'
+                f'{r["p99"] * 1000:>9.2f}{r["calls"]:>9.2f}{r["errors"]:>8}'
+            )
+            base = (baseline or {}).get(dataset, {}).get(scenario)
+            if base is not None and base['p50']:
+                line += f'  p50 {(r["p50"] / base["p50"] - 1) * 100:+.0f}%'
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк коллекции Passwork v7 на локальной замене сервера')
+    parser.add_argument('--datasets', default=','.join(DATASETS), help=f'Наборы данных через запятую: {", ".join(DATASETS)}')
+    parser.add_argument('--scenarios', help='Сценарии через запятую, по умолчанию все')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=2, help='Задержка сервера, мс')
+    parser.add_argument('--jitter', type=float, default=0, help='Стандартное отклонение задержки, мс')
+    parser.add_argument('--page-size', type=int, default=100, help='Максимальный размер страницы поиска сервера')
+    parser.add_argument('--cache', action='store_true', help='Включить кэш метаданных (по умолчанию замеряются запросы без кэша)')
+    parser.add_argument('--db-dir', help='Каталог для заполненных баз наборов данных, переиспользуемых между запусками')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', help='Сохранить замеры как базовые в файл')
+    parser.add_argument('--baseline', help='Сравнить с базовыми замерами из файла, код возврата 1 при регрессии')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Допустимое ухудшение задержки, доля')
+    parser.add_argument('--json', help='Сохранить замеры в файл JSON')
+    parser.add_argument('--decrypt', help='Замерить расшифровку для числа паролей через запятую вместо сценариев')
+    parser.add_argument('--decrypt-workers', type=int, help='Процессов пула расшифровки, по умолчанию доступные ядра (не меньше 2)')
+    args = parser.parse_args()
+
+    if args.decrypt:
+        from passwork_client_v7 import decrypt_workers
+
+        cores = decrypt_workers()
+        result = decrypt_bench([int(size) for size in args.decrypt.split(',')], args.decrypt_workers or max(cores, 2), 5)
+        print_decrypt(result, cores)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'meta': {'python': platform.python_version(), 'cores': cores}, 'decrypt': result}, f, indent=2)
+        return
+
+    for name in args.datasets.split(','):
+        if name not in DATASETS:
+            raise SystemExit(f'Неизвестный набор данных: {name}')
+
+    # Кэши и токены бенчмарка не пересекаются с рабочими каталогами
+    workdir = tempfile.mkdtemp(prefix='pw_bench_')
+    passwork_common_v7.CACHE_DIR = os.path.join(workdir, 'cache')
+    passwork_common_v7.TOKEN_DIR = os.path.join(workdir, 'tokens')
+    passwork_common_v7.SNAPSHOT_CACHE_DIR = os.path.join(workdir, 'snapshots')
+    if not args.cache:
+        passwork_common_v7.CACHE_TTL = 0
+    if args.db_dir:
+        os.makedirs(args.db_dir, exist_ok=True)
+
+    results = {name: run_dataset(name, args) for name in args.datasets.split(',')}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'page_size': args.page_size,
+            'cache': args.cache,
+            'iterations': args.iterations,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    for path in (args.save_baseline, args.json):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'РЕГРЕССИЯ {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,741 @@
+"""Локальная замена сервера Passwork v7 для нагрузочного тестирования и бенчмарков.
+
+Реализует методы API, которые использует коллекция, без шифрования на стороне клиента
+(пароли хранятся в base64, как их отправляет passwork_client без master_key).
+Данные хранятся в SQLite, задержка, доля ошибок и размер страницы настраиваются.
+
+Запуск:
+    python tools/pw_fake_server_v7.py --db /tmp/pw.sqlite --populate 2,20,50 --latency 20 --jitter 5
+"""
+
+import argparse
+import base64
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS vaults (id TEXT PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS folders (
+    id TEXT PRIMARY KEY, vault_id TEXT NOT NULL, parent_id TEXT, name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS folders_vault ON folders (vault_id);
+CREATE INDEX IF NOT EXISTS folders_name ON folders (name);
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY, vault_id TEXT NOT NULL, folder_id TEXT, name TEXT NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_folder ON items (vault_id, folder_id);
+-- Поиск по подстроке названия просматривает узкий покрывающий индекс в порядке id, а не строки с data
+CREATE INDEX IF NOT EXISTS items_search ON items (id, name, vault_id, folder_id);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id TEXT PRIMARY KEY, item_id TEXT NOT NULL, created_at TEXT NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_item ON snapshots (item_id);
+CREATE TABLE IF NOT EXISTS tokens (
+    access_token TEXT PRIMARY KEY, refresh_token TEXT NOT NULL UNIQUE, expires_at REAL NOT NULL
+);
+'''
+
+# Поля пароля, которые хранятся в data
+ITEM_FIELDS = ('login', 'passwordEncrypted', 'url', 'description', 'color', 'tags', 'customs', 'keyEncrypted')
+
+
+# Айди в формате Passwork (24 hex символа)
+def new_id() -> str:
+    return os.urandom(12).hex()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+
+class ApiError(Exception):
+
+    def __init__(self, status: int, message: str, code: str | None = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+# Хранилище данных сервера. Одно соединение SQLite на сервер, запись под блокировкой
+class Store:
+
+    def __init__(self, path: str, token_ttl: float = 0):
+        self.token_ttl = token_ttl
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Названия сейфов и дерево папок в памяти для построения путей, сбрасываются при изменении
+        self._names: dict[str, tuple[str | None, str]] | None = None
+
+    def query(self, sql: str, args: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def execute(self, sql: str, args: tuple = ()):
+        with self._lock:
+            self._db.execute(sql, args)
+            self._db.commit()
+            if 'folders' in sql or 'vaults' in sql:
+                self._names = None
+
+    def executemany(self, sql: str, rows: list[tuple]):
+        with self._lock:
+            self._db.executemany(sql, rows)
+            self._db.commit()
+            if 'folders' in sql or 'vaults' in sql:
+                self._names = None
+
+    # Токены
+
+    def add_token(self, access_token: str, refresh_token: str):
+        expires_at = time.time() + self.token_ttl if self.token_ttl > 0 else float('inf')
+        self.execute('INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)', (access_token, refresh_token, expires_at))
+
+    def check_token(self, access_token: str | None):
+        rows = self.query('SELECT expires_at FROM tokens WHERE access_token = ?', (access_token,))
+        if not rows:
+            raise ApiError(401, 'Invalid access token', 'invalidAccessToken')
+        if rows[0]['expires_at'] < time.time():
+            raise ApiError(401, 'Access token expired', 'accessTokenExpired')
+
+    # Refresh токен одноразовый: старая пара удаляется
+    def refresh(self, refresh_token: str) -> dict:
+        with self._lock:
+            row = self._db.execute('SELECT access_token FROM tokens WHERE refresh_token = ?', (refresh_token,)).fetchone()
+            if row is None:
+                raise ApiError(401, 'Invalid refresh token', 'invalidRefreshToken')
+            self._db.execute('DELETE FROM tokens WHERE refresh_token = ?', (refresh_token,))
+            access_token, new_refresh = new_id(), new_id()
+            expires_at = time.time() + self.token_ttl if self.token_ttl > 0 else float('inf')
+            self._db.execute('INSERT INTO tokens VALUES (?, ?, ?)', (access_token, new_refresh, expires_at))
+            self._db.commit()
+        return {'accessToken': access_token, 'refreshToken': new_refresh}
+
+    # Сейфы и папки
+
+    def vault(self, vault_id: str) -> dict:
+        rows = self.query('SELECT id, name FROM vaults WHERE id = ?', (vault_id,))
+        if not rows:
+            raise ApiError(404, 'Vault not found')
+        return {'id': rows[0]['id'], 'name': rows[0]['name'], 'masterKeyEncrypted': ''}
+
+    # Айди сейфа или папки -> (айди родительской папки, название)
+    def _tree(self) -> dict[str, tuple[str | None, str]]:
+        with self._lock:
+            if self._names is None:
+                names = {row[0]: (None, row[1]) for row in self._db.execute('SELECT id, name FROM vaults')}
+                names.update((row[0], (row[1], row[2])) for row in self._db.execute('SELECT id, parent_id, name FROM folders'))
+                self._names = names
+            return self._names
+
+    # Путь папки или пароля: сейф и родительские папки
+    def path(self, vault_id: str, folder_id: str | None) -> list[dict]:
+        tree = self._tree()
+        path = []
+        while folder_id is not None and folder_id in tree:
+            path.append({'id': folder_id, 'name': tree[folder_id][1], 'type': 'folder'})
+            folder_id = tree[folder_id][0]
+        if vault_id not in tree:
+            raise ApiError(404, 'Vault not found')
+        path.append({'id': vault_id, 'name': tree[vault_id][1], 'type': 'vault'})
+        path.reverse()
+        return path
+
+    def folder(self, row: sqlite3.Row, with_path: bool = True) -> dict:
+        folder = {'id': row['id'], 'name': row['name'], 'vaultId': row['vault_id'], 'parentFolderId': row['parent_id']}
+        if with_path:
+            folder['path'] = self.path(row['vault_id'], row['parent_id'])
+        return folder
+
+    def get_folder(self, folder_id: str) -> dict:
+        rows = self.query('SELECT * FROM folders WHERE id = ?', (folder_id,))
+        if not rows:
+            raise ApiError(404, 'Folder not found')
+        return self.folder(rows[0])
+
+    # Айди папки и всех вложенных в нее папок
+    def _subtree(self, folder_id: str) -> list[str]:
+        return [row[0] for row in self._db.execute(
+            'WITH RECURSIVE sub(id) AS (SELECT ? UNION SELECT folders.id FROM folders JOIN sub ON folders.parent_id = sub.id) '
+            'SELECT id FROM sub', (folder_id,),
+        )]
+
+    # Переместить папку в папку parent_id или в корень сейфа vault_id вместе с вложенными папками и паролями
+    def move_folder(self, folder_id: str, vault_id: str, parent_id: str | None):
+        with self._lock:
+            subtree = self._subtree(folder_id)
+            if parent_id in subtree:
+                raise ApiError(400, 'Folder cannot be moved into itself')
+            marks = ','.join('?' * len(subtree))
+            self._db.execute('UPDATE folders SET vault_id = ?, parent_id = ? WHERE id = ?', (vault_id, parent_id, folder_id))
+            self._db.execute(f'UPDATE folders SET vault_id = ? WHERE id IN ({marks})', (vault_id, *subtree))
+            self._db.execute(f'UPDATE items SET vault_id = ? WHERE folder_id IN ({marks})', (vault_id, *subtree))
+            self._db.commit()
+            self._names = None
+
+    # Удалить папку вместе с вложенными папками и паролями
+    def delete_folder(self, folder_id: str):
+        with self._lock:
+            subtree = self._subtree(folder_id)
+            marks = ','.join('?' * len(subtree))
+            self._db.execute(f'DELETE FROM items WHERE folder_id IN ({marks})', subtree)
+            self._db.execute(f'DELETE FROM folders WHERE id IN ({marks})', subtree)
+            self._db.commit()
+            self._names = None
+
+    # Назначение перемещения: айди папки или сейфа -> (айди сейфа, айди родительской папки)
+    def target(self, target_id: str) -> tuple[str, str | None]:
+        if self.query('SELECT id FROM vaults WHERE id = ?', (target_id,)):
+            return target_id, None
+        rows = self.query('SELECT vault_id FROM folders WHERE id = ?', (target_id,))
+        if not rows:
+            raise ApiError(404, 'Target folder not found')
+        return rows[0]['vault_id'], target_id
+
+    # Пароли
+
+    # Полный пароль для /items/{id} или краткий с путем для поиска
+    def item(self, row: sqlite3.Row, full: bool = True) -> dict:
+        item = {'id': row['id'], 'name': row['name'], 'vaultId': row['vault_id'], 'folderId': row['folder_id']}
+        if full:
+            item.update(json.loads(row['data']))
+            item.setdefault('vaultMasterKeyEncrypted', '')
+        else:
+            item['path'] = self.path(row['vault_id'], row['folder_id'])
+        return item
+
+    def get_item(self, item_id: str) -> dict:
+        rows = self.query('SELECT * FROM items WHERE id = ?', (item_id,))
+        if not rows:
+            raise ApiError(404, 'Item not found')
+        return self.item(rows[0])
+
+    def create_item(self, body: dict) -> str:
+        self.vault(body.get('vaultId', ''))
+        item_id = new_id()
+        data = {field: body[field] for field in ITEM_FIELDS if field in body}
+        self.execute(
+            'INSERT INTO items VALUES (?, ?, ?, ?, ?)',
+            (item_id, body['vaultId'], body.get('folderId'), body.get('name', ''), json.dumps(data)),
+        )
+        self.snapshot(item_id)
+        return item_id
+
+    def update_item(self, item_id: str, body: dict):
+        item = self.get_item(item_id)
+        data = {field: item[field] for field in ITEM_FIELDS if field in item}
+        data.update({field: body[field] for field in ITEM_FIELDS if field in body})
+        self.execute(
+            'UPDATE items SET name = ?, data = ? WHERE id = ?',
+            (body.get('name', item['name']), json.dumps(data), item_id),
+        )
+        self.snapshot(item_id)
+
+    # Каждое изменение пароля сохраняется редакцией
+    def snapshot(self, item_id: str):
+        rows = self.query('SELECT * FROM items WHERE id = ?', (item_id,))
+        data = dict(json.loads(rows[0]['data']), name=rows[0]['name'], itemId=item_id)
+        self.execute('INSERT INTO snapshots VALUES (?, ?, ?, ?)', (new_id(), item_id, _now(), json.dumps(data)))
+
+
+# Заполнить хранилище синтетическими данными: vaults сейфов по folders папок (вложенность до depth)
+# по items паролей, у каждого пароля snapshots редакций. Родитель папки выбирается среди width последних
+# созданных папок (по умолчанию среди всех): малый width дает глубокое дерево. Возвращает пути паролей
+def populate(
+    store: Store,
+    vaults: int,
+    folders: int,
+    items: int,
+    snapshots: int = 1,
+    depth: int = 3,
+    seed: int = 0,
+    password_size: int = 24,
+    width: int | None = None,
+) -> list[str]:
+    rng = random.Random(seed)
+    vault_rows, folder_rows, item_rows, snapshot_rows, paths = [], [], [], [], []
+    for v in range(vaults):
+        vault_id, vault_name = new_id(), f'vault{v:03d}'
+        vault_rows.append((vault_id, vault_name))
+        parents: list[tuple[str | None, str, int]] = [(None, vault_name, 0)]
+        for f in range(folders):
+            candidates = [p for p in parents[-width if width else 0:] if p[2] < depth] or parents[:1]
+            parent_id, parent_path, level = rng.choice(candidates)
+            folder_id, folder_name = new_id(), f'folder{f:04d}'
+            folder_rows.append((folder_id, vault_id, parent_id, folder_name))
+            parents.append((folder_id, f'{parent_path}/{folder_name}', level + 1))
+        for folder_id, folder_path, _ in parents[1:] or parents:
+            for i in range(items):
+                item_id, item_name = new_id(), f'item{i:05d}'
+                secret = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(password_size))
+                data = {
+                    'login': f'user{i}',
+                    'passwordEncrypted': base64.b64encode(secret.encode()).decode(),
+                    'url': f'https://host{i}.{vault_name}.example',
+                    'description': '',
+                    'tags': [f'tag{i % 10}'],
+                    'customs': [],
+                }
+                item_rows.append((item_id, vault_id, folder_id, item_name, json.dumps(data)))
+                paths.append(f'{folder_path}/{item_name}')
+                for s in range(snapshots):
+                    snapshot = dict(data, name=item_name, itemId=item_id, description=f'revision {s}')
+                    snapshot_rows.append((new_id(), item_id, f'2024-01-01T00:00:{s:02d}.000000+00:00', json.dumps(snapshot)))
+    store.executemany('INSERT INTO vaults VALUES (?, ?)', vault_rows)
+    store.executemany('INSERT INTO folders VALUES (?, ?, ?, ?)', folder_rows)
+    store.executemany('INSERT INTO items VALUES (?, ?, ?, ?, ?)', item_rows)
+    store.executemany('INSERT INTO snapshots VALUES (?, ?, ?, ?)', snapshot_rows)
+    return paths
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+# Параметры поведения сервера. workers - число одновременно обрабатываемых запросов (0 - без ограничения),
+# остальные ждут в очереди; rate_limit - запросов в секунду, сверх лимита ответ 429
+class Behavior:
+
+    def __init__(
+        self,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        page_size: int = 100,
+        seed: int | None = None,
+        workers: int = 0,
+        rate_limit: float = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.workers = workers
+        self.rate_limit = rate_limit
+        self.slots = threading.BoundedSemaphore(workers) if workers > 0 else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = rate_limit
+        self._refilled = time.monotonic()
+
+    # Задержка ответа в секундах (latency и jitter в миллисекундах, нормальное распределение)
+    def delay(self) -> float:
+        with self._lock:
+            return max(0.0, self._rng.gauss(self.latency, self.jitter)) / 1000
+
+    def fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    # Ограничение частоты запросов: token bucket емкостью rate_limit
+    def allow(self) -> bool:
+        if self.rate_limit <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+# Статистика сервера: ожидание в очереди, время обработки, коды ответов, глубина очереди
+class Stats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.statuses: dict[int, int] = {}
+        self.queue_waits: list[float] = []
+        self.service_times: list[float] = []
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.max_in_flight = 0
+        self.started = time.monotonic()
+
+    def enqueue(self):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def start(self, queue_wait: float):
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.queue_waits.append(queue_wait)
+
+    def finish(self, status: int, service_time: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.service_times.append(service_time)
+
+    def to_dict(self, reset: bool = False) -> dict[str, Any]:
+        with self._lock:
+            requests = sum(self.statuses.values())
+            elapsed = time.monotonic() - self.started
+            result = {
+                'requests': requests,
+                'rate': requests / elapsed if elapsed else 0,
+                'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+                'queue_wait': {
+                    'p50': percentile(self.queue_waits, 50),
+                    'p95': percentile(self.queue_waits, 95),
+                    'p99': percentile(self.queue_waits, 99),
+                    'max': max(self.queue_waits, default=0.0),
+                },
+                'service_time': {
+                    'p50': percentile(self.service_times, 50),
+                    'p95': percentile(self.service_times, 95),
+                    'p99': percentile(self.service_times, 99),
+                    'max': max(self.service_times, default=0.0),
+                },
+                'max_waiting': self.max_waiting,
+                'max_in_flight': self.max_in_flight,
+            }
+            if reset:
+                waiting, in_flight = self.waiting, self.in_flight
+                self.reset()
+                self.waiting, self.in_flight = waiting, in_flight
+            return result
+
+
+# Условие страницы для SQL: limit не больше page_size сервера. Примененный limit возвращается
+# в ответе поиска, по нему клиент определяет последнюю страницу
+def _page(query: dict[str, list[str]], page_size: int) -> tuple[str, tuple[int, int]]:
+    limit = min(int(query.get('limit', [page_size])[0]), page_size)
+    page = int(query.get('page', [1])[0])
+    return ' LIMIT ? OFFSET ?', (limit, (page - 1) * limit)
+
+
+def _like(query: dict[str, list[str]]) -> str:
+    return f'%{query.get("query", [""])[0]}%'
+
+
+# Маршрутизация запросов к хранилищу: (метод, шаблон пути) -> обработчик
+class Api:
+
+    def __init__(self, store: Store, behavior: Behavior):
+        self.store = store
+        self.behavior = behavior
+        self.stats = Stats()
+        self.routes = [
+            ('GET', r'/api/v1/app/settings/additional', self.settings),
+            ('POST', r'/api/v1/sessions/refresh', self.refresh),
+            ('GET', r'/api/v1/vaults', self.vaults),
+            ('GET', r'/api/v1/vaults/(\w+)', self.vault),
+            ('GET', r'/api/v1/folders', self.folders),
+            ('GET', r'/api/v1/folders/search', self.folders_search),
+            ('POST', r'/api/v1/folders', self.folder_create),
+            ('GET', r'/api/v1/folders/(\w+)', self.folder),
+            ('POST', r'/api/v1/folders/(\w+)', self.folder_update),
+            ('PATCH', r'/api/v1/folders/(\w+)', self.folder_update),
+            ('POST', r'/api/v1/folders/(\w+)/move', self.folder_move),
+            ('DELETE', r'/api/v1/folders/(\w+)', self.folder_delete),
+            ('GET', r'/api/v1/items/search', self.items_search),
+            ('POST', r'/api/v1/items', self.item_create),
+            ('GET', r'/api/v1/items/(\w+)', self.item),
+            ('PATCH', r'/api/v1/items/(\w+)', self.item_update),
+            ('POST', r'/api/v1/items/(\w+)/move', self.item_move),
+            ('DELETE', r'/api/v1/items/(\w+)', self.item_delete),
+            ('GET', r'/api/v1/items/(\w+)/snapshots', self.snapshots),
+            ('GET', r'/api/v1/items/(\w+)/snapshot/(\w+)', self.snapshot),
+            ('GET', r'/api/v1/shortcuts/search', self.shortcuts_search),
+            ('POST', r'/api/v1/batch', self.batch),
+        ]
+
+    def dispatch(self, method: str, path: str, query: dict[str, list[str]], body: dict) -> Any:
+        for route_method, pattern, handler in self.routes:
+            if route_method == method and (match := re.fullmatch(pattern, path)):
+                return handler(query, body, *match.groups())
+        raise ApiError(404, f'Route not found: {method} {path}')
+
+    def settings(self, query, body):
+        return {'additional': {}}
+
+    def refresh(self, query, body):
+        return self.store.refresh(body.get('refreshToken', ''))
+
+    def vaults(self, query, body):
+        return {'items': [{'id': row['id'], 'name': row['name']} for row in self.store.query('SELECT * FROM vaults ORDER BY name')]}
+
+    def vault(self, query, body, vault_id):
+        return self.store.vault(vault_id)
+
+    def folders(self, query, body):
+        page, page_args = _page(query, self.behavior.page_size)
+        rows = self.store.query('SELECT * FROM folders WHERE vault_id = ? ORDER BY id' + page, (query.get('vaultId', [''])[0],) + page_args)
+        return {'items': [self.store.folder(row, with_path=False) for row in rows], 'limit': page_args[0]}
+
+    def folders_search(self, query, body):
+        sql, args = 'SELECT * FROM folders WHERE name LIKE ?', [_like(query)]
+        if 'vaultId' in query:
+            sql += ' AND vault_id = ?'
+            args.append(query['vaultId'][0])
+        page, page_args = _page(query, self.behavior.page_size)
+        rows = self.store.query(sql + ' ORDER BY id' + page, tuple(args) + page_args)
+        return {'items': [self.store.folder(row) for row in rows], 'limit': page_args[0]}
+
+    def folder(self, query, body, folder_id):
+        return self.store.get_folder(folder_id)
+
+    def folder_create(self, query, body):
+        self.store.vault(body.get('vaultId', ''))
+        folder_id = new_id()
+        self.store.execute(
+            'INSERT INTO folders VALUES (?, ?, ?, ?)',
+            (folder_id, body['vaultId'], body.get('parentFolderId'), body.get('name', '')),
+        )
+        return {'id': folder_id}
+
+    def folder_update(self, query, body, folder_id):
+        folder = self.store.get_folder(folder_id)
+        self.store.execute('UPDATE folders SET name = ? WHERE id = ?', (body.get('name', folder['name']), folder_id))
+        return {'id': folder_id}
+
+    # Модули отправляют targetFolderId (папка или сейф), сейф берется из назначения
+    def folder_move(self, query, body, folder_id):
+        folder = self.store.get_folder(folder_id)
+        if body.get('targetFolderId'):
+            vault_id, parent_id = self.store.target(body['targetFolderId'])
+        else:
+            vault_id = body.get('vaultId') or folder['vaultId']
+            self.store.vault(vault_id)
+            parent_id = body.get('parentFolderId') or body.get('folderId')
+            if parent_id is not None:
+                vault_id, parent_id = self.store.target(parent_id)
+        self.store.move_folder(folder_id, vault_id, parent_id)
+        return {'id': folder_id}
+
+    def folder_delete(self, query, body, folder_id):
+        self.store.get_folder(folder_id)
+        self.store.delete_folder(folder_id)
+        return {'binItemId': folder_id}
+
+    def items_search(self, query, body):
+        sql, args = 'SELECT * FROM items WHERE name LIKE ?', [_like(query)]
+        for key, column in (('vaultIds[]', 'vault_id'), ('folderIds[]', 'folder_id')):
+            if key in query:
+                sql += f' AND {column} IN ({",".join("?" * len(query[key]))})'
+                args += query[key]
+        page, page_args = _page(query, self.behavior.page_size)
+        rows = self.store.query(
+            sql.replace('*', 'id, name, vault_id, folder_id', 1) + ' ORDER BY id' + page, tuple(args) + page_args,
+        )
+        return {'items': [self.store.item(row, full=False) for row in rows], 'limit': page_args[0]}
+
+    def item_create(self, query, body):
+        return {'id': self.store.create_item(body)}
+
+    def item(self, query, body, item_id):
+        return self.store.get_item(item_id)
+
+    def item_update(self, query, body, item_id):
+        self.store.update_item(item_id, body)
+        return {'id': item_id}
+
+    # Без vaultId пароль остается в своем сейфе, с folderId сейф берется из папки
+    def item_move(self, query, body, item_id):
+        item = self.store.get_item(item_id)
+        folder_id = body.get('folderId') or body.get('targetFolderId')
+        if folder_id:
+            vault_id, folder_id = self.store.target(folder_id)
+        else:
+            vault_id = body.get('vaultId') or item['vaultId']
+            self.store.vault(vault_id)
+        self.store.execute('UPDATE items SET vault_id = ?, folder_id = ? WHERE id = ?', (vault_id, folder_id, item_id))
+        return {'id': item_id}
+
+    def item_delete(self, query, body, item_id):
+        self.store.get_item(item_id)
+        self.store.execute('DELETE FROM items WHERE id = ?', (item_id,))
+        return {'binItemId': item_id}
+
+    def snapshots(self, query, body, item_id):
+        rows = self.store.query('SELECT id, created_at FROM snapshots WHERE item_id = ? ORDER BY created_at DESC', (item_id,))
+        return {'items': [{'id': row['id'], 'createdAt': row['created_at']} for row in rows]}
+
+    def snapshot(self, query, body, item_id, snapshot_id):
+        rows = self.store.query('SELECT * FROM snapshots WHERE id = ? AND item_id = ?', (snapshot_id, item_id))
+        if not rows:
+            raise ApiError(404, 'Snapshot not found')
+        return dict(json.loads(rows[0]['data']), id=snapshot_id, createdAt=rows[0]['created_at'])
+
+    def shortcuts_search(self, query, body):
+        return {'items': []}
+
+    # Пакетный запрос: каждый вложенный запрос обрабатывается отдельно, ошибка не прерывает пакет
+    def batch(self, query, body):
+        responses = []
+        for request in body.get('requests', []):
+            url = urlsplit(request['relativeUrl'])
+            try:
+                result = self.dispatch(request['method'], url.path, parse_qs(url.query), request.get('body') or {})
+                responses.append({'statusCode': 200, 'body': result})
+            except ApiError as e:
+                responses.append({'statusCode': e.status, 'body': {'errors': [{'message': str(e)}]}})
+            except Exception as e:
+                responses.append({'statusCode': 500, 'body': {'errors': [{'message': f'{type(e).__name__}: {e}'}]}})
+        return {'responses': responses}
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    api: Api
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status: int, body: Any):
+        self._status = status
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length) if length else b''
+        try:
+            body = json.loads(data) if data else {}
+        except ValueError:
+            body = None
+
+        # Служебный метод статистики: без очереди и авторизации
+        if url.path == '/_fake/stats':
+            return self._send(200, self.api.stats.to_dict(reset='reset' in parse_qs(url.query)))
+
+        behavior, stats = self.api.behavior, self.api.stats
+        stats.enqueue()
+        queued = time.perf_counter()
+        if behavior.slots is not None:
+            behavior.slots.acquire()
+        started = time.perf_counter()
+        stats.start(started - queued)
+        self._status = 500
+        try:
+            self._process(method, url, body)
+        finally:
+            if behavior.slots is not None:
+                behavior.slots.release()
+            stats.finish(self._status, time.perf_counter() - started)
+
+    def _process(self, method: str, url, body: dict):
+        behavior = self.api.behavior
+        if not behavior.allow():
+            return self._send(429, {'errors': [{'message': 'Too many requests', 'code': 'tooManyRequests'}]})
+
+        time.sleep(behavior.delay())
+        if behavior.fail():
+            return self._send(503, {'errors': [{'message': 'Injected error', 'code': 'injectedError'}]})
+
+        try:
+            if not isinstance(body, dict):
+                raise ApiError(400, 'Invalid JSON body', 'invalidBody')
+            if url.path != '/api/v1/sessions/refresh':
+                authorization = self.headers.get('Authorization', '')
+                self.api.store.check_token(authorization.removeprefix('Bearer ') or None)
+            self._send(200, self.api.dispatch(method, url.path, parse_qs(url.query), body))
+        except ApiError as e:
+            error = {'message': str(e)}
+            if e.code:
+                error['code'] = e.code
+            self._send(e.status, {'errors': [error]})
+        # Ошибка обработчика отдается ответом 500, соединение не обрывается
+        except Exception as e:
+            self._send(500, {'errors': [{'message': f'{type(e).__name__}: {e}', 'code': 'internalError'}]})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServer(ThreadingHTTPServer):
+
+    # Очередь соединений ядра: при сотнях одновременных клиентов значение по умолчанию (5) дает отказы соединения
+    request_queue_size = 1024
+
+
+# Создать сервер (не запущенный); порт 0 - свободный порт, см. server.server_address
+def make_server(store: Store, behavior: Behavior, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    handler = type('BoundHandler', (Handler,), {'api': Api(store, behavior)})
+    server = FakeServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# Запустить сервер в фоновом потоке, вернуть сервер и базовый URL
+def start_server(store: Store, behavior: Behavior, host: str = '127.0.0.1', port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    server = make_server(store, behavior, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{server.server_address[0]}:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальная замена сервера Passwork v7')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--db', default=':memory:', help='Файл SQLite, по умолчанию в памяти')
+    parser.add_argument('--latency', type=float, default=0, help='Средняя задержка ответа, мс')
+    parser.add_argument('--jitter', type=float, default=0, help='Стандартное отклонение задержки, мс')
+    parser.add_argument('--error-rate', type=float, default=0, help='Доля ответов 503, от 0 до 1')
+    parser.add_argument('--page-size', type=int, default=100, help='Максимальный размер страницы поиска')
+    parser.add_argument('--workers', type=int, default=0, help='Одновременно обрабатываемых запросов, остальные в очереди (0 - без ограничения)')
+    parser.add_argument('--rate-limit', type=float, default=0, help='Лимит запросов в секунду, сверх лимита ответ 429 (0 - без лимита)')
+    parser.add_argument('--token-ttl', type=float, default=0, help='Время жизни access токена, с (0 - бессрочно)')
+    parser.add_argument('--access-token', default='access', help='Начальный access токен')
+    parser.add_argument('--refresh-token', default='refresh', help='Начальный refresh токен')
+    parser.add_argument('--populate', help='Заполнить данными: сейфов,папок,паролей[,редакций]')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    store = Store(args.db, args.token_ttl)
+    store.add_token(args.access_token, args.refresh_token)
+    if args.populate:
+        paths = populate(store, *(int(value) for value in args.populate.split(',')), seed=args.seed)
+        print(f'Создано паролей: {len(paths)}' + (f', пример пути: {paths[0]}' if paths else ''))
+
+    behavior = Behavior(args.latency, args.jitter, args.error_rate, args.page_size, args.seed, args.workers, args.rate_limit)
+    server = make_server(store, behavior, args.host, args.port)
+    print(f'Passwork v7 fake: http://{args.host}:{server.server_address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
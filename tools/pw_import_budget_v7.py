@@ -0,0 +1,189 @@
+"""Замер времени импорта модулей коллекции и проверка бюджета.
+
+Каждый модуль из plugins/modules загружается в новом интерпретаторе так же, как его загружает
+action-плагин (по пути файла), вместе с клиентом, который модуль создаст в pw_login:
+облегченным passwork_light_v7 для модулей без шифрования или passwork_client_v7 для остальных.
+Модули, которые на контроллере уже загружены Ansible (ansible.module_utils.basic, ansible.errors),
+импортируются заранее и в замер не входят, с --cold замеряется холодный запуск.
+
+Для каждого модуля выводится медиана времени импорта, самые тяжелые импорты (-X importtime)
+и проверяется, что:
+- время не превышает бюджет (--budget-ms, --crypto-budget-ms или запись модуля в --budgets);
+- модули без шифрования не загружают passwork_client, requests, urllib3, cryptography и multiprocessing
+  (проверяется без учета импортов Ansible и в режиме --cold).
+
+Запуск:
+    python tools/pw_import_budget_v7.py
+    python tools/pw_import_budget_v7.py --modules pw_pass_delete_v7,pw_pass_get_v7 --runs 10 --json /tmp/pw_import.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES_DIR = os.path.join(ROOT, 'plugins', 'modules')
+MODULE_UTILS_DIR = os.path.join(ROOT, 'plugins', 'module_utils')
+
+# Загружено в процессе контроллера до запуска модуля
+CONTROLLER_PRELOAD = ('ansible.module_utils.basic', 'ansible.errors', 'ansible.module_utils.common.arg_spec')
+
+# Клиенты pw_login: облегченный и с шифрованием
+LIGHT_CLIENT = 'passwork_light_v7'
+CRYPTO_CLIENT = 'passwork_client_v7'
+
+# Пакеты, которые не должны загружаться модулями без шифрования
+LIGHT_FORBIDDEN = ('passwork_client', 'requests', 'urllib3', 'cryptography', 'multiprocessing')
+
+# Бюджеты по умолчанию, мс: с запасом от замеров на контроллере (Python 3.11, без -X importtime)
+LIGHT_BUDGET_MS = 60.0
+CRYPTO_BUDGET_MS = 250.0
+
+MARKER = '--pw-import-budget--'
+
+# Выполняется в новом интерпретаторе: импорт заранее загруженных модулей, затем замер модуля и клиента
+CHILD = r'''
+import importlib, importlib.util, json, sys, time
+name, path, client, preload, marker = sys.argv[1:6]
+for preloaded in filter(None, preload.split(',')):
+    importlib.import_module(preloaded)
+before = set(sys.modules)
+sys.stderr.write(marker + '\n')
+sys.stderr.flush()
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('_pw_controller_' + name, path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+importlib.import_module(client)
+elapsed = time.perf_counter() - started
+print(json.dumps({'ms': elapsed * 1000, 'loaded': sorted(set(sys.modules) - before)}))
+'''
+
+
+# Клиент, который модуль создает в pw_login: crypto=False или LightClient - облегченный
+def module_client(name: str) -> str:
+    with open(os.path.join(MODULES_DIR, f'{name}.py'), encoding='utf-8') as f:
+        source = f.read()
+    return LIGHT_CLIENT if 'crypto=False' in source or 'LightClient' in source else CRYPTO_CLIENT
+
+
+# Один запуск: время импорта, загруженные модули и (с importtime) строки -X importtime после маркера
+def _run_child(name: str, client: str, preload: tuple[str, ...], importtime: bool) -> dict[str, Any]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [MODULE_UTILS_DIR, env.get('PYTHONPATH')]))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', CHILD, name, os.path.join(MODULES_DIR, f'{name}.py'), client, ','.join(preload), MARKER]
+    process = subprocess.run(command, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f'exit {process.returncode}')
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['importtime'] = process.stderr.split(MARKER, 1)[-1].splitlines()
+    return result
+
+
+# Самые тяжелые импорты верхнего уровня по выводу -X importtime: [(модуль, мс)]
+def heaviest_imports(lines: list[str], top: int) -> list[tuple[str, float]]:
+    imports = []
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        if name.startswith('  '):
+            continue
+        imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda entry: entry[1], reverse=True)[:top]
+
+
+# Замер модуля: медиана по runs запускам (после прогревочного, который создает .pyc)
+def measure(name: str, client: str, budget: float, runs: int, preload: tuple[str, ...], top: int) -> dict[str, Any]:
+    result: dict[str, Any] = {'module': name, 'client': client, 'budget_ms': budget}
+    try:
+        _run_child(name, client, preload, False)
+        timings = [_run_child(name, client, preload, False)['ms'] for _ in range(runs)]
+        profile = _run_child(name, client, preload, True)
+        # Запрещенные пакеты ищутся среди загруженных самим модулем, без импортов Ansible
+        loaded = (profile if preload else _run_child(name, client, CONTROLLER_PRELOAD, False))['loaded']
+    except RuntimeError as e:
+        result.update(status='error', error=str(e), violations=[f'ошибка импорта: {e}'])
+        return result
+    median = statistics.median(timings)
+    forbidden = []
+    if client == LIGHT_CLIENT:
+        forbidden = sorted({module.split('.')[0] for module in loaded} & set(LIGHT_FORBIDDEN))
+    violations = []
+    if median > budget:
+        violations.append(f'{median:.1f} мс > {budget:.0f} мс')
+    if forbidden:
+        violations.append(f'загружены {", ".join(forbidden)}')
+    result.update(
+        status='fail' if violations else 'ok',
+        median_ms=round(median, 2),
+        min_ms=round(min(timings), 2),
+        max_ms=round(max(timings), 2),
+        loaded=len(profile['loaded']),
+        forbidden=forbidden,
+        heaviest=[{'module': module, 'ms': round(ms, 2)} for module, ms in heaviest_imports(profile['importtime'], top)],
+        violations=violations,
+    )
+    return result
+
+
+def print_report(results: list[dict[str, Any]], cold: bool):
+    print(f'Время импорта ({"холодный запуск" if cold else "контроллер, Ansible загружен"}), медиана мс')
+    print(f'{"модуль":<34}{"клиент":<8}{"мс":>8}{"бюджет":>8}  {"статус":<7} самые тяжелые импорты, мс')
+    for result in results:
+        client = 'light' if result['client'] == LIGHT_CLIENT else 'crypto'
+        if result['status'] == 'error':
+            print(f'{result["module"]:<34}{client:<8}{"-":>8}{result["budget_ms"]:>8.0f}  {"ОШИБКА":<7} {result["error"]}')
+            continue
+        heaviest = ', '.join(f'{entry["module"]} {entry["ms"]:.0f}' for entry in result['heaviest'])
+        status = 'ok' if result['status'] == 'ok' else 'БЮДЖЕТ'
+        print(f'{result["module"]:<34}{client:<8}{result["median_ms"]:>8.1f}{result["budget_ms"]:>8.0f}  {status:<7} {heaviest}')
+    for result in results:
+        for violation in result['violations']:
+            print(f'ПРЕВЫШЕНИЕ {result["module"]}: {violation}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', help='модули через запятую (по умолчанию все из plugins/modules)')
+    parser.add_argument('--runs', type=int, default=5, help='запусков на модуль, берется медиана')
+    parser.add_argument('--budget-ms', type=float, default=LIGHT_BUDGET_MS, help='бюджет модулей без шифрования')
+    parser.add_argument('--crypto-budget-ms', type=float, default=CRYPTO_BUDGET_MS, help='бюджет модулей с шифрованием')
+    parser.add_argument('--budgets', help='JSON файл {"модуль": бюджет в мс} с бюджетами отдельных модулей')
+    parser.add_argument('--cold', action='store_true', help='не загружать заранее модули Ansible контроллера')
+    parser.add_argument('--top', type=int, default=3, help='число самых тяжелых импортов в отчете')
+    parser.add_argument('--json', help='записать результаты в JSON файл')
+    args = parser.parse_args()
+
+    names = args.modules.split(',') if args.modules else sorted(
+        name[:-3] for name in os.listdir(MODULES_DIR) if name.endswith('.py') and not name.startswith('_')
+    )
+    budgets = {}
+    if args.budgets:
+        with open(args.budgets, encoding='utf-8') as f:
+            budgets = json.load(f)
+    preload = () if args.cold else CONTROLLER_PRELOAD
+
+    results = []
+    for name in names:
+        client = module_client(name)
+        budget = budgets.get(name, args.budget_ms if client == LIGHT_CLIENT else args.crypto_budget_ms)
+        results.append(measure(name, client, budget, args.runs, preload, args.top))
+
+    print_report(results, args.cold)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'cold': args.cold, 'results': results}, f, indent=2, ensure_ascii=False)
+    sys.exit(1 if any(result['violations'] for result in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
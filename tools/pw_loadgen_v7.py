@@ -0,0 +1,331 @@
+"""Генератор нагрузки: множество одновременных форков Ansible, обращающихся к Passwork.
+
+Каждый имитируемый форк в цикле выполняет задачи из смеси операций (лукап pw_get_pswd_v7
+и модули pw_pass_*). Каждая задача начинается как в новом рабочем процессе Ansible: новое соединение
+и пустой кэш паролей лукапа; дисковые кэши метаданных и токенов общие, как на контроллере.
+Число форков меняется ступенями (--ramp). Для каждой ступени выводятся пропускная способность,
+доля и причины ошибок, перцентили задержки задач и, для pw_fake_server_v7, ожидание запросов
+в очереди сервера.
+
+Запуск с сервером в процессе (ограничение сервера - 16 одновременно обрабатываемых запросов):
+    python tools/pw_loadgen_v7.py --dataset 1k-shallow --workers 16 --latency 20 --ramp 10:20,100:30,500:60
+
+Запуск против отдельно запущенного pw_fake_server_v7 (--db - та же база, из нее берутся пути паролей):
+    python tools/pw_loadgen_v7.py --api-server http://127.0.0.1:18080 --db /tmp/pw.sqlite \\
+        --access-token access --refresh-token refresh --ramp 50:30,500:60
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'plugins', 'module_utils'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import passwork_common_v7
+from passwork_common_v7 import SecretCache
+from pw_bench_v7 import (
+    ACCESS_TOKEN,
+    DATASETS,
+    REFRESH_TOKEN,
+    lookup_plugin_module,
+    lookup_runner,
+    module_runner,
+    prepare_store,
+    sample_targets,
+)
+from pw_fake_server_v7 import Behavior, Store, percentile, start_server
+
+DEFAULT_MIX = 'lookup:60,pw_pass_get_by_path_v7:20,pw_pass_get_v7:10,pw_pass_update_v7:5,pw_pass_create_v7:5'
+
+MODULES = ('pw_pass_get_v7', 'pw_pass_get_by_path_v7', 'pw_pass_search_v7', 'pw_pass_create_v7', 'pw_pass_update_v7')
+
+
+# Кэш паролей лукапа, отдельный для каждого потока: форки Ansible не делят память процесса
+class ForkLocalSecretCache(SecretCache, threading.local):
+    pass
+
+
+# Параметры, общие для процессов генератора
+_config: dict[str, Any] = {}
+_operations: dict[str, Callable[[random.Random], Any]] = {}
+
+
+# Операции смеси: название -> функция (генератор случайных чисел форка)
+def _build_operations() -> dict[str, Callable[[random.Random], Any]]:
+    connection = {
+        'api_server': _config['url'],
+        'access_token': _config['access_token'],
+        'refresh_token': _config['refresh_token'],
+        'master_key': None,
+    }
+    lookup_options = {k: v for k, v in connection.items() if v}
+    folders, items = _config['folders'], _config['items']
+    modules = {name: module_runner(name) for name in MODULES}
+    lookup = lookup_runner()
+    lookup_plugin_module()._secret_cache = ForkLocalSecretCache()
+
+    def create(rng: random.Random):
+        folder = rng.choice(folders)
+        modules['pw_pass_create_v7'](dict(connection, pass_args={
+            'vault': folder['vault'], 'folder': folder['name'], 'name': f'load{rng.getrandbits(32):08x}',
+            'login': 'load', 'password': 'load',
+        }))
+
+    return {
+        'lookup': lambda rng: lookup([rng.choice(items)['path']], lookup_options),
+        'pw_pass_get_by_path_v7': lambda rng: modules['pw_pass_get_by_path_v7'](dict(connection, path=rng.choice(items)['path'])),
+        'pw_pass_get_v7': lambda rng: modules['pw_pass_get_v7'](dict(connection, password_id=rng.choice(items)['id'])),
+        'pw_pass_search_v7': lambda rng: modules['pw_pass_search_v7'](dict(
+            connection,
+            search_args={'query': (item := rng.choice(items))['name'], 'vault': item['vault']},
+        )),
+        'pw_pass_update_v7': lambda rng: modules['pw_pass_update_v7'](dict(
+            connection,
+            password_id=(item := rng.choice(items))['id'],
+            pass_args={'vault': item['vault'], 'description': f'load {time.time()}'},
+        )),
+        'pw_pass_create_v7': create,
+    }
+
+
+# Причина ошибки задачи: HTTP код ответа Passwork или класс исключения
+def _error_kind(e: Exception) -> str:
+    match = re.search(r'Code: (\d+)', str(e))
+    if match:
+        return match.group(1)
+    return type(e).__name__
+
+
+# Один форк: выполнять задачи до deadline. Возвращает записи (операция, начало, длительность, ошибка)
+def _fork(seed: int, deadline: float, mix: list[tuple[str, int]], think_time: float) -> list[tuple]:
+    rng = random.Random(seed)
+    names, weights = zip(*mix)
+    records = []
+    while time.time() < deadline:
+        operation = rng.choices(names, weights)[0]
+        started = time.time()
+        error = None
+        try:
+            _operations[operation](rng)
+        except Exception as e:
+            error = _error_kind(e)
+        records.append((operation, started, time.time() - started, error))
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+    return records
+
+
+# Группа форков в одном процессе (потоки). Возвращает записи задач и процессорное время процесса
+def _fork_group(seeds: list[int], deadline: float, mix: list[tuple[str, int]], think_time: float) -> tuple[list[tuple], float]:
+    global _operations
+    if not _operations:
+        _operations = _build_operations()
+    cpu_started = time.process_time()
+    results: list[list[tuple]] = [[] for _ in seeds]
+
+    def run(index: int):
+        results[index] = _fork(seeds[index], deadline, mix, think_time)
+
+    threads = [threading.Thread(target=run, args=(index,), daemon=True) for index in range(len(seeds))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [record for records in results for record in records], time.process_time() - cpu_started
+
+
+# Статистика pw_fake_server_v7, None для сервера без /_fake/stats
+def _server_stats(url: str, reset: bool = False) -> dict | None:
+    try:
+        with urllib.request.urlopen(f'{url}/_fake/stats{"?reset=1" if reset else ""}', timeout=10) as response:
+            return json.load(response)
+    except Exception:
+        return None
+
+
+# Выполнить ступень: concurrency форков в течение duration секунд, не больше forks_per_process потоков на процесс.
+# Настоящие форки - отдельные процессы: сотни потоков в одном интерпретаторе упираются в GIL и искажают задержки
+def run_stage(concurrency: int, duration: float, args: argparse.Namespace, mix: list[tuple[str, int]], stage: int) -> dict[str, Any]:
+    processes = max(1, math.ceil(concurrency / args.forks_per_process))
+    seeds = [args.seed * 1000003 + stage * 10007 + fork for fork in range(concurrency)]
+    groups = [seeds[index::processes] for index in range(processes)]
+
+    _server_stats(_config['url'], reset=True)
+    started = time.time()
+    deadline = started + duration
+    if processes == 1:
+        groups_results = [_fork_group(groups[0], deadline, mix, args.think_time / 1000)]
+    else:
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(processes, mp_context=context) as pool:
+            futures = [pool.submit(_fork_group, group, deadline, mix, args.think_time / 1000) for group in groups]
+            groups_results = [future.result() for future in futures]
+    records = [record for group_records, _ in groups_results for record in group_records]
+    cpu = sum(group_cpu for _, group_cpu in groups_results)
+    # Задачи, начатые до deadline, завершаются после него: длительность ступени - до конца последней задачи
+    elapsed = max([started + duration] + [record[1] + record[2] for record in records]) - started
+    server = _server_stats(_config['url'])
+
+    latencies = [record[2] for record in records]
+    errors: dict[str, int] = {}
+    for record in records:
+        if record[3] is not None:
+            errors[record[3]] = errors.get(record[3], 0) + 1
+    operations = {}
+    for name, _ in mix:
+        durations = [record[2] for record in records if record[0] == name]
+        if durations:
+            operations[name] = {
+                'tasks': len(durations),
+                'errors': sum(1 for record in records if record[0] == name and record[3] is not None),
+                'p50': percentile(durations, 50),
+                'p95': percentile(durations, 95),
+                'p99': percentile(durations, 99),
+            }
+    return {
+        'concurrency': concurrency,
+        'duration': elapsed,
+        'tasks': len(records),
+        'throughput': len(records) / elapsed if elapsed else 0,
+        'error_rate': sum(errors.values()) / len(records) if records else 0,
+        'errors': errors,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': max(latencies, default=0.0),
+        'operations': operations,
+        'server': server,
+        'processes': processes,
+        # Загрузка всех CPU хоста процессами генератора: около 1 - задержки ограничены генератором, а не сервером
+        'client_cpu': cpu / elapsed / (os.cpu_count() or 1) if elapsed else 0,
+    }
+
+
+def print_stage(result: dict[str, Any]):
+    print(
+        f'форков {result["concurrency"]:>5}: задач {result["tasks"]:>6}, {result["throughput"]:>7.1f} задач/с, '
+        f'ошибок {result["error_rate"] * 100:5.1f}% {result["errors"] or ""}'
+    )
+    print(
+        f'    задача мс: p50 {result["p50"] * 1000:.1f}, p95 {result["p95"] * 1000:.1f}, '
+        f'p99 {result["p99"] * 1000:.1f}, max {result["max"] * 1000:.1f}'
+    )
+    print(f'    генератор: процессов {result["processes"]}, загрузка CPU {result["client_cpu"] * 100:.0f}%')
+    if result['client_cpu'] > 0.8:
+        print('    ВНИМАНИЕ: генератор загружает CPU, задержки завышены; уменьшите число форков или запустите на большем хосте')
+    for name, operation in result['operations'].items():
+        print(
+            f'    {name:<24} задач {operation["tasks"]:>6}, ошибок {operation["errors"]:>5}, '
+            f'p50 {operation["p50"] * 1000:.1f}, p95 {operation["p95"] * 1000:.1f}, p99 {operation["p99"] * 1000:.1f} мс'
+        )
+    server = result['server']
+    if server is not None:
+        queue, service = server['queue_wait'], server['service_time']
+        print(
+            f'    сервер: {server["requests"]} запросов, {server["rate"]:.1f}/с, коды {server["statuses"]}, '
+            f'в очереди до {server["max_waiting"]}, в обработке до {server["max_in_flight"]}'
+        )
+        print(
+            f'    очередь мс: p50 {queue["p50"] * 1000:.1f}, p95 {queue["p95"] * 1000:.1f}, '
+            f'p99 {queue["p99"] * 1000:.1f}, max {queue["max"] * 1000:.1f}; '
+            f'обработка мс: p50 {service["p50"] * 1000:.1f}, p99 {service["p99"] * 1000:.1f}'
+        )
+
+
+def _parse_pairs(value: str, name: str) -> list[tuple[str, str]]:
+    try:
+        return [tuple(pair.split(':', 1)) for pair in value.split(',')]
+    except ValueError:
+        raise SystemExit(f'Неверный формат {name}: {value}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генератор нагрузки на Passwork v7: одновременные форки Ansible')
+    parser.add_argument('--ramp', default='10:10,50:10,100:20', help='Ступени форки:секунды через запятую')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Смесь операций название:вес через запятую')
+    parser.add_argument('--think-time', type=float, default=0, help='Средняя пауза форка между задачами, мс')
+    parser.add_argument('--forks-per-process', type=int, default=25, help='Имитируемых форков (потоков) на процесс генератора')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Сохранить результаты ступеней в файл JSON')
+    parser.add_argument('--cache', action='store_true', help='Включить общий дисковый кэш метаданных')
+    # Сервер в процессе
+    parser.add_argument('--dataset', default='1k-shallow', help=f'Набор данных сервера в процессе: {", ".join(DATASETS)}')
+    parser.add_argument('--db-dir', help='Каталог для заполненных баз наборов данных')
+    parser.add_argument('--latency', type=float, default=10, help='Задержка сервера, мс')
+    parser.add_argument('--jitter', type=float, default=2, help='Стандартное отклонение задержки, мс')
+    parser.add_argument('--workers', type=int, default=0, help='Одновременно обрабатываемых сервером запросов (0 - без ограничения)')
+    parser.add_argument('--rate-limit', type=float, default=0, help='Лимит запросов сервера в секунду (0 - без лимита)')
+    parser.add_argument('--error-rate', type=float, default=0, help='Доля ответов 503')
+    parser.add_argument('--page-size', type=int, default=100)
+    # Внешний сервер
+    parser.add_argument('--api-server', help='Адрес запущенного pw_fake_server_v7 вместо сервера в процессе')
+    parser.add_argument('--db', help='База SQLite внешнего сервера, из нее берутся пути паролей')
+    parser.add_argument('--access-token', default=ACCESS_TOKEN)
+    parser.add_argument('--refresh-token', default=REFRESH_TOKEN)
+    args = parser.parse_args()
+
+    ramp = [(int(forks), float(seconds)) for forks, seconds in _parse_pairs(args.ramp, '--ramp')]
+    mix = [(name, int(weight)) for name, weight in _parse_pairs(args.mix, '--mix')]
+    for name, _ in mix:
+        if name != 'lookup' and name not in MODULES:
+            raise SystemExit(f'Неизвестная операция: {name}')
+
+    workdir = tempfile.mkdtemp(prefix='pw_loadgen_')
+    passwork_common_v7.CACHE_DIR = os.path.join(workdir, 'cache')
+    passwork_common_v7.TOKEN_DIR = os.path.join(workdir, 'tokens')
+    if not args.cache:
+        passwork_common_v7.CACHE_TTL = 0
+
+    server = None
+    if args.api_server:
+        if not args.db:
+            raise SystemExit('Для внешнего сервера нужна его база: --db')
+        store = Store(args.db)
+        url = args.api_server.rstrip('/')
+    else:
+        if args.dataset not in DATASETS:
+            raise SystemExit(f'Неизвестный набор данных: {args.dataset}')
+        if args.db_dir:
+            os.makedirs(args.db_dir, exist_ok=True)
+        store = prepare_store(args.dataset, args.db_dir, args.seed)
+        behavior = Behavior(args.latency, args.jitter, args.error_rate, args.page_size, args.seed, args.workers, args.rate_limit)
+        server, url = start_server(store, behavior)
+
+    _config.update(
+        url=url,
+        access_token=args.access_token,
+        refresh_token=args.refresh_token,
+        folders=sample_targets(store, 'folders', 'parent_id'),
+        items=sample_targets(store, 'items', 'folder_id'),
+    )
+
+    results = []
+    try:
+        for stage, (concurrency, duration) in enumerate(ramp):
+            result = run_stage(concurrency, duration, args, mix, stage)
+            print_stage(result)
+            results.append(result)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ramp': args.ramp, 'mix': args.mix, 'stages': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()